@@ -0,0 +1,144 @@
+"""Benchmark: POST /projects/<id>/generate-narrative no modo WSGI (threads) vs. ASGI (event loop)
+
+Uso (a partir de backend/):
+    python benchmarks/bench_async_load.py --requests 200 --concurrency 200 --latency 0.5 --threads 16
+
+O provedor de IA é um stub local com latência fixa, então o tempo medido é o
+de espera pelo modelo somado ao overhead do servidor. O modo WSGI atende com
+um pool de --threads threads (como gunicorn --threads); o modo ASGI roda o
+app de src/asgi.py em processo via httpx.ASGITransport. Imprime JSON com
+vazão e latências p50/p95 de cada modo.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix='pitchcraft-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ['JOB_WORKERS'] = '0'
+# Cada requisição precisa chegar ao modelo: sem cache exato nem semântico
+os.environ['LLM_CACHE_ENABLED'] = 'false'
+os.environ['SEMANTIC_CACHE_ENABLED'] = 'false'
+os.environ['STUB_REQUESTS_PER_MINUTE'] = '0'
+# Sem teto de concorrência no provedor: a comparação é entre os modos do servidor
+os.environ['STUB_MAX_CONCURRENCY'] = '0'
+
+import httpx
+
+from src.asgi import app as asgi_app, flask_app
+from src.routes import pitchcraft
+from src.services.llm_router import LLMProvider, LLMRouter
+
+NARRATIVE = "**Introdução**\nTexto de introdução.\n\n**Problema**\nTexto do problema.\n\n**Solução**\nTexto da solução.\n"
+
+
+class StubProvider(LLMProvider):
+    name = 'stub'
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def complete(self, model, prompt, temperature):
+        time.sleep(self.latency)
+        return NARRATIVE
+
+    async def complete_async(self, model, prompt, temperature):
+        await asyncio.sleep(self.latency)
+        return NARRATIVE
+
+
+def create_projects(count: int):
+    client = flask_app.test_client()
+    ids = []
+    for index in range(count):
+        response = client.post('/api/projects', json={
+            'title': f'Projeto {index}',
+            'description': f'Proposta comercial número {index}',
+            'user_id': 1
+        })
+        ids.append(response.get_json()['id'])
+    return ids
+
+
+def summarize(latencies, elapsed, statuses):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(round(p / 100.0 * (len(latencies) - 1))))] * 1000, 1)
+
+    return {
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'errors': sum(1 for status in statuses if status != 200)
+    }
+
+
+def run_wsgi(project_ids, threads: int):
+    client = flask_app.test_client()
+
+    def call(project_id, submitted_at):
+        status = client.post(f'/api/projects/{project_id}/generate-narrative', json={}).status_code
+        return time.monotonic() - submitted_at, status
+
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        # Latência medida desde o envio: inclui a espera por uma thread livre
+        futures = [executor.submit(call, project_id, time.monotonic()) for project_id in project_ids]
+        results = [future.result() for future in futures]
+    elapsed = time.monotonic() - started_at
+    return summarize([latency for latency, _ in results], elapsed, [status for _, status in results])
+
+
+async def run_asgi(project_ids, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=None)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url='http://bench', limits=limits) as client:
+        async def call(project_id):
+            started_at = time.monotonic()
+            async with semaphore:
+                response = await client.post(f'/api/projects/{project_id}/generate-narrative', json={})
+                return time.monotonic() - started_at, response.status_code
+
+        started_at = time.monotonic()
+        results = await asyncio.gather(*(call(project_id) for project_id in project_ids))
+        elapsed = time.monotonic() - started_at
+    return summarize([latency for latency, _ in results], elapsed, [status for _, status in results])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=200, help='Requisições simultâneas no modo ASGI')
+    parser.add_argument('--threads', type=int, default=16, help='Threads do servidor no modo WSGI')
+    parser.add_argument('--latency', type=float, default=0.5, help='Latência simulada do modelo, em segundos')
+    parser.add_argument('--bundle', action='store_true', help='Usar o pacote único (PITCH_BUNDLE_ENABLED)')
+    args = parser.parse_args()
+
+    pitchcraft.ai_service.router = LLMRouter([StubProvider(args.latency)])
+    pitchcraft.ai_service.bundle_enabled = args.bundle
+
+    project_ids = create_projects(args.requests)
+    results = {
+        'wsgi_threads': run_wsgi(project_ids, args.threads),
+        'asgi': asyncio.run(run_asgi(project_ids, args.concurrency)),
+    }
+    results['throughput_ratio'] = round(
+        results['asgi']['requests_per_second'] / results['wsgi_threads']['requests_per_second'], 2
+    )
+    results['params'] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
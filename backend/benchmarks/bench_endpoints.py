@@ -0,0 +1,295 @@
+"""Benchmark de carga dos endpoints principais contra dependências locais (stubs)
+
+Uso (a partir de backend/):
+    python benchmarks/bench_endpoints.py --requests 100 --concurrency 16 --llm-latency 0.3
+    python benchmarks/bench_endpoints.py --server asgi --output resultados/asgi.json
+    python benchmarks/bench_endpoints.py --baseline resultados/main.json --output resultados/branch.json
+
+Sobe o app em um processo separado (--server wsgi: servidor com threads do
+Werkzeug; asgi: uvicorn com src.asgi:app), com banco SQLite temporário e o
+provedor OpenAI apontado (OPENAI_BASE_URL) para o StubLLMServer de
+stub_servers.py; o enriquecimento raspa o StubWebsiteServer. Nada sai da
+máquina e nenhum token é cobrado.
+
+Fases:
+- por endpoint: --requests requisições de cada endpoint, isoladas, com
+  --concurrency clientes simultâneos;
+- mista: --mixed-requests requisições sorteadas (semente fixa) com os pesos
+  de MIXED_WEIGHTS, que aproximam o uso real (muita leitura, pouca geração).
+
+Imprime (e grava em --output) JSON com vazão, latências p50/p95/p99 e erros
+por endpoint, chaves ordenadas e o commit medido, para comparar execuções com
+diff. Com --baseline, inclui a variação percentual de vazão e p95 em relação
+a um JSON anterior.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from benchmarks.stub_servers import StubLLMServer, StubWebsiteServer
+
+WSGI_SERVER = (
+    "from werkzeug.serving import run_simple\n"
+    "from src.main import app\n"
+    "run_simple('127.0.0.1', {port}, app, threaded=True)\n"
+)
+
+# Endpoint -> (método, caminho, corpo); {id} é sorteado entre os projetos criados no preparo
+ENDPOINTS = {
+    'list_projects': ('GET', '/api/projects', None),
+    'create_project': ('POST', '/api/projects', lambda site: {'title': 'Projeto de carga', 'description': 'Proposta para benchmark', 'user_id': 1}),
+    'get_project': ('GET', '/api/projects/{id}', None),
+    'generate_narrative': ('POST', '/api/projects/{id}/generate-narrative', lambda site: {}),
+    'objections': ('POST', '/api/projects/{id}/objections', lambda site: {}),
+    'enrich_data': ('POST', '/api/projects/{id}/enrich-data', lambda site: {'company_name': 'Empresa Stub', 'industry': 'Tecnologia', 'website': site}),
+    'create_presentation': ('POST', '/api/projects/{id}/presentations', lambda site: {'title': 'Deck de carga'}),
+}
+
+MIXED_WEIGHTS = {
+    'list_projects': 30,
+    'get_project': 30,
+    'create_project': 5,
+    'generate_narrative': 10,
+    'objections': 10,
+    'enrich_data': 10,
+    'create_presentation': 5,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def start_app(args, llm: StubLLMServer, port: int):
+    db_dir = tempfile.mkdtemp(prefix='pitchcraft-endpoints-')
+    env = dict(
+        os.environ,
+        PYTHONPATH=BACKEND_DIR,
+        DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'bench.db')}",
+        JOB_WORKERS='0',
+        OPENAI_API_KEY='stub',
+        OPENAI_BASE_URL=llm.base_url,
+        # Chaves vazias não são sobrescritas pelo .env local: só o stub atende
+        ANTHROPIC_API_KEY='',
+        GOOGLE_API_KEY='',
+        LLM_PROVIDER_ORDER='openai',
+        OPENAI_REQUESTS_PER_MINUTE='0',
+        LLM_CACHE_ENABLED='true' if args.llm_cache else 'false',
+        SEMANTIC_CACHE_ENABLED='false',
+        PITCH_BUNDLE_ENABLED='true' if args.bundle else 'false',
+    )
+    if args.server == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'src.asgi:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-c', WSGI_SERVER.format(port=port)]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'o app não subiu:\n{process.stderr.read()}')
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/api/health', timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'o app não respondeu em {args.startup_timeout}s')
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))] * 1000, 1)
+
+
+def summarize(samples, elapsed: float) -> dict:
+    latencies = [latency for latency, _ in samples]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status in samples if status >= 400),
+        'requests_per_second': round(len(samples) / elapsed, 1) if elapsed > 0 else None,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+    }
+
+
+async def run_phase(client: httpx.AsyncClient, names, project_ids, site_url: str, concurrency: int, seed: int):
+    """Disparar as requisições `names` com `concurrency` clientes; retorna {endpoint: amostras} e a duração"""
+    rng = random.Random(seed)
+    plan = [(name, rng.choice(project_ids)) for name in names]
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+    samples = {name: [] for name in set(names)}
+
+    async def worker():
+        while True:
+            try:
+                name, project_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            method, path, body = ENDPOINTS[name]
+            started_at = time.monotonic()
+            try:
+                response = await client.request(
+                    method, path.format(id=project_id), json=body(site_url) if body else None
+                )
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 599
+            samples[name].append((time.monotonic() - started_at, status))
+
+    started_at = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.monotonic() - started_at
+
+
+async def prepare(client: httpx.AsyncClient, count: int, site_url: str):
+    """Projetos com perfil do cliente (DISC informado, sem chamada ao modelo) para as rotas por id"""
+    project_ids = []
+    for index in range(count):
+        response = await client.post('/api/projects', json={
+            'title': f'Projeto {index}',
+            'description': f'Proposta comercial número {index} para automação de vendas',
+            'user_id': 1
+        })
+        response.raise_for_status()
+        project_id = response.json()['id']
+        response = await client.post(f'/api/projects/{project_id}/client-profile', json={
+            'company_name': f'Empresa {index}',
+            'industry': 'Tecnologia',
+            'size': 'média',
+            'disc_profile': 'D',
+            'pain_points': 'Ciclo de vendas longo',
+            'goals': 'Aumentar a conversão',
+            'website': site_url
+        })
+        response.raise_for_status()
+        project_ids.append(project_id)
+    return project_ids
+
+
+async def run_benchmark(args, base_url: str, site_url: str) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.request_timeout)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        project_ids = await prepare(client, args.projects, site_url)
+
+        endpoints = {}
+        for name in args.endpoints:
+            samples, elapsed = await run_phase(client, [name] * args.requests, project_ids, site_url, args.concurrency, args.seed)
+            endpoints[name] = summarize(samples[name], elapsed)
+
+        mixed = None
+        if args.mixed_requests:
+            rng = random.Random(args.seed)
+            weighted = [name for name in args.endpoints if name in MIXED_WEIGHTS]
+            names = rng.choices(weighted, weights=[MIXED_WEIGHTS[name] for name in weighted], k=args.mixed_requests)
+            samples, elapsed = await run_phase(client, names, project_ids, site_url, args.concurrency, args.seed)
+            mixed = {
+                'total': summarize([sample for values in samples.values() for sample in values], elapsed),
+                'endpoints': {name: summarize(values, elapsed) for name, values in samples.items()},
+            }
+    return {'endpoints': endpoints, 'mixed': mixed}
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """Variação percentual de vazão e p95 por endpoint em relação a uma execução anterior"""
+    def delta(current, previous):
+        if current is None or not previous:
+            return None
+        return round((current - previous) / previous * 100, 1)
+
+    deltas = {}
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous:
+            deltas[name] = {
+                'requests_per_second_pct': delta(current['requests_per_second'], previous.get('requests_per_second')),
+                'p95_ms_pct': delta(current['p95_ms'], previous.get('p95_ms')),
+            }
+    if results.get('mixed') and baseline.get('mixed'):
+        deltas['mixed'] = {
+            'requests_per_second_pct': delta(results['mixed']['total']['requests_per_second'], baseline['mixed']['total'].get('requests_per_second')),
+            'p95_ms_pct': delta(results['mixed']['total']['p95_ms'], baseline['mixed']['total'].get('p95_ms')),
+        }
+    return {'commit': baseline.get('commit'), 'endpoints': deltas}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi')
+    parser.add_argument('--requests', type=int, default=100, help='Requisições por endpoint na fase isolada')
+    parser.add_argument('--mixed-requests', type=int, default=300, help='Requisições da fase mista (0 desliga)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--projects', type=int, default=50, help='Projetos criados no preparo')
+    parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument('--llm-latency', type=float, default=0.3, help='Segundos até o primeiro token no stub')
+    parser.add_argument('--llm-tokens-per-second', type=float, default=200, help='Vazão de geração do stub (0 = instantânea)')
+    parser.add_argument('--site-latency', type=float, default=0.05)
+    parser.add_argument('--site-bytes', type=int, default=50_000)
+    parser.add_argument('--llm-cache', action='store_true', help='Manter o cache exato de respostas (padrão: toda chamada chega ao stub)')
+    parser.add_argument('--bundle', action=argparse.BooleanOptionalAction, default=True, help='PITCH_BUNDLE_ENABLED')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--request-timeout', type=float, default=60)
+    parser.add_argument('--startup-timeout', type=float, default=30)
+    parser.add_argument('--output', help='Gravar o JSON também neste arquivo')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    llm = StubLLMServer(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second).start()
+    site = StubWebsiteServer(latency=args.site_latency, page_bytes=args.site_bytes).start()
+    port = free_port()
+    process = start_app(args, llm, port)
+    try:
+        results = asyncio.run(run_benchmark(args, f'http://127.0.0.1:{port}', f'{site.url}/'))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        llm.stop()
+        site.stop()
+
+    results['commit'] = git_commit()
+    results['stubs'] = {'llm': llm.stats(), 'website': site.stats()}
+    results['params'] = vars(args)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            results['baseline'] = compare(results, json.load(baseline_file))
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark: resposta de GET /projects/<id> com json.loads + re-serialização vs. passthrough
+
+Uso (a partir de backend/):
+    python benchmarks/bench_json_passthrough.py --presentations 10 --slides 40
+
+Mede apenas a serialização do payload (sem banco nem HTTP) e imprime JSON com
+os tempos médios por resposta em cada modo.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.json_passthrough import dumps_with_raw, raw_json
+
+
+def build_rows(presentations: int, slides: int):
+    """Textos JSON como ficam gravados nas colunas"""
+    slide = {
+        'type': 'content',
+        'title': 'Benefícios para o cliente',
+        'content': 'Redução de custos operacionais com automação de processos. ' * 8,
+        'layout': 'two-column',
+        'bullets': ['Menos retrabalho', 'Mais conversão', 'Ciclo de vendas menor'],
+    }
+    deck = json.dumps({'slides': [dict(slide, number=i) for i in range(slides)], 'theme': {'primary': '#1f2937'}})
+    news = json.dumps([{'title': f'Notícia {i}', 'summary': 'Resumo ' * 20, 'relevance_score': 0.5} for i in range(10)])
+    return [(deck, json.dumps({'theme': 'modern'})) for _ in range(presentations)], news
+
+
+def decode_path(rows, news):
+    return json.dumps({
+        'id': 1,
+        'presentations': [{'id': i, 'content': json.loads(c), 'style_config': json.loads(s)} for i, (c, s) in enumerate(rows)],
+        'market_intelligence': {'industry_trends': json.loads(news), 'news_insights': json.loads(news)},
+    }, separators=(',', ':'))
+
+
+def passthrough_path(rows, news):
+    return dumps_with_raw({
+        'id': 1,
+        'presentations': [{'id': i, 'content': raw_json(c), 'style_config': raw_json(s)} for i, (c, s) in enumerate(rows)],
+        'market_intelligence': {'industry_trends': raw_json(news), 'news_insights': raw_json(news)},
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--presentations', type=int, default=10)
+    parser.add_argument('--slides', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rows, news = build_rows(args.presentations, args.slides)
+    assert json.loads(decode_path(rows, news)) == json.loads(passthrough_path(rows, news))
+
+    results = {}
+    for name, func in (('decode_reencode', decode_path), ('passthrough', passthrough_path)):
+        seconds = min(timeit.repeat(lambda: func(rows, news), number=args.repeat, repeat=5)) / args.repeat
+        results[name] = {'ms_per_response': round(seconds * 1000, 4)}
+    results['speedup'] = round(results['decode_reencode']['ms_per_response'] / results['passthrough']['ms_per_response'], 2)
+    results['response_bytes'] = len(passthrough_path(rows, news))
+    results['params'] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
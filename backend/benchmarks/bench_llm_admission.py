@@ -0,0 +1,132 @@
+"""Benchmark: rajada de chamadas a um provedor com limite de taxa, sem e com o ProviderLimiter
+
+Uso (a partir de backend/):
+    python benchmarks/bench_llm_admission.py --requests 300 --concurrency 60 --provider-rpm 1200 --latency 0.3
+
+O provedor stub aceita --provider-rpm requisições por minuto (rajada de 10 s
+de cota) e responde 429 com Retry-After acima disso, como as APIs reais.
+
+- unguarded: sem limites no cliente e sem retentativas (o comportamento
+  anterior: cada 429 vira conteúdo de demonstração na rota)
+- guarded: ProviderLimiter a --guard-ratio da cota do provedor, até
+  --max-concurrency chamadas simultâneas, retentativas com Retry-After e
+  admissão que recusa (HTTP 503) quando a espera prevista passa de --slo
+
+Imprime JSON com, para cada modo: respostas do modelo, falhas do provedor
+(que cairiam no conteúdo de demonstração), recusas rápidas, 429 recebidos,
+latências p50/p95 das respostas e p95 do tempo até a recusa.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.llm_router import LLMProvider, LLMRouter
+from src.services.rate_limiter import AdmissionRejected, ProviderLimiter, TokenBucket
+
+
+class ProviderRateLimitError(Exception):
+    """Forma dos erros 429 dos SDKs: status_code e response.headers com Retry-After"""
+
+    def __init__(self, retry_after: float):
+        super().__init__('429 Too Many Requests')
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={'retry-after': str(math.ceil(retry_after))})
+
+
+class ThrottledProvider(LLMProvider):
+    name = 'stub'
+
+    def __init__(self, rpm: float, latency: float):
+        super().__init__()
+        self.quota = TokenBucket(rpm, capacity=max(rpm / 6.0, 1))
+        self.latency = latency
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def complete(self, model, prompt, temperature):
+        wait_seconds = self.quota.try_acquire()
+        if wait_seconds > 0:
+            with self._lock:
+                self.throttled += 1
+            raise ProviderRateLimitError(wait_seconds)
+        time.sleep(self.latency)
+        return 'ok'
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))] * 1000, 1)
+
+
+def run_mode(mode: str, args) -> dict:
+    provider = ThrottledProvider(args.provider_rpm, args.latency)
+    router = LLMRouter([provider])
+    if mode == 'unguarded':
+        provider.rate_limiter = ProviderLimiter('stub')
+        router.max_retries = 0
+    else:
+        provider.rate_limiter = ProviderLimiter(
+            'stub', requests_per_minute=args.provider_rpm * args.guard_ratio,
+            max_concurrency=args.max_concurrency, max_queue_seconds=args.slo
+        )
+        router.max_retries = args.retries
+    router.expected_latency_seconds = args.latency
+
+    def call(index):
+        started_at = time.monotonic()
+        try:
+            router.complete('gpt-4', f'prompt {index}', 0.7)
+            outcome = 'ok'
+        except AdmissionRejected:
+            outcome = 'rejected'
+        except Exception:
+            outcome = 'provider_error'
+        return outcome, time.monotonic() - started_at
+
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(call, range(args.requests)))
+    elapsed = time.monotonic() - started_at
+
+    latencies = {outcome: [latency for o, latency in results if o == outcome] for outcome in ('ok', 'rejected', 'provider_error')}
+    return {
+        'seconds': round(elapsed, 2),
+        'ok': len(latencies['ok']),
+        'provider_errors': len(latencies['provider_error']),
+        'rejected_503': len(latencies['rejected']),
+        'provider_429s': provider.throttled,
+        'ok_p50_ms': percentile(latencies['ok'], 50),
+        'ok_p95_ms': percentile(latencies['ok'], 95),
+        'rejected_p95_ms': percentile(latencies['rejected'], 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=60)
+    parser.add_argument('--provider-rpm', type=float, default=1200, help='Cota do provedor stub')
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--guard-ratio', type=float, default=0.95, help='Fração da cota usada pelo limitador')
+    parser.add_argument('--max-concurrency', type=int, default=16)
+    parser.add_argument('--slo', type=float, default=5.0, help='Espera máxima na fila antes de recusar (s)')
+    parser.add_argument('--retries', type=int, default=2)
+    args = parser.parse_args()
+
+    results = {mode: run_mode(mode, args) for mode in ('unguarded', 'guarded')}
+    results['params'] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
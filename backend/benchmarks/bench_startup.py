@@ -0,0 +1,81 @@
+"""Benchmark: tempo de partida a frio (import de src.main) com orçamento
+
+Uso (a partir de backend/):
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 2500
+
+Cada rodada importa src.main em um processo novo com `python -X importtime`
+(banco SQLite temporário, sem workers da fila). Imprime JSON com a mediana
+do tempo total, os módulos mais caros e os SDKs de provedores carregados na
+partida. Sai com código 1 se a mediana passar do orçamento ou se algum SDK
+de provedor (que deve ser carregado só no primeiro uso) for importado, o
+que permite usar o script como verificação no CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SDKs que só podem ser importados quando o provedor correspondente é usado
+LAZY_MODULES = ('openai', 'anthropic', 'google.generativeai', 'qdrant_client', 'bs4')
+
+
+def run_once(db_path: str):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', JOB_WORKERS='0', PYTHONPATH=BACKEND_DIR)
+    started_at = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    elapsed = time.monotonic() - started_at
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time: <self us> | <cumulativo us> | <módulo indentado>"
+        _, cumulative_us, name = line.split('|')
+        modules[name.strip()] = int(cumulative_us)
+    return elapsed, modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', '2500')))
+    parser.add_argument('--top', type=int, default=10, help='Módulos mais caros exibidos')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='pitchcraft-startup-'), 'startup.db')
+    run_once(db_path)  # cria o banco fora da medição
+
+    timings, modules = [], {}
+    for _ in range(args.runs):
+        elapsed, modules = run_once(db_path)
+        timings.append(elapsed)
+
+    median_ms = statistics.median(timings) * 1000
+    top_level = {name: us for name, us in modules.items() if name.startswith('src.') or '.' not in name}
+    results = {
+        'median_ms': round(median_ms, 1),
+        'runs_ms': [round(t * 1000, 1) for t in timings],
+        'budget_ms': args.budget_ms,
+        'import_src_main_ms': round(modules.get('src.main', 0) / 1000, 1),
+        'slowest_imports_ms': {
+            name: round(us / 1000, 1)
+            for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]
+        },
+        'eager_provider_sdks': [name for name in LAZY_MODULES if name in modules],
+    }
+    results['ok'] = median_ms <= args.budget_ms and not results['eager_provider_sdks']
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
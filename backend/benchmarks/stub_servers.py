@@ -0,0 +1,234 @@
+"""Servidores locais que substituem as dependências externas nos benchmarks de carga
+
+Uso (a partir de backend/), para subir os stubs à mão e apontar o app para eles:
+    python benchmarks/stub_servers.py --llm-port 8901 --site-port 8902 --llm-latency 0.3
+    OPENAI_BASE_URL=http://127.0.0.1:8901/v1 OPENAI_API_KEY=stub python src/main.py
+
+- StubLLMServer: API compatível com a OpenAI (POST /v1/chat/completions, com
+  e sem stream). Cada resposta espera --llm-latency segundos (tempo até o
+  primeiro token) mais completion_tokens / --llm-tokens-per-second, e o
+  conteúdo segue o formato que o AIService espera para cada prompt (pacote
+  JSON, narrativa, objeções ou perfil DISC).
+- StubWebsiteServer: site institucional de --site-bytes bytes para
+  scrape_company_website, com latência opcional.
+
+Os dois contam as chamadas atendidas (stats()), para o relatório do benchmark.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NARRATIVE_SECTIONS = {
+    'introduction': 'Sua equipe comercial perde horas montando propostas que não convertem.',
+    'problem_statement': 'Propostas genéricas ignoram o contexto e o perfil de quem decide.',
+    'solution_overview': 'Narrativas geradas a partir dos dados do cliente e do mercado.',
+    'benefits': 'Ciclo de vendas 30% mais curto e taxa de conversão maior.',
+    'social_proof': 'Mais de 200 empresas do setor já usam a plataforma.',
+    'call_to_action': 'Vamos agendar uma demonstração com o seu time esta semana?',
+}
+
+OBJECTIONS = [
+    {'objection': 'O investimento está acima do orçamento', 'response': 'O ROI cobre o custo no primeiro trimestre.', 'category': 'price', 'confidence_score': 0.85},
+    {'objection': 'Não é o momento de mudar de solução', 'response': 'A implantação acompanha o seu calendário.', 'category': 'timing', 'confidence_score': 0.78},
+    {'objection': 'Preciso consultar a diretoria', 'response': 'Preparamos uma apresentação para os decisores.', 'category': 'authority', 'confidence_score': 0.82},
+    {'objection': 'A ferramenta atual já atende', 'response': 'Integramos com ela e ampliamos os resultados.', 'category': 'need', 'confidence_score': 0.75},
+    {'objection': 'A equipe não terá tempo para treinamento', 'response': 'O onboarding leva duas horas e é assistido.', 'category': 'timing', 'confidence_score': 0.7},
+]
+
+
+def completion_text(prompt: str) -> str:
+    """Resposta no formato que o AIService espera para o tipo de prompt"""
+    if 'de uma só vez' in prompt:
+        return json.dumps({'disc_profile': 'D', 'narrative': NARRATIVE_SECTIONS, 'objections': OBJECTIONS}, ensure_ascii=False)
+    if 'perfil DISC predominante' in prompt:
+        return 'D'
+    if 'objeções comuns' in prompt:
+        return json.dumps(OBJECTIONS, ensure_ascii=False)
+    return '\n\n'.join(f"**{key.replace('_', ' ').capitalize()}**\n{text}" for key, text in NARRATIVE_SECTIONS.items())
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, handler):
+        super().__init__(('127.0.0.1', port), handler)
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def count(self, **values):
+        with self._stats_lock:
+            for key, value in values.items():
+                self._stats[key] = self._stats.get(key, 0) + value
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def handle_error(self, request, client_address):
+        # Cliente que encerra a conexão antes do fim da resposta (extração em streaming)
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _LLMHandler(_QuietHandler):
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, b'{"error": {"message": "not found"}}', 'application/json')
+            return
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        prompt = ''.join(str(message.get('content', '')) for message in payload.get('messages', []))
+        text = completion_text(prompt)
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        self.server.count(requests=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+        time.sleep(self.server.latency)
+        generation_seconds = completion_tokens / self.server.tokens_per_second if self.server.tokens_per_second > 0 else 0
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        model = payload.get('model', 'stub')
+
+        if payload.get('stream'):
+            self._stream(completion_id, model, text, generation_seconds)
+            return
+
+        time.sleep(generation_seconds)
+        body = json.dumps({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens, 'total_tokens': prompt_tokens + completion_tokens},
+        }).encode()
+        self._send(200, body, 'application/json')
+
+    def _stream(self, completion_id: str, model: str, text: str, generation_seconds: float):
+        chunks = [text[i:i + 32] for i in range(0, len(text), 32)] or ['']
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for chunk in chunks:
+            time.sleep(generation_seconds / len(chunks))
+            event = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}],
+            }
+            self.wfile.write(f'data: {json.dumps(event)}\n\n'.encode())
+            self.wfile.flush()
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.close_connection = True
+
+
+class _WebsiteHandler(_QuietHandler):
+    def do_GET(self):
+        self.server.count(requests=1)
+        time.sleep(self.server.latency)
+        self._send(200, self.server.page, 'text/html; charset=utf-8')
+
+
+class StubLLMServer(_StubServer):
+    """API de chat completions compatível com a OpenAI, com latência e vazão de tokens configuráveis"""
+
+    def __init__(self, port: int = 0, latency: float = 0.3, tokens_per_second: float = 0):
+        super().__init__(port, _LLMHandler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+
+    @property
+    def base_url(self) -> str:
+        """Valor para OPENAI_BASE_URL"""
+        return f'{self.url}/v1'
+
+
+class StubWebsiteServer(_StubServer):
+    """Site institucional servido em qualquer caminho, com tamanho e latência configuráveis"""
+
+    def __init__(self, port: int = 0, latency: float = 0.0, page_bytes: int = 50_000, script_bytes: int = 0):
+        super().__init__(port, _WebsiteHandler)
+        self.latency = latency
+        self.page = build_page(page_bytes, script_bytes)
+
+
+def build_page(page_bytes: int, script_bytes: int = 0) -> bytes:
+    """Página de page_bytes bytes; script_bytes de JavaScript inline no <head>, como nos sites de marketing"""
+    script = f'<script>var bundle = "{"x" * script_bytes}";</script>' if script_bytes else ''
+    head = (
+        '<html><head><title>Empresa Stub | Soluções B2B</title>'
+        '<meta name="description" content="Plataforma de automação comercial para empresas B2B">'
+        f'{script}</head><body><h1>Empresa Stub</h1>'
+    )
+    paragraph = '<p>Ajudamos equipes de vendas a fechar mais negócios com dados, automação e atendimento consultivo.</p>\n'
+    body = [head]
+    size = len(head)
+    while size < page_bytes:
+        body.append(paragraph)
+        size += len(paragraph)
+    body.append('</body></html>')
+    return ''.join(body).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--llm-port', type=int, default=8901)
+    parser.add_argument('--site-port', type=int, default=8902)
+    parser.add_argument('--llm-latency', type=float, default=0.3, help='Segundos até o primeiro token')
+    parser.add_argument('--llm-tokens-per-second', type=float, default=0, help='Vazão de geração (0 = instantânea)')
+    parser.add_argument('--site-latency', type=float, default=0.0)
+    parser.add_argument('--site-bytes', type=int, default=50_000)
+    args = parser.parse_args()
+
+    llm = StubLLMServer(args.llm_port, args.llm_latency, args.llm_tokens_per_second).start()
+    site = StubWebsiteServer(args.site_port, args.site_latency, args.site_bytes).start()
+    print(f'OPENAI_BASE_URL={llm.base_url}')
+    print(f'site: {site.url}')
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print(json.dumps({'llm': llm.stats(), 'site': site.stats()}, indent=2))
+    finally:
+        llm.stop()
+        site.stop()
+
+
+if __name__ == '__main__':
+    main()
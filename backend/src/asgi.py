@@ -0,0 +1,126 @@
+"""Entrada ASGI: `uvicorn src.asgi:app --workers 2`
+
+As rotas que passam a maior parte do tempo esperando o modelo ou sites
+externos (geração de narrativa, objeções e enriquecimento) rodam como
+corrotinas nativas: as chamadas de IA usam os clientes assíncronos dos
+provedores e o banco roda em threads, de modo que um único processo atende
+centenas de requisições simultâneas sem uma thread parada por requisição.
+
+Todas as demais rotas (e as mesmas rotas com ?async=true, que só enfileiram
+um job) continuam no app Flask, executado em um pool de threads pela ponte
+WSGI do a2wsgi. O modo síncrono (`python src/main.py`, gunicorn) segue inalterado.
+"""
+import json
+import math
+import os
+import re
+
+from a2wsgi import WSGIMiddleware
+from anyio import to_thread
+
+from src.main import app as flask_app
+from src.routes import pitchcraft
+from src.routes.pitchcraft import job_queue
+from src.services.metrics import metrics
+from src.services.rate_limiter import AdmissionRejected
+
+# Rotas atendidas diretamente no event loop: (método, padrão do caminho, handler assíncrono, regra Flask equivalente)
+ASYNC_ROUTES = [
+    ('POST', re.compile(r'^/api/projects/(\d+)/generate-narrative$'), pitchcraft._run_generate_narrative_async,
+     '/api/projects/<int:project_id>/generate-narrative'),
+    ('POST', re.compile(r'^/api/projects/(\d+)/objections$'), pitchcraft._run_generate_objections_async,
+     '/api/projects/<int:project_id>/objections'),
+    ('POST', re.compile(r'^/api/projects/(\d+)/enrich-data$'), pitchcraft._run_enrich_project_data_async,
+     '/api/projects/<int:project_id>/enrich-data'),
+]
+
+# Threads disponíveis para as requisições encaminhadas ao Flask (respostas em streaming, como SSE, seguem bloco a bloco)
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '40'))
+wsgi_app = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+
+def _match_async_route(scope):
+    query = scope.get('query_string', b'').decode('latin1')
+    if re.search(r'(^|&)async=(1|true|yes)(&|$)', query, re.IGNORECASE):
+        # Pedido de job em segundo plano: a própria rota Flask enfileira e responde 202
+        return None, None, None
+    for method, pattern, handler, rule in ASYNC_ROUTES:
+        match = pattern.match(scope['path'])
+        if match and scope['method'] == method:
+            return handler, int(match.group(1)), rule
+    return None, None, None
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def _send_json(send, status: int, body: bytes, scope, extra_headers=()) -> None:
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    headers.extend(extra_headers)
+    if any(name == b'origin' for name, _ in scope.get('headers', [])):
+        # Mesmo comportamento do @cross_origin() das rotas Flask
+        headers.append((b'access-control-allow-origin', b'*'))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _handle_async_route(scope, receive, send, handler, project_id, rule) -> None:
+    # Mesma medição das rotas Flask (metrics.init_app): etapas no Server-Timing e histograma por rota
+    metrics_handle = metrics.begin_request()
+    body = await _read_body(receive)
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+
+    headers = []
+    with flask_app.app_context():
+        try:
+            status, result = 200, await handler(project_id, data)
+        except AdmissionRejected as e:
+            # Mesmo 503 das rotas Flask (_overloaded_response)
+            status, result = 503, {'error': str(e), 'retry_after': round(e.retry_after, 1)}
+            headers.append((b'retry-after', str(max(1, math.ceil(e.retry_after))).encode()))
+        except Exception as e:
+            status, result = 500, {'error': str(e)}
+        payload = flask_app.json.dumps(result).encode('utf-8')
+    server_timing = metrics.end_request(metrics_handle, scope['method'], rule, status)
+    if server_timing:
+        headers.append((b'server-timing', server_timing.encode('latin1')))
+    await _send_json(send, status, payload, scope, headers)
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await to_thread.run_sync(job_queue.shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    handler, project_id, rule = _match_async_route(scope)
+    if handler is not None:
+        await _handle_async_route(scope, receive, send, handler, project_id, rule)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -0,0 +1,38 @@
+import click
+import json
+from flask.cli import AppGroup
+from src.services.blob_storage import migrate_legacy_json, storage_report
+from src.services.objection_store import dedupe_objections
+
+storage_cli = AppGroup('storage', help='Armazenamento deduplicado de JSON (tabela json_blob)')
+
+
+@storage_cli.command('migrate-blobs')
+@click.option('--batch-size', default=500, show_default=True, help='Linhas migradas por transação')
+def migrate_blobs(batch_size):
+    """Migrar colunas JSON antigas para a tabela de blobs e exibir a economia de espaço"""
+    result = migrate_legacy_json(batch_size=batch_size)
+    result['report'] = storage_report()
+    click.echo(json.dumps(result, indent=2))
+
+
+@storage_cli.command('report')
+def report():
+    """Exibir o espaço economizado pela deduplicação e compressão"""
+    click.echo(json.dumps(storage_report(), indent=2))
+
+
+objections_cli = AppGroup('objections', help='Manutenção da tabela de objeções')
+
+
+@objections_cli.command('dedupe')
+@click.option('--batch-size', default=500, show_default=True, help='Linhas por transação ao preencher os hashes')
+def dedupe(batch_size):
+    """Colapsar objeções duplicadas por projeto e criar o índice único de texto normalizado"""
+    click.echo(json.dumps(dedupe_objections(batch_size=batch_size), indent=2))
+
+
+def register_commands(app) -> None:
+    """Registrar os comandos `flask --app src.main ...` da aplicação"""
+    app.cli.add_command(storage_cli)
+    app.cli.add_command(objections_cli)
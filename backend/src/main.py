@@ -6,9 +6,12 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
+from src.models.db_profile import apply_sqlite_pragmas, configure_database, ensure_columns, ensure_indexes
 from src.models.pitchcraft import User, Project, Presentation, ClientProfile, MarketIntelligence, Objection
 from src.routes.user import user_bp
-from src.routes.pitchcraft import pitchcraft_bp
+from src.routes.pitchcraft import pitchcraft_bp, job_queue
+from src.services.metrics import metrics
+from src.commands import register_commands
 from dotenv import load_dotenv
 
 # Carregar variáveis de ambiente
@@ -24,13 +27,26 @@ CORS(app, origins=['http://localhost:5173', 'http://localhost:3000'])
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(pitchcraft_bp, url_prefix='/api')
 
-# Configurar banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}")
+# Duração por etapa (Server-Timing) e métricas do Prometheus em /api/metrics
+metrics.init_app(app)
+
+# Configurar banco de dados (pool, PRAGMAs do SQLite, colunas novas e índices: src/models/db_profile.py)
+configure_database(app, os.getenv('DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
 with app.app_context():
+    apply_sqlite_pragmas(db.engine)
+    metrics.instrument_engine(db.engine)
     db.create_all()
+    ensure_columns(db)
+    ensure_indexes(db)
+
+# Comandos de manutenção (flask --app src.main storage ...)
+register_commands(app)
+
+# Workers da fila de tarefas assíncronas
+job_queue.init_app(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
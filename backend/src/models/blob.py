@@ -0,0 +1,121 @@
+from src.models.user import db
+from sqlalchemy import insert, select
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional
+import hashlib
+import os
+import threading
+import zlib
+
+
+class JSONBlob(db.Model):
+    """Conteúdo JSON endereçado pelo hash: payloads idênticos são gravados uma única vez"""
+    __tablename__ = 'json_blob'
+
+    hash = db.Column(db.String(64), primary_key=True)  # sha256 do texto JSON
+    data = db.Column(db.LargeBinary, nullable=False)  # texto JSON comprimido com zlib
+    raw_size = db.Column(db.Integer, nullable=False)
+    compressed_size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Blobs são imutáveis, então o texto já descomprimido pode ficar em memória sem invalidação
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_MAX_ENTRIES = int(os.getenv('BLOB_CACHE_MAX_ENTRIES', '256'))
+_COMPRESSION_LEVEL = int(os.getenv('BLOB_COMPRESSION_LEVEL', '6'))
+
+
+def blob_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _remember(digest: str, text: str) -> None:
+    with _cache_lock:
+        _cache[digest] = text
+        _cache.move_to_end(digest)
+        while len(_cache) > _CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def _insert_ignoring_duplicates(values: dict) -> None:
+    table = JSONBlob.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        db.session.execute(dialect_insert(table).values(**values).on_conflict_do_nothing(index_elements=['hash']))
+    elif db.session.execute(select(table.c.hash).where(table.c.hash == values['hash'])).first() is None:
+        db.session.execute(insert(table).values(**values))
+
+
+def store_blob(text: str) -> str:
+    """Gravar o texto JSON (se ainda não existir) na transação da sessão atual; retorna o hash"""
+    raw = text.encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()
+    data = zlib.compress(raw, _COMPRESSION_LEVEL)
+    _insert_ignoring_duplicates({
+        'hash': digest,
+        'data': data,
+        'raw_size': len(raw),
+        'compressed_size': len(data),
+        'created_at': datetime.utcnow()
+    })
+    return digest
+
+
+def load_blob(digest: str) -> Optional[str]:
+    with _cache_lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+    data = db.session.execute(
+        select(JSONBlob.__table__.c.data).where(JSONBlob.__table__.c.hash == digest)
+    ).scalar()
+    if data is None:
+        return None
+    text = zlib.decompress(data).decode('utf-8')
+    _remember(digest, text)
+    return text
+
+
+def prefetch_blobs(digests: Iterable[Optional[str]]) -> None:
+    """Carregar vários blobs em uma só consulta (ex.: todas as apresentações de um projeto)"""
+    with _cache_lock:
+        missing = {digest for digest in digests if digest and digest not in _cache}
+    if not missing:
+        return
+    table = JSONBlob.__table__
+    for digest, data in db.session.execute(select(table.c.hash, table.c.data).where(table.c.hash.in_(missing))):
+        _remember(digest, zlib.decompress(data).decode('utf-8'))
+
+
+class BlobJSON:
+    """Atributo com o texto JSON guardado na tabela de blobs
+
+    Lê e escreve texto JSON como a coluna Text original, mas persiste apenas o
+    hash em `hash_attr`. Linhas ainda não migradas continuam sendo lidas da
+    coluna antiga (`legacy_attr`).
+    """
+
+    def __init__(self, hash_attr: str, legacy_attr: str):
+        self.hash_attr = hash_attr
+        self.legacy_attr = legacy_attr
+
+    def __get__(self, obj, owner):
+        if obj is None:
+            return self
+        digest = getattr(obj, self.hash_attr)
+        if digest:
+            return load_blob(digest)
+        return getattr(obj, self.legacy_attr)
+
+    def __set__(self, obj, value: Optional[str]) -> None:
+        setattr(obj, self.hash_attr, store_blob(value) if value is not None else None)
+        setattr(obj, self.legacy_attr, None)
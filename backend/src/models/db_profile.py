@@ -0,0 +1,123 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from typing import Dict, List
+import os
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """PRAGMAs aplicados a cada conexão SQLite (DB_SQLITE_* no ambiente)
+
+    WAL deixa leitores e o escritor trabalharem ao mesmo tempo; synchronous=NORMAL
+    é seguro com WAL (só o último commit pode se perder numa queda de energia) e
+    busy_timeout faz um segundo escritor aguardar em vez de falhar com
+    "database is locked".
+    """
+    pragmas = {
+        'synchronous': os.getenv('DB_SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': os.getenv('DB_SQLITE_BUSY_TIMEOUT_MS', '5000'),
+    }
+    if _env_flag('DB_SQLITE_WAL', 'true'):
+        pragmas['journal_mode'] = 'WAL'
+    return pragmas
+
+
+def engine_options(database_uri: str) -> Dict:
+    """SQLALCHEMY_ENGINE_OPTIONS para o banco configurado
+
+    Postgres: pool dimensionado para os workers (DB_POOL_SIZE + DB_MAX_OVERFLOW
+    conexões), pre-ping para descartar conexões derrubadas pelo servidor e
+    reciclagem periódica. SQLite em arquivo usa as mesmas opções de pool; em
+    memória, fica com o pool padrão do SQLAlchemy.
+    """
+    url = make_url(database_uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', 'true'),
+    }
+    recycle = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    if recycle > 0:
+        options['pool_recycle'] = recycle
+    return options
+
+
+def apply_sqlite_pragmas(engine: Engine) -> None:
+    """Registrar os PRAGMAs para cada nova conexão do engine (sem efeito fora do SQLite)"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def configure_database(app, database_uri: str) -> None:
+    """Aplicar o perfil de banco à aplicação (antes de db.init_app)"""
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(engine_options(database_uri))
+
+
+def ensure_indexes(db) -> List[str]:
+    """Criar em bancos já existentes os índices declarados nos modelos (create_all só cria tabelas novas)
+
+    Índices únicos ficam de fora: podem exigir limpeza prévia dos dados
+    (ex.: `flask --app src.main objections dedupe`). Retorna os índices criados.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.unique or index.name in existing:
+                continue
+            index.create(db.engine)
+            created.append(index.name)
+    return created
+
+
+def ensure_columns(db) -> List[str]:
+    """Adicionar em tabelas já existentes as colunas anuláveis declaradas depois da criação
+
+    Chaves estrangeiras anuláveis (ex.: as colunas *_hash que apontam para
+    json_blob) entram com REFERENCES; colunas obrigatórias ou de chave primária
+    ficam de fora (precisam de migração com preenchimento). Retorna as colunas
+    criadas como "tabela.coluna".
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    quote = db.engine.dialect.identifier_preparer.quote
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable or column.primary_key:
+                continue
+            definition = f'{quote(column.name)} {column.type.compile(dialect=db.engine.dialect)}'
+            for foreign_key in column.foreign_keys:
+                target = foreign_key.column
+                definition += f' REFERENCES {quote(target.table.name)} ({quote(target.name)})'
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE {quote(table.name)} ADD COLUMN {definition}')
+            created.append(f'{table.name}.{column.name}')
+    return created
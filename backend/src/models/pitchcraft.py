@@ -1,9 +1,12 @@
-from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from src.models.blob import BlobJSON
 from datetime import datetime
-
-db = SQLAlchemy()
+import json
 
 class User(db.Model):
+    # Tabela própria para não colidir com o modelo de usuário de src.models.user
+    __tablename__ = 'pitchcraft_user'
+
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -13,7 +16,7 @@ class User(db.Model):
 
 class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('pitchcraft_user.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     project_type = db.Column(db.String(50))  # pitch_vendas, proposta_comercial, etc.
@@ -22,18 +25,53 @@ class Project(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Índices da listagem paginada por (updated_at, id), com e sem filtros
+    __table_args__ = (
+        db.Index('ix_project_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_project_status_updated_at_id', 'status', 'updated_at', 'id'),
+        db.Index('ix_project_type_updated_at_id', 'project_type', 'updated_at', 'id'),
+        db.Index('ix_project_user_updated_at_id', 'user_id', 'updated_at', 'id'),
+    )
+
+    # Relacionamentos (lazy por padrão; as rotas escolhem o carregamento antecipado)
+    presentations = db.relationship('Presentation', backref='project', order_by='Presentation.id')
+    client_profile = db.relationship('ClientProfile', backref='project', uselist=False)
+    market_intelligence = db.relationship('MarketIntelligence', backref='project', uselist=False)
+    objections = db.relationship('Objection', backref='project', order_by='Objection.id')
+
 class Presentation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False, index=True)
     title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text)  # JSON com slides
+    # JSON com slides, guardado na tabela de blobs; a coluna antiga só é lida em linhas não migradas
+    content_hash = db.Column(db.String(64), db.ForeignKey('json_blob.hash'))
+    content_legacy = db.Column('content', db.Text)
+    content = BlobJSON('content_hash', 'content_legacy')
     style_config = db.Column(db.Text)  # JSON com configurações de estilo
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class PresentationVersion(db.Model):
+    """Histórico de uma apresentação: snapshots periódicos + deltas JSON Patch entre versões"""
+    __tablename__ = 'presentation_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    presentation_id = db.Column(db.Integer, db.ForeignKey('presentation.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # snapshot, delta
+    base_version = db.Column(db.Integer, nullable=False)  # snapshot a partir do qual a versão é reconstruída
+    snapshot_hash = db.Column(db.String(64), db.ForeignKey('json_blob.hash'))  # apenas snapshots
+    patch = db.Column(db.Text)  # JSON Patch em relação à versão anterior (apenas deltas)
+    message = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('presentation_id', 'version', name='uq_presentation_version'),
+    )
+
 class ClientProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False, index=True)
     company_name = db.Column(db.String(200))
     industry = db.Column(db.String(100))
     size = db.Column(db.String(50))
@@ -46,11 +84,20 @@ class ClientProfile(db.Model):
 
 class MarketIntelligence(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
-    industry_trends = db.Column(db.Text)  # JSON
-    competitor_analysis = db.Column(db.Text)  # JSON
-    news_insights = db.Column(db.Text)  # JSON
-    market_opportunities = db.Column(db.Text)  # JSON
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False, index=True)
+    # Colunas JSON deduplicadas na tabela de blobs (notícias e concorrência se repetem entre projetos)
+    industry_trends_hash = db.Column(db.String(64), db.ForeignKey('json_blob.hash'))
+    competitor_analysis_hash = db.Column(db.String(64), db.ForeignKey('json_blob.hash'))
+    news_insights_hash = db.Column(db.String(64), db.ForeignKey('json_blob.hash'))
+    market_opportunities_hash = db.Column(db.String(64), db.ForeignKey('json_blob.hash'))
+    industry_trends_legacy = db.Column('industry_trends', db.Text)
+    competitor_analysis_legacy = db.Column('competitor_analysis', db.Text)
+    news_insights_legacy = db.Column('news_insights', db.Text)
+    market_opportunities_legacy = db.Column('market_opportunities', db.Text)
+    industry_trends = BlobJSON('industry_trends_hash', 'industry_trends_legacy')
+    competitor_analysis = BlobJSON('competitor_analysis_hash', 'competitor_analysis_legacy')
+    news_insights = BlobJSON('news_insights_hash', 'news_insights_legacy')
+    market_opportunities = BlobJSON('market_opportunities_hash', 'market_opportunities_legacy')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -61,5 +108,60 @@ class Objection(db.Model):
     response_text = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50))  # price, timing, authority, need
     confidence_score = db.Column(db.Float)
+    text_hash = db.Column(db.String(64))  # sha256 do texto normalizado da objeção
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Uma objeção por texto normalizado em cada projeto (reenvios não duplicam linhas)
+    __table_args__ = (
+        db.Index('uq_objection_project_text_hash', 'project_id', 'text_hash', unique=True),
+    )
+
+
+class LLMCacheEntry(db.Model):
+    """Resposta de LLM armazenada por hash de (modelo, temperatura, prompt normalizado)"""
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    scope = db.Column(db.String(100), index=True)  # ex.: project:42, usado na invalidação
+    model = db.Column(db.String(50))
+    response = db.Column(db.Text, nullable=False)
+    hit_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, index=True)
+
+class Job(db.Model):
+    """Tarefa assíncrona executada pelos workers locais (fila persistida no banco)"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # generate_narrative, enrich_data, etc.
+    payload = db.Column(db.Text)  # JSON
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, succeeded, failed, cancelled
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)  # adiado em caso de retry
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    lease_expires_at = db.Column(db.DateTime)  # renovado pelo worker; vencido = worker caiu, tarefa volta à fila
+
+    # Consulta dos workers: status = 'queued' e available_at <= agora, pela ordem de available_at
+    __table_args__ = (
+        db.Index('ix_job_status_available_at_id', 'status', 'available_at', 'id'),
+    )
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
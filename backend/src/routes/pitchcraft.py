@@ -1,29 +1,132 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context, url_for
 from flask_cors import cross_origin
-from src.models.pitchcraft import db, Project, User, Presentation, ClientProfile, MarketIntelligence, Objection
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload, selectinload
+from src.models.pitchcraft import db, Project, User, Presentation, PresentationVersion, ClientProfile, MarketIntelligence, Job
+from src.models.blob import prefetch_blobs, store_blob
 from src.services.ai_service import AIService
 from src.services.data_integration import DataIntegrationService
+from src.services.llm_cache import project_scope
+from src.services.job_queue import JobQueue
+from src.services.blob_storage import storage_report
+from src.services.json_passthrough import passthrough_jsonify, raw_json
+from src.services.metrics import metrics
+from src.services.rate_limiter import AdmissionRejected
+from src.services.json_patch import JSONPatchError, apply_patch, merge_patch
+from src.services import slide_store
+from src.services.presentation_versions import PresentationVersioning
+from src.services.objection_library import ObjectionLibrary
+from src.services.objection_store import normalize_objection, upsert_objections
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import unquote
+import asyncio
+import base64
 import json
+import math
+import os
 
 pitchcraft_bp = Blueprint('pitchcraft', __name__)
 ai_service = AIService()
 data_service = DataIntegrationService()
+job_queue = JobQueue()
+objection_library = ObjectionLibrary()
+presentation_versions = PresentationVersioning()
+
+OBJECTION_DEFAULT_COUNT = 5
+OBJECTION_MAX_COUNT = 20
+
+# Projeto com todos os filhos em três consultas: perfis 1:1 via JOIN e coleções via SELECT IN
+PROJECT_DETAIL_OPTIONS = (
+    joinedload(Project.client_profile),
+    joinedload(Project.market_intelligence),
+    selectinload(Project.presentations),
+    selectinload(Project.objections),
+)
+
+def _overloaded_response(error):
+    """503 com Retry-After quando o controle de admissão recusa a chamada ao modelo"""
+    response = jsonify({'error': str(error), 'retry_after': round(error.retry_after, 1)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, math.ceil(error.retry_after)))
+    return response
+
+def _get_project(project_id, *options):
+    """Buscar projeto (ou 404) carregando antecipadamente os relacionamentos indicados"""
+    return Project.query.options(*options).filter_by(id=project_id).first_or_404()
+
+# Campos disponíveis na listagem de projetos (projeção via ?fields=)
+PROJECT_LIST_FIELDS = ('id', 'user_id', 'title', 'description', 'project_type', 'target_audience',
+                       'status', 'created_at', 'updated_at')
+PROJECT_LIST_DEFAULT_FIELDS = ('id', 'title', 'description', 'project_type', 'status', 'created_at', 'updated_at')
+PROJECT_LIST_DEFAULT_LIMIT = 50
+PROJECT_LIST_MAX_LIMIT = 200
+
+def _encode_cursor(updated_at, project_id):
+    raw = json.dumps([updated_at.isoformat(), project_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def _decode_cursor(cursor):
+    updated_at, project_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return datetime.fromisoformat(updated_at), int(project_id)
 
 @pitchcraft_bp.route('/projects', methods=['GET'])
-@cross_origin()
+@cross_origin(expose_headers=['X-Next-Cursor', 'Link'])
 def get_projects():
-    """Listar todos os projetos"""
+    """Listar projetos com paginação por cursor (updated_at, id), filtros e projeção de campos
+    
+    O corpo continua sendo uma lista; o cursor da próxima página vem no cabeçalho X-Next-Cursor.
+    """
     try:
-        projects = Project.query.all()
-        return jsonify([{
-            'id': p.id,
-            'title': p.title,
-            'description': p.description,
-            'project_type': p.project_type,
-            'status': p.status,
-            'created_at': p.created_at.isoformat(),
-            'updated_at': p.updated_at.isoformat()
-        } for p in projects])
+        fields = PROJECT_LIST_DEFAULT_FIELDS
+        if request.args.get('fields'):
+            fields = tuple(f.strip() for f in request.args['fields'].split(',') if f.strip())
+            invalid = [f for f in fields if f not in PROJECT_LIST_FIELDS]
+            if invalid:
+                return jsonify({'error': f'Campos inválidos: {", ".join(invalid)}'}), 400
+        
+        limit = min(max(request.args.get('limit', PROJECT_LIST_DEFAULT_LIMIT, type=int), 1), PROJECT_LIST_MAX_LIMIT)
+        
+        # Apenas as colunas exibidas, mais as da chave de paginação
+        columns = {name: getattr(Project, name) for name in set(fields) | {'id', 'updated_at'}}
+        query = db.session.query(*columns.values())
+        
+        for name in ('status', 'project_type'):
+            if request.args.get(name):
+                query = query.filter(getattr(Project, name) == request.args[name])
+        if request.args.get('user_id'):
+            query = query.filter(Project.user_id == request.args.get('user_id', type=int))
+        
+        if request.args.get('cursor'):
+            try:
+                cursor_updated_at, cursor_id = _decode_cursor(request.args['cursor'])
+            except (ValueError, TypeError):
+                return jsonify({'error': 'Cursor inválido'}), 400
+            query = query.filter(or_(
+                Project.updated_at < cursor_updated_at,
+                and_(Project.updated_at == cursor_updated_at, Project.id < cursor_id)
+            ))
+        
+        rows = query.order_by(Project.updated_at.desc(), Project.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        projects = []
+        for row in rows:
+            item = {}
+            for name in fields:
+                value = getattr(row, name)
+                item[name] = value.isoformat() if isinstance(value, datetime) else value
+            projects.append(item)
+        
+        response = jsonify(projects)
+        if has_more:
+            next_cursor = _encode_cursor(rows[-1].updated_at, rows[-1].id)
+            response.headers['X-Next-Cursor'] = next_cursor
+            next_args = request.args.to_dict()
+            next_args['cursor'] = next_cursor
+            response.headers['Link'] = f'<{url_for("pitchcraft.get_projects", **next_args)}>; rel="next"'
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -68,20 +171,41 @@ def create_project():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _deck_payload(content_text, include_slides=False):
+    """Conteúdo da apresentação para respostas: metadados do deck e, se pedido, os slides como estão gravados"""
+    if not content_text:
+        return None
+    deck = json.loads(content_text)
+    payload = slide_store.summary(deck)
+    if include_slides and isinstance(payload, dict):
+        payload['slides'] = [raw_json(text) for text in slide_store.slide_texts(deck)]
+    return payload
+
 @pitchcraft_bp.route('/projects/<int:project_id>', methods=['GET'])
 @cross_origin()
 def get_project(project_id):
     """Obter detalhes de um projeto específico"""
     try:
-        project = Project.query.get_or_404(project_id)
+        project = _get_project(project_id, *PROJECT_DETAIL_OPTIONS)
         
-        # Buscar dados relacionados
-        presentations = Presentation.query.filter_by(project_id=project_id).all()
-        client_profile = ClientProfile.query.filter_by(project_id=project_id).first()
-        market_intelligence = MarketIntelligence.query.filter_by(project_id=project_id).first()
-        objections = Objection.query.filter_by(project_id=project_id).all()
+        # Dados relacionados já carregados junto com o projeto
+        presentations = project.presentations
+        client_profile = project.client_profile
+        market_intelligence = project.market_intelligence
+        objections = project.objections
         
-        return jsonify({
+        # Slides só vêm completos com ?include=slides; o editor carrega os demais sob demanda
+        include_slides = request.args.get('include') == 'slides'
+        
+        # Conteúdo JSON dos blobs em uma única consulta
+        blob_hashes = [p.content_hash for p in presentations]
+        if market_intelligence:
+            blob_hashes += [market_intelligence.industry_trends_hash, market_intelligence.competitor_analysis_hash,
+                            market_intelligence.news_insights_hash, market_intelligence.market_opportunities_hash]
+        prefetch_blobs(blob_hashes)
+        
+        # Colunas JSON vão para a resposta como estão gravadas, sem decodificar/recodificar
+        return passthrough_jsonify({
             'id': project.id,
             'title': project.title,
             'description': project.description,
@@ -93,8 +217,9 @@ def get_project(project_id):
             'presentations': [{
                 'id': p.id,
                 'title': p.title,
-                'content': json.loads(p.content) if p.content else None,
-                'style_config': json.loads(p.style_config) if p.style_config else None,
+                'content': _deck_payload(p.content, include_slides),
+                'slides_url': url_for('pitchcraft.get_presentation_slides', presentation_id=p.id),
+                'style_config': raw_json(p.style_config),
                 'created_at': p.created_at.isoformat()
             } for p in presentations],
             'client_profile': {
@@ -104,13 +229,13 @@ def get_project(project_id):
                 'disc_profile': client_profile.disc_profile if client_profile else None,
                 'pain_points': client_profile.pain_points if client_profile else None,
                 'goals': client_profile.goals if client_profile else None,
-                'decision_makers': json.loads(client_profile.decision_makers) if client_profile and client_profile.decision_makers else None
+                'decision_makers': raw_json(client_profile.decision_makers) if client_profile else None
             } if client_profile else None,
             'market_intelligence': {
-                'industry_trends': json.loads(market_intelligence.industry_trends) if market_intelligence and market_intelligence.industry_trends else None,
-                'competitor_analysis': json.loads(market_intelligence.competitor_analysis) if market_intelligence and market_intelligence.competitor_analysis else None,
-                'news_insights': json.loads(market_intelligence.news_insights) if market_intelligence and market_intelligence.news_insights else None,
-                'market_opportunities': json.loads(market_intelligence.market_opportunities) if market_intelligence and market_intelligence.market_opportunities else None
+                'industry_trends': raw_json(market_intelligence.industry_trends),
+                'competitor_analysis': raw_json(market_intelligence.competitor_analysis),
+                'news_insights': raw_json(market_intelligence.news_insights),
+                'market_opportunities': raw_json(market_intelligence.market_opportunities)
             } if market_intelligence else None,
             'objections': [{
                 'id': o.id,
@@ -123,51 +248,201 @@ def get_project(project_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _wants_async():
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def _enqueue_project_job(kind, project_id, data):
+    """Enfileirar a tarefa e responder imediatamente com o id do job"""
+    Project.query.get_or_404(project_id)
+    job = job_queue.enqueue(kind, {'project_id': project_id, 'data': data})
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('pitchcraft.get_job', job_id=job.id)
+    }), 202
+
+def _load_narrative_inputs(project):
+    """Montar os dados de projeto, cliente e mercado usados na geração da narrativa"""
+    client_profile = project.client_profile
+    market_intelligence = project.market_intelligence
+    
+    project_data = {
+        'project_type': project.project_type,
+        'description': project.description,
+        'target_audience': project.target_audience
+    }
+    
+    client_data = {}
+    if client_profile:
+        client_data = {
+            'company_name': client_profile.company_name,
+            'industry': client_profile.industry,
+            'size': client_profile.size,
+            'disc_profile': client_profile.disc_profile,
+            'pain_points': client_profile.pain_points,
+            'goals': client_profile.goals
+        }
+    
+    market_data = {}
+    if market_intelligence:
+        market_data = {
+            'industry_trends': json.loads(market_intelligence.industry_trends) if market_intelligence.industry_trends else {},
+            'competitor_analysis': json.loads(market_intelligence.competitor_analysis) if market_intelligence.competitor_analysis else {},
+            'market_opportunities': json.loads(market_intelligence.market_opportunities) if market_intelligence.market_opportunities else {}
+        }
+    
+    return project_data, client_data, market_data
+
+def _project_inputs(project_id):
+    """Carregar o projeto (ou 404) e montar os dados de entrada da IA"""
+    project = _get_project(project_id, joinedload(Project.client_profile), joinedload(Project.market_intelligence))
+    return _load_narrative_inputs(project)
+
+def _generate_project_narrative(project_id, project_data, client_data, market_data):
+    """Narrativa do projeto, vinda do pacote único quando o modo bundle está ativo"""
+    if ai_service.bundle_enabled:
+        return ai_service.generate_pitch_bundle(project_data, client_data, market_data)['narrative']
+    return ai_service.generate_narrative(project_data, client_data, market_data, cache_scope=project_scope(project_id))
+
+async def _generate_project_narrative_async(project_id, project_data, client_data, market_data):
+    if ai_service.bundle_enabled:
+        return (await ai_service.generate_pitch_bundle_async(project_data, client_data, market_data))['narrative']
+    return await ai_service.generate_narrative_async(project_data, client_data, market_data, cache_scope=project_scope(project_id))
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _db_call(func, *args):
+    """Executar um trecho com acesso ao banco em uma thread e devolver a conexão ao pool
+    
+    No modo ASGI a requisição fica suspensa enquanto aguarda o modelo; sem
+    fechar a sessão, cada requisição em espera seguraria uma conexão do pool.
+    """
+    def call():
+        try:
+            return func(*args)
+        finally:
+            db.session.close()
+    return await asyncio.to_thread(call)
+
+def _run_generate_narrative(project_id, data):
+    # Preparar dados para a IA
+    project_data, client_data, market_data = _project_inputs(project_id)
+    
+    # Gerar narrativa com IA
+    narrative = _generate_project_narrative(project_id, project_data, client_data, market_data)
+    
+    return {
+        'project_id': project_id,
+        'narrative': narrative
+    }
+
+async def _run_generate_narrative_async(project_id, data):
+    """Mesma resposta de _run_generate_narrative; o banco roda em thread e o modelo é aguardado (modo ASGI)"""
+    project_data, client_data, market_data = await _db_call(_project_inputs, project_id)
+    narrative = await _generate_project_narrative_async(project_id, project_data, client_data, market_data)
+    return {
+        'project_id': project_id,
+        'narrative': narrative
+    }
+
 @pitchcraft_bp.route('/projects/<int:project_id>/generate-narrative', methods=['POST'])
 @cross_origin()
 def generate_narrative(project_id):
     """Gerar narrativa comercial usando IA"""
     try:
-        data = request.get_json()
-        project = Project.query.get_or_404(project_id)
-        
-        # Buscar dados do cliente e mercado
-        client_profile = ClientProfile.query.filter_by(project_id=project_id).first()
-        market_intelligence = MarketIntelligence.query.filter_by(project_id=project_id).first()
-        
-        # Preparar dados para a IA
-        project_data = {
-            'project_type': project.project_type,
-            'description': project.description,
-            'target_audience': project.target_audience
-        }
-        
-        client_data = {}
-        if client_profile:
-            client_data = {
-                'company_name': client_profile.company_name,
-                'industry': client_profile.industry,
-                'size': client_profile.size,
-                'disc_profile': client_profile.disc_profile,
-                'pain_points': client_profile.pain_points,
-                'goals': client_profile.goals
-            }
-        
-        market_data = {}
-        if market_intelligence:
-            market_data = {
-                'industry_trends': json.loads(market_intelligence.industry_trends) if market_intelligence.industry_trends else {},
-                'competitor_analysis': json.loads(market_intelligence.competitor_analysis) if market_intelligence.competitor_analysis else {},
-                'market_opportunities': json.loads(market_intelligence.market_opportunities) if market_intelligence.market_opportunities else {}
-            }
-        
-        # Gerar narrativa com IA
-        narrative = ai_service.generate_narrative(project_data, client_data, market_data)
+        data = request.get_json(silent=True) or {}
+        if _wants_async():
+            return _enqueue_project_job('generate_narrative', project_id, data)
+        return jsonify(_run_generate_narrative(project_id, data))
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/projects/generate-narrative/batch', methods=['POST'])
+@cross_origin()
+def generate_narrative_batch():
+    """Gerar narrativas para vários projetos, com concorrência limitada, em NDJSON
+    
+    Cada linha traz o resultado de um projeto assim que ele termina; erros de um item
+    não interrompem o lote. A última linha resume o lote.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        project_ids = [int(pid) for pid in data.get('project_ids', [])]
+        if not project_ids:
+            return jsonify({'error': 'Informe project_ids'}), 400
+        
+        max_concurrency = int(os.getenv('BATCH_MAX_CONCURRENCY', '4'))
+        concurrency = min(max(int(data.get('concurrency', max_concurrency)), 1), max_concurrency)
+        
+        # Carregar todos os projetos (e filhos 1:1) de uma vez no thread da requisição
+        projects = Project.query.options(
+            joinedload(Project.client_profile),
+            joinedload(Project.market_intelligence)
+        ).filter(Project.id.in_(project_ids)).all()
+        inputs = {project.id: _load_narrative_inputs(project) for project in projects}
+        app = current_app._get_current_object()
+        
+        def generate_one(project_id):
+            with app.app_context():
+                project_data, client_data, market_data = inputs[project_id]
+                return _generate_project_narrative(project_id, project_data, client_data, market_data)
+        
+        def generate():
+            succeeded = failed = 0
+            for project_id in dict.fromkeys(project_ids):
+                if project_id not in inputs:
+                    failed += 1
+                    yield json.dumps({'project_id': project_id, 'status': 'error', 'error': 'Projeto não encontrado'}) + '\n'
+            
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='narrative-batch')
+            try:
+                futures = {executor.submit(generate_one, project_id): project_id for project_id in inputs}
+                for future in as_completed(futures):
+                    project_id = futures[future]
+                    try:
+                        line = {'project_id': project_id, 'status': 'success', 'narrative': future.result()}
+                        succeeded += 1
+                    except Exception as e:
+                        line = {'project_id': project_id, 'status': 'error', 'error': str(e)}
+                        failed += 1
+                    yield json.dumps(line, ensure_ascii=False) + '\n'
+            finally:
+                # Se o cliente desconectar, os itens ainda não iniciados são descartados
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            yield json.dumps({'summary': {'total': succeeded + failed, 'succeeded': succeeded, 'failed': failed}}) + '\n'
         
-        return jsonify({
-            'project_id': project_id,
-            'narrative': narrative
-        })
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/projects/<int:project_id>/generate-narrative/stream', methods=['GET'])
+@cross_origin()
+def stream_narrative(project_id):
+    """Gerar narrativa comercial via Server-Sent Events, seção a seção"""
+    try:
+        project_data, client_data, market_data = _project_inputs(project_id)
+        
+        def generate():
+            if ai_service.bundle_enabled:
+                # Mesma narrativa de POST /generate-narrative, reaproveitando o pacote em cache
+                events = ai_service.stream_bundle_narrative(project_data, client_data, market_data)
+            else:
+                events = ai_service.stream_narrative(project_data, client_data, market_data, cache_scope=project_scope(project_id))
+            for event, payload in events:
+                if event == 'narrative':
+                    # Evento final no mesmo formato de POST /generate-narrative
+                    payload = {'project_id': project_id, 'narrative': payload}
+                yield _sse_event(event, payload)
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -177,10 +452,10 @@ def create_or_update_client_profile(project_id):
     """Criar ou atualizar perfil do cliente"""
     try:
         data = request.get_json()
-        project = Project.query.get_or_404(project_id)
+        project = _get_project(project_id, joinedload(Project.client_profile))
         
         # Buscar perfil existente ou criar novo
-        client_profile = ClientProfile.query.filter_by(project_id=project_id).first()
+        client_profile = project.client_profile
         if not client_profile:
             client_profile = ClientProfile(project_id=project_id)
         
@@ -192,17 +467,17 @@ def create_or_update_client_profile(project_id):
         client_profile.goals = data.get('goals', '')
         client_profile.decision_makers = json.dumps(data.get('decision_makers', []))
         
-        # Analisar perfil DISC se não fornecido
+        # Analisar perfil DISC se não fornecido (chamada leve; o pacote completo só é gerado
+        # pelas rotas de narrativa e objeções, já com a inteligência de mercado enriquecida)
         if not data.get('disc_profile'):
-            disc_profile = ai_service.analyze_disc_profile(data)
-            client_profile.disc_profile = disc_profile
+            client_profile.disc_profile = ai_service.analyze_disc_profile(data)
         else:
             client_profile.disc_profile = data.get('disc_profile')
         
         db.session.add(client_profile)
         db.session.commit()
         
-        return jsonify({
+        return passthrough_jsonify({
             'id': client_profile.id,
             'company_name': client_profile.company_name,
             'industry': client_profile.industry,
@@ -210,158 +485,508 @@ def create_or_update_client_profile(project_id):
             'disc_profile': client_profile.disc_profile,
             'pain_points': client_profile.pain_points,
             'goals': client_profile.goals,
-            'decision_makers': json.loads(client_profile.decision_makers)
+            'decision_makers': raw_json(client_profile.decision_makers)
         })
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _enrichment_basic_data(data):
+    """Dados básicos para enriquecimento"""
+    return {
+        'company_name': data.get('company_name', ''),
+        'industry': data.get('industry', ''),
+        'website': data.get('website', '')
+    }
+
+def _run_enrich_project_data(project_id, data):
+    _get_project(project_id)
+    
+    # Enriquecer dados (fontes em paralelo, respeitando o prazo total)
+    enriched_data = data_service.enrich_client_profile(
+        _enrichment_basic_data(data),
+        deadline=data.get('deadline_seconds'),
+        source_timeout=data.get('source_timeout_seconds')
+    )
+    return _save_enriched_data(project_id, enriched_data)
+
+async def _run_enrich_project_data_async(project_id, data):
+    """Mesma resposta de _run_enrich_project_data, com as fontes aguardadas no event loop (modo ASGI)"""
+    await _db_call(_get_project, project_id)
+    enriched_data = await data_service.enrich_client_profile_async(
+        _enrichment_basic_data(data),
+        deadline=data.get('deadline_seconds'),
+        source_timeout=data.get('source_timeout_seconds')
+    )
+    return await _db_call(_save_enriched_data, project_id, enriched_data)
+
+def _save_enriched_data(project_id, enriched_data):
+    project = _get_project(project_id, joinedload(Project.market_intelligence))
+    
+    # Salvar inteligência de mercado
+    market_intelligence = project.market_intelligence
+    if not market_intelligence:
+        market_intelligence = MarketIntelligence(project_id=project_id)
+    
+    # Fontes que não responderam a tempo mantêm os dados já salvos
+    if 'industry_news' in enriched_data:
+        market_intelligence.industry_trends = json.dumps(enriched_data['industry_news'])
+        market_intelligence.news_insights = json.dumps(enriched_data['industry_news'])
+    if 'competitor_analysis' in enriched_data:
+        market_intelligence.competitor_analysis = json.dumps(enriched_data['competitor_analysis'])
+        market_intelligence.market_opportunities = json.dumps(enriched_data['competitor_analysis'].get('opportunities', []))
+    
+    db.session.add(market_intelligence)
+    db.session.commit()
+    
+    return {
+        'project_id': project_id,
+        'enriched_data': enriched_data,
+        'status': 'success' if enriched_data['enrichment_complete'] else 'partial'
+    }
+
 @pitchcraft_bp.route('/projects/<int:project_id>/enrich-data', methods=['POST'])
 @cross_origin()
 def enrich_project_data(project_id):
     """Enriquecer dados do projeto com fontes externas"""
     try:
-        data = request.get_json()
-        project = Project.query.get_or_404(project_id)
-        
-        # Dados básicos para enriquecimento
-        basic_data = {
-            'company_name': data.get('company_name', ''),
-            'industry': data.get('industry', ''),
-            'website': data.get('website', '')
-        }
-        
-        # Enriquecer dados
-        enriched_data = data_service.enrich_client_profile(basic_data)
-        
-        # Salvar inteligência de mercado
-        market_intelligence = MarketIntelligence.query.filter_by(project_id=project_id).first()
-        if not market_intelligence:
-            market_intelligence = MarketIntelligence(project_id=project_id)
-        
-        market_intelligence.industry_trends = json.dumps(enriched_data.get('industry_news', []))
-        market_intelligence.competitor_analysis = json.dumps(enriched_data.get('competitor_analysis', {}))
-        market_intelligence.news_insights = json.dumps(enriched_data.get('industry_news', []))
-        market_intelligence.market_opportunities = json.dumps(enriched_data.get('competitor_analysis', {}).get('opportunities', []))
-        
-        db.session.add(market_intelligence)
-        db.session.commit()
-        
-        return jsonify({
-            'project_id': project_id,
-            'enriched_data': enriched_data,
-            'status': 'success'
-        })
+        data = request.get_json(silent=True) or {}
+        if _wants_async():
+            return _enqueue_project_job('enrich_data', project_id, data)
+        return jsonify(_run_enrich_project_data(project_id, data))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _objection_options(data):
+    limit = max(1, min(int(data.get('limit', OBJECTION_DEFAULT_COUNT)), OBJECTION_MAX_COUNT))
+    return limit, data.get('categories')
+
+def _library_objections(project_id, data, limit, categories):
+    """Dados de entrada da IA e as objeções já pontuadas da biblioteca que atendem o pedido"""
+    project_data, client_data, market_data = _project_inputs(project_id)
+    objections_data = []
+    if data.get('use_library', True):
+        for entry in objection_library.search(project_data, client_data, k=limit, categories=categories):
+            objections_data.append({
+                'objection': entry['objection'],
+                'response': entry['response'],
+                'category': entry['category'],
+                'confidence_score': entry['confidence_score'],
+                'similarity': entry['similarity'],
+                'source': 'library'
+            })
+    return (project_data, client_data, market_data), objections_data
+
+def _merge_generated_objections(objections_data, generated, limit, categories):
+    """Completar a lista com objeções geradas, sem repetir as que já estão nela"""
+    known = {normalize_objection(item['objection']) for item in objections_data}
+    for obj_data in generated:
+        if len(objections_data) >= limit:
+            break
+        if categories and obj_data.get('category') not in categories:
+            continue
+        if normalize_objection(obj_data['objection']) in known:
+            continue
+        known.add(normalize_objection(obj_data['objection']))
+        objections_data.append(dict(obj_data, source='generated'))
+
+def _save_objections(project_id, objections_data, from_library):
+    # Salvar no banco em um único INSERT; objeções que o projeto já tem são ignoradas
+    inserted = upsert_objections(project_id, objections_data)
+    db.session.commit()
+    
+    return {
+        'project_id': project_id,
+        'objections': objections_data,
+        'total_generated': len(objections_data),
+        'from_library': from_library,
+        'inserted': inserted
+    }
+
+def _run_generate_objections(project_id, data):
+    limit, categories = _objection_options(data)
+    
+    # Primeiro a biblioteca de objeções já pontuadas; o modelo só completa o que faltar
+    (project_data, client_data, market_data), objections_data = _library_objections(project_id, data, limit, categories)
+    from_library = len(objections_data)
+    
+    if len(objections_data) < limit:
+        if ai_service.bundle_enabled:
+            generated = ai_service.generate_pitch_bundle(project_data, client_data, market_data)['objections']
+        else:
+            generated = ai_service.generate_objections_and_responses(project_data, client_data, cache_scope=project_scope(project_id))
+        _merge_generated_objections(objections_data, generated, limit, categories)
+    
+    return _save_objections(project_id, objections_data, from_library)
+
+async def _run_generate_objections_async(project_id, data):
+    """Mesma resposta de _run_generate_objections; banco e biblioteca rodam em thread (modo ASGI)"""
+    limit, categories = _objection_options(data)
+    (project_data, client_data, market_data), objections_data = await _db_call(
+        _library_objections, project_id, data, limit, categories
+    )
+    from_library = len(objections_data)
+    
+    if len(objections_data) < limit:
+        if ai_service.bundle_enabled:
+            generated = (await ai_service.generate_pitch_bundle_async(project_data, client_data, market_data))['objections']
+        else:
+            generated = await ai_service.generate_objections_and_responses_async(
+                project_data, client_data, cache_scope=project_scope(project_id)
+            )
+        _merge_generated_objections(objections_data, generated, limit, categories)
+    
+    return await _db_call(_save_objections, project_id, objections_data, from_library)
+
 @pitchcraft_bp.route('/projects/<int:project_id>/objections', methods=['POST'])
 @cross_origin()
 def generate_objections(project_id):
     """Gerar objeções e respostas"""
     try:
-        project = Project.query.get_or_404(project_id)
-        client_profile = ClientProfile.query.filter_by(project_id=project_id).first()
-        
-        project_data = {
-            'description': project.description,
-            'project_type': project.project_type
-        }
-        
-        client_data = {}
-        if client_profile:
-            client_data = {
-                'company_name': client_profile.company_name,
-                'industry': client_profile.industry,
-                'disc_profile': client_profile.disc_profile
-            }
-        
-        # Gerar objeções com IA
-        objections_data = ai_service.generate_objections_and_responses(project_data, client_data)
-        
-        # Salvar no banco
-        for obj_data in objections_data:
-            objection = Objection(
-                project_id=project_id,
-                objection_text=obj_data['objection'],
-                response_text=obj_data['response'],
-                category=obj_data['category'],
-                confidence_score=obj_data['confidence_score']
-            )
-            db.session.add(objection)
-        
-        db.session.commit()
-        
-        return jsonify({
-            'project_id': project_id,
-            'objections': objections_data,
-            'total_generated': len(objections_data)
-        })
+        data = request.get_json(silent=True) or {}
+        if _wants_async():
+            return _enqueue_project_job('generate_objections', project_id, data)
+        return jsonify(_run_generate_objections(project_id, data))
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _run_create_presentation(project_id, data):
+    project = _get_project(project_id, joinedload(Project.client_profile), joinedload(Project.market_intelligence))
+    
+    # Se não há conteúdo, gerar automaticamente
+    if not data.get('content'):
+        # Buscar narrativa existente ou gerar nova
+        narrative = data.get('narrative', {})
+        if not narrative:
+            # Gerar narrativa automaticamente
+            project_data, client_data, market_data = _load_narrative_inputs(project)
+            narrative = _generate_project_narrative(project_id, project_data, client_data, market_data)
+        
+        # Gerar slides baseados na narrativa
+        style_config = data.get('style_config', {})
+        slides_data = ai_service.generate_presentation_slides(narrative, style_config)
+        content = slides_data
+    else:
+        content = data['content']
+    
+    presentation = Presentation(
+        project_id=project_id,
+        title=data.get('title', f'Apresentação - {project.title}'),
+        style_config=json.dumps(data.get('style_config', {}))
+    )
+    
+    db.session.add(presentation)
+    db.session.flush()
+    presentation_versions.save(presentation, slide_store.pack(content), message='Versão inicial')
+    db.session.commit()
+    
+    return {
+        'id': presentation.id,
+        'version': 1,
+        'title': presentation.title,
+        'content': content,
+        'style_config': data.get('style_config', {}),
+        'created_at': presentation.created_at.isoformat()
+    }
+
 @pitchcraft_bp.route('/projects/<int:project_id>/presentations', methods=['POST'])
 @cross_origin()
 def create_presentation(project_id):
     """Criar uma nova apresentação"""
     try:
         data = request.get_json()
-        project = Project.query.get_or_404(project_id)
-        
-        # Se não há conteúdo, gerar automaticamente
-        if not data.get('content'):
-            # Buscar narrativa existente ou gerar nova
-            narrative = data.get('narrative', {})
-            if not narrative:
-                # Gerar narrativa automaticamente
-                client_profile = ClientProfile.query.filter_by(project_id=project_id).first()
-                market_intelligence = MarketIntelligence.query.filter_by(project_id=project_id).first()
-                
-                project_data = {
-                    'project_type': project.project_type,
-                    'description': project.description,
-                    'target_audience': project.target_audience
-                }
-                
-                client_data = {}
-                if client_profile:
-                    client_data = {
-                        'company_name': client_profile.company_name,
-                        'industry': client_profile.industry,
-                        'disc_profile': client_profile.disc_profile
-                    }
-                
-                market_data = {}
-                if market_intelligence:
-                    market_data = {
-                        'industry_trends': json.loads(market_intelligence.industry_trends) if market_intelligence.industry_trends else {}
-                    }
-                
-                narrative = ai_service.generate_narrative(project_data, client_data, market_data)
+        # Só a geração automática (sem conteúdo) vai para a fila
+        if _wants_async() and not data.get('content'):
+            return _enqueue_project_job('create_presentation', project_id, data)
+        return jsonify(_run_create_presentation(project_id, data)), 201
+    except AdmissionRejected as e:
+        return _overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _version_info(version):
+    return {
+        'version': version.version,
+        'kind': version.kind,
+        'base_version': version.base_version,
+        'operations': len(json.loads(version.patch)) if version.patch else None,
+        'message': version.message,
+        'created_at': version.created_at.isoformat() if version.created_at else None
+    }
+
+@pitchcraft_bp.route('/presentations/<int:presentation_id>', methods=['PUT'])
+@cross_origin()
+def update_presentation(presentation_id):
+    """Editar uma apresentação com o conteúdo completo (`content`) ou operações JSON Patch (`patch`)"""
+    try:
+        data = request.get_json() or {}
+        
+        def change(presentation):
+            if 'patch' in data:
+                deck = slide_store.unpack(json.loads(presentation.content or '{}'))
+                content = slide_store.pack(apply_patch(deck, data['patch']))
+            elif 'content' in data:
+                content = slide_store.pack(data['content'])
+            else:
+                content = None
             
-            # Gerar slides baseados na narrativa
-            style_config = data.get('style_config', {})
-            slides_data = ai_service.generate_presentation_slides(narrative, style_config)
-            content = slides_data
-        else:
-            content = data['content']
-        
-        presentation = Presentation(
-            project_id=project_id,
-            title=data.get('title', f'Apresentação - {project.title}'),
-            content=json.dumps(content),
-            style_config=json.dumps(data.get('style_config', {}))
-        )
+            if 'title' in data:
+                presentation.title = data['title']
+            if 'style_config' in data:
+                presentation.style_config = json.dumps(data['style_config'])
+            
+            version = presentation_versions.save(presentation, content, message=data.get('message')) if content is not None else None
+            return presentation, version
         
-        db.session.add(presentation)
-        db.session.commit()
+        try:
+            presentation, version = presentation_versions.edit(presentation_id, change)
+        except JSONPatchError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
+        return passthrough_jsonify({
             'id': presentation.id,
             'title': presentation.title,
-            'content': json.loads(presentation.content),
-            'style_config': json.loads(presentation.style_config),
-            'created_at': presentation.created_at.isoformat()
-        }), 201
+            'version': version.version if version else None,
+            'content': _deck_payload(presentation.content),
+            'style_config': raw_json(presentation.style_config),
+            'updated_at': presentation.updated_at.isoformat()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/presentations/<int:presentation_id>/slides', methods=['GET'])
+@cross_origin()
+def get_presentation_slides(presentation_id):
+    """Intervalo de slides (?from=&to=, numerados a partir de 1, inclusivo)"""
+    try:
+        presentation = Presentation.query.get_or_404(presentation_id)
+        deck = json.loads(presentation.content) if presentation.content else {}
+        total = slide_store.slide_count(deck)
+        
+        first = max(request.args.get('from', 1, type=int), 1)
+        last = min(request.args.get('to', total, type=int), total)
+        texts = slide_store.slide_texts(deck, first - 1, last) if first <= last else []
+        
+        return passthrough_jsonify({
+            'presentation_id': presentation_id,
+            'total_slides': total,
+            'from': first,
+            'to': first + len(texts) - 1,
+            'slides': [raw_json(text) for text in texts]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/presentations/<int:presentation_id>/slides/<int:number>', methods=['PATCH'])
+@cross_origin()
+def update_presentation_slide(presentation_id, number):
+    """Atualizar um slide (JSON Merge Patch; null remove o campo) sem regravar o deck
+
+    O corpo é só o merge patch do slide (todo campo, inclusive "message", é do
+    slide); a mensagem da versão vem no cabeçalho X-Version-Message, codificada
+    em URL.
+    """
+    try:
+        data = request.get_json() or {}
+        message = unquote(request.headers.get('X-Version-Message', ''))
+        
+        def change(presentation):
+            deck = json.loads(presentation.content) if presentation.content else {}
+            if not slide_store.is_manifest(deck):
+                # Deck antigo com slides embutidos: passa a usar um blob por slide
+                deck = slide_store.pack(deck)
+            if not 1 <= number <= slide_store.slide_count(deck):
+                return None, None
+            
+            slide = merge_patch(json.loads(slide_store.slide_texts(deck, number - 1, number)[0]), data)
+            refs = list(deck[slide_store.SLIDE_REFS_KEY])
+            refs[number - 1] = store_blob(json.dumps(slide))
+            deck = dict(deck, **{slide_store.SLIDE_REFS_KEY: refs})
+            return presentation_versions.save(presentation, deck, message=message or f'Slide {number} atualizado'), slide
+        
+        version, slide = presentation_versions.edit(presentation_id, change)
+        if version is None:
+            return jsonify({'error': 'Slide não encontrado'}), 404
+        
+        return jsonify({
+            'presentation_id': presentation_id,
+            'number': number,
+            'version': version.version,
+            'slide': slide
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/presentations/<int:presentation_id>/versions', methods=['GET'])
+@cross_origin()
+def list_presentation_versions(presentation_id):
+    """Histórico de versões (sem o conteúdo)"""
+    try:
+        Presentation.query.get_or_404(presentation_id)
+        versions = PresentationVersion.query.filter_by(presentation_id=presentation_id) \
+            .order_by(PresentationVersion.version).all()
+        return jsonify([_version_info(version) for version in versions])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/presentations/<int:presentation_id>/versions/<int:version>', methods=['GET'])
+@cross_origin()
+def get_presentation_version(presentation_id, version):
+    """Conteúdo da apresentação em uma versão específica"""
+    try:
+        content = presentation_versions.content_at(presentation_id, version)
+        if content is None:
+            return jsonify({'error': 'Versão não encontrada'}), 404
+        return jsonify({'id': presentation_id, 'version': version, 'content': slide_store.unpack(content)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/presentations/<int:presentation_id>/diff', methods=['GET'])
+@cross_origin()
+def diff_presentation_versions(presentation_id):
+    """Operações JSON Patch entre duas versões (?from=&to=, padrão: penúltima -> última)"""
+    try:
+        latest = presentation_versions.latest(presentation_id)
+        if latest is None:
+            return jsonify({'error': 'Apresentação sem versões'}), 404
+        to_version = request.args.get('to', latest.version, type=int)
+        from_version = request.args.get('from', to_version - 1, type=int)
+        
+        ops = presentation_versions.diff(presentation_id, from_version, to_version)
+        if ops is None:
+            return jsonify({'error': 'Versão não encontrada'}), 404
+        return jsonify({'from': from_version, 'to': to_version, 'patch': slide_store.expand_patch(ops)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/presentations/<int:presentation_id>/versions/<int:version>/restore', methods=['POST'])
+@cross_origin()
+def restore_presentation_version(presentation_id, version):
+    """Restaurar uma versão anterior (gravada como nova versão, só com o delta)"""
+    try:
+        restored = presentation_versions.edit(presentation_id, lambda presentation: presentation_versions.restore(presentation, version))
+        if restored is None:
+            return jsonify({'error': 'Versão não encontrada'}), 404
+        return jsonify(_version_info(restored))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@cross_origin()
+def get_job(job_id):
+    """Consultar status e resultado de uma tarefa assíncrona"""
+    try:
+        job = Job.query.get_or_404(job_id)
+        return jsonify(job.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+@cross_origin()
+def cancel_job(job_id):
+    """Cancelar uma tarefa assíncrona"""
+    try:
+        job = Job.query.get_or_404(job_id)
+        job = job_queue.cancel(job)
+        return jsonify(job.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/jobs/metrics', methods=['GET'])
+@cross_origin()
+def get_job_metrics():
+    """Profundidade da fila e tarefas por status"""
+    try:
+        return jsonify(job_queue.metrics())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Tarefas que podem ser executadas em segundo plano (?async=true)
+job_queue.register('generate_narrative', _run_generate_narrative)
+job_queue.register('enrich_data', _run_enrich_project_data)
+job_queue.register('generate_objections', _run_generate_objections)
+job_queue.register('create_presentation', _run_create_presentation)
+
+@pitchcraft_bp.route('/ai-cache/stats', methods=['GET'])
+@cross_origin()
+def get_ai_cache_stats():
+    """Estatísticas do cache de respostas de IA (exato e semântico)"""
+    try:
+        stats = ai_service.cache.stats()
+        stats['semantic'] = ai_service.semantic_cache.stats()
+        stats['objection_library'] = objection_library.stats()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/ai-providers/stats', methods=['GET'])
+@cross_origin()
+def get_ai_provider_stats():
+    """Latência, taxa de erro e ordem de roteamento dos provedores de IA"""
+    try:
+        return jsonify(ai_service.router.snapshot())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/ai-cache', methods=['DELETE'])
+@cross_origin()
+def clear_ai_cache():
+    """Limpar o cache de respostas de IA"""
+    try:
+        ai_service.cache.clear()
+        return '', 204
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/market-cache/stats', methods=['GET'])
+@cross_origin()
+def get_market_cache_stats():
+    """Estatísticas do cache compartilhado de inteligência de mercado"""
+    try:
+        return jsonify(data_service.market_cache.stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/market-cache', methods=['DELETE'])
+@cross_origin()
+def clear_market_cache():
+    """Limpar o cache de inteligência de mercado (opcionalmente só de uma fonte via ?source=)"""
+    try:
+        data_service.market_cache.invalidate(request.args.get('source'))
+        return '', 204
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pitchcraft_bp.route('/storage/stats', methods=['GET'])
+@cross_origin()
+def get_storage_stats():
+    """Espaço economizado pela deduplicação/compressão das colunas JSON"""
+    try:
+        return jsonify(storage_report())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _semantic_cache_counters():
+    # Sem instanciar o cache semântico (e o cliente do Qdrant) só para expor as métricas
+    cache = ai_service.__dict__.get('semantic_cache')
+    return (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+def _market_cache_counters():
+    counters = data_service.market_cache.stats()
+    return counters['fresh'] + counters['stale'] + counters['coalesced'], counters['miss']
+
+metrics.register_cache('llm', lambda: (ai_service.cache.hits, ai_service.cache.misses))
+metrics.register_cache('semantic', _semantic_cache_counters)
+metrics.register_cache('market', _market_cache_counters)
+
+@pitchcraft_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas no formato de exposição do Prometheus (etapas, rotas, caches e chamadas de IA em andamento)"""
+    try:
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1,55 +1,269 @@
-import openai
-import anthropic
-import google.generativeai as genai
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from src.services.lazy import lazy_property
+from src.services.llm_cache import LLMCache
+from src.services.semantic_cache import SemanticCache
+from src.services.llm_router import LLMRouter, OpenAIProvider, AnthropicProvider, GeminiProvider
+from src.services.metrics import metrics
+from src.services.rate_limiter import AdmissionRejected
+from src.services.prompt_builder import PromptBuilder, news_items, competitor_items
+import asyncio
+import functools
+import time
 import os
 import json
 import requests
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
-class AIService:
+DISC_PROFILES = ('D', 'I', 'S', 'C')
+
+# Seções da narrativa: (chave na resposta, termo que identifica o cabeçalho no texto gerado)
+NARRATIVE_SECTIONS = [
+    ('introduction', 'introdução'),
+    ('problem_statement', 'problema'),
+    ('solution_overview', 'solução'),
+    ('benefits', 'benefícios'),
+    ('social_proof', 'prova social'),
+    ('call_to_action', 'chamada para ação'),
+]
+
+
+class NarrativeStreamParser:
+    """Identificar seções da narrativa de forma incremental enquanto o texto é recebido
+
+    Emite eventos ('paragraph', ...) a cada parágrafo concluído e ('section', ...)
+    quando o cabeçalho da seção seguinte aparece ou o texto termina.
+    """
+    
     def __init__(self):
-        # Configurar clientes de IA apenas se as chaves estiverem disponíveis
-        openai_key = os.getenv('OPENAI_API_KEY')
-        if openai_key and openai_key != 'demo_key_for_testing':
-            self.openai_client = openai.OpenAI(api_key=openai_key)
-        else:
-            self.openai_client = None
-            
-        anthropic_key = os.getenv('ANTHROPIC_API_KEY')
-        if anthropic_key and anthropic_key != 'demo_key_for_testing':
-            self.anthropic_client = anthropic.Anthropic(api_key=anthropic_key)
-        else:
-            self.anthropic_client = None
-            
-        google_key = os.getenv('GOOGLE_API_KEY')
-        if google_key and google_key != 'demo_key_for_testing':
-            genai.configure(api_key=google_key)
-            self.gemini_model = genai.GenerativeModel('gemini-pro')
-        else:
-            self.gemini_model = None
+        self._buffer = ''
+        self._current_key = None
+        self._lines = []
+        self._paragraph = []
+        self._seen = set()
+    
+    @classmethod
+    def parse(cls, text: str) -> Dict[str, str]:
+        """Separar um texto completo nas seções da narrativa em uma única passada"""
+        parser = cls()
+        events = parser.feed(text) + parser.finish()
+        sections = {key: '' for key, _ in NARRATIVE_SECTIONS}
+        sections.update({data['section']: data['content'] for event, data in events if event == 'section'})
+        return sections
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Dict]]:
+        events = []
+        self._buffer += chunk
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            events.extend(self._process_line(line))
+        return events
+    
+    def finish(self) -> List[Tuple[str, Dict]]:
+        events = []
+        if self._buffer:
+            events.extend(self._process_line(self._buffer))
+            self._buffer = ''
+        events.extend(self._close_section())
+        return events
+    
+    def _process_line(self, line: str) -> List[Tuple[str, Dict]]:
+        header_key = self._match_header(line)
+        if header_key:
+            events = self._close_section()
+            self._current_key = header_key
+            self._seen.add(header_key)
+            return events
+        
+        if self._current_key is None:
+            return []
         
-        # Configurar Qdrant (Vector Database) apenas se disponível
-        qdrant_url = os.getenv('QDRANT_URL', 'http://localhost:6333')
+        if line.startswith('#') or line.startswith('**'):
+            return self._close_section()
+        
+        self._lines.append(line)
+        if line.strip():
+            self._paragraph.append(line)
+            return []
+        return self._close_paragraph()
+    
+    def _match_header(self, line: str) -> Optional[str]:
+        stripped = line.strip()
+        # Cabeçalhos são linhas curtas ou marcadas; evita confundir menções no corpo do texto
+        if not stripped or not (stripped[0] in '#*' or stripped[0].isdigit() or len(stripped) <= 60):
+            return None
+        for key, term in NARRATIVE_SECTIONS:
+            if key not in self._seen and term in stripped.lower():
+                return key
+        return None
+    
+    def _close_paragraph(self) -> List[Tuple[str, Dict]]:
+        if not self._paragraph:
+            return []
+        paragraph = '\n'.join(self._paragraph).strip()
+        self._paragraph = []
+        return [('paragraph', {'section': self._current_key, 'content': paragraph})]
+    
+    def _close_section(self) -> List[Tuple[str, Dict]]:
+        if self._current_key is None:
+            return []
+        events = self._close_paragraph()
+        events.append(('section', {'section': self._current_key, 'content': '\n'.join(self._lines).strip()}))
+        self._current_key = None
+        self._lines = []
+        return events
+
+
+class AIService:
+    def __init__(self, providers: Optional[List] = None):
+        # Chaves configuradas; os SDKs só são importados quando o provedor é usado
+        self.api_keys = {
+            name: key for name, key in (
+                ('openai', os.getenv('OPENAI_API_KEY')),
+                ('anthropic', os.getenv('ANTHROPIC_API_KEY')),
+                ('gemini', os.getenv('GOOGLE_API_KEY')),
+            )
+            if key and key != 'demo_key_for_testing'
+        }
+        
+        # Cache persistente das respostas dos modelos
+        self.cache = LLMCache()
+        
+        # Pacote único (DISC + narrativa + objeções) atende as rotas com uma só chamada
+        self.bundle_enabled = os.getenv('PITCH_BUNDLE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        
+        # Roteador entre os provedores configurados (ou provedores injetados, ex.: stubs locais)
+        self.router = LLMRouter(providers if providers is not None else self._build_providers())
+    
+    @property
+    def openai_client(self):
+        provider = self.router.get('openai')
+        return provider.client if provider is not None else None
+    
+    @property
+    def anthropic_client(self):
+        provider = self.router.get('anthropic')
+        return provider.client if provider is not None else None
+    
+    @property
+    def gemini_model(self):
+        provider = self.router.get('gemini')
+        return provider.model if provider is not None else None
+    
+    @lazy_property
+    def qdrant_client(self):
+        """Qdrant (Vector Database) apenas se configurado"""
         qdrant_key = os.getenv('QDRANT_API_KEY')
+        if not qdrant_key or qdrant_key == 'demo_key_for_testing':
+            return None
         try:
-            if qdrant_key and qdrant_key != 'demo_key_for_testing':
-                self.qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_key)
-            else:
-                self.qdrant_client = None
+            from qdrant_client import QdrantClient
+            return QdrantClient(url=os.getenv('QDRANT_URL', 'http://localhost:6333'), api_key=qdrant_key)
         except Exception:
-            self.qdrant_client = None
+            return None
     
-    def generate_narrative(self, project_data: Dict, client_profile: Dict, market_data: Dict) -> Dict:
-        """Gerar narrativa comercial personalizada usando IA"""
+    @lazy_property
+    def semantic_cache(self):
+        """Reaproveitamento por similaridade (Qdrant quando configurado, senão índice em memória)"""
+        openai_client = self.openai_client if os.getenv('SEMANTIC_CACHE_EMBEDDINGS', 'hashing') == 'openai' else None
+        return SemanticCache.from_env(self.qdrant_client, openai_client)
+    
+    def _build_providers(self) -> List:
+        """Provedores com chave configurada, na ordem de preferência de LLM_PROVIDER_ORDER
         
-        # Se não há cliente OpenAI disponível, retornar narrativa de exemplo
-        if not self.openai_client:
-            return self._generate_demo_narrative(project_data, client_profile)
+        Nenhum SDK é importado aqui: cada provedor cria o próprio cliente na primeira chamada.
+        """
+        factories = {
+            'openai': lambda key: OpenAIProvider(api_key=key),
+            'anthropic': lambda key: AnthropicProvider(api_key=key),
+            'gemini': lambda key: GeminiProvider(api_key=key),
+        }
+        order = [name.strip() for name in os.getenv('LLM_PROVIDER_ORDER', 'openai,anthropic,gemini').split(',')]
+        return [factories[name](self.api_keys[name]) for name in order if name in factories and name in self.api_keys]
+    
+    def _chat_completion(self, model: str, prompt: str, temperature: float, cache_scope: Optional[str] = None) -> str:
+        """Executar chamada de chat no provedor mais rápido disponível, reaproveitando respostas em cache"""
+        cache_key = LLMCache.make_key(model, temperature, prompt)
+        with metrics.stage('llm_cache'):
+            cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
         
-        prompt = f"""
+        with metrics.stage('llm'):
+            response_text, _ = self.router.complete(model, prompt, temperature)
+        with metrics.stage('llm_cache'):
+            self.cache.set(cache_key, response_text, model=model, scope=cache_scope)
+        return response_text
+    
+    async def _chat_completion_async(self, model: str, prompt: str, temperature: float,
+                                     cache_scope: Optional[str] = None) -> str:
+        """Equivalente não bloqueante de _chat_completion: o cache (banco) roda em thread e o modelo é aguardado"""
+        cache_key = LLMCache.make_key(model, temperature, prompt)
+        with metrics.stage('llm_cache'):
+            cached_response = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached_response is not None:
+            return cached_response
+        
+        with metrics.stage('llm'):
+            response_text, _ = await self.router.complete_async(model, prompt, temperature)
+        with metrics.stage('llm_cache'):
+            await asyncio.to_thread(functools.partial(self.cache.set, cache_key, response_text, model=model, scope=cache_scope))
+        return response_text
+    
+    def _run(self, flow):
+        """Executar um fluxo de geração atendendo cada chamada ao modelo de forma síncrona
+        
+        Os fluxos (_narrative_flow, _bundle_flow...) são geradores que emitem
+        (modelo, prompt, temperatura, escopo) e recebem o texto gerado, de modo
+        que a mesma lógica serve ao modo WSGI e ao modo ASGI. I/O bloqueante
+        (cache semântico, cache de respostas) é emitido como functools.partial
+        e recebe o valor retornado pela chamada.
+        """
+        try:
+            call = next(flow)
+            while True:
+                try:
+                    result = call() if isinstance(call, functools.partial) else self._chat_completion(*call)
+                except Exception as e:
+                    call = flow.throw(e)
+                else:
+                    call = flow.send(result)
+        except StopIteration as stop:
+            return stop.value
+    
+    async def _run_async(self, flow):
+        """Executar um fluxo de geração sem bloquear o event loop: modelo aguardado, I/O bloqueante em thread"""
+        try:
+            call = next(flow)
+            while True:
+                try:
+                    if isinstance(call, functools.partial):
+                        result = await asyncio.to_thread(call)
+                    else:
+                        result = await self._chat_completion_async(*call)
+                except Exception as e:
+                    call = flow.throw(e)
+                else:
+                    call = flow.send(result)
+        except StopIteration as stop:
+            return stop.value
+    
+    def _build_market_context(self, market_data: Dict) -> Dict:
+        """Compactar a inteligência de mercado dentro do orçamento de tokens do prompt"""
+        return (
+            PromptBuilder()
+            .add('trends', news_items(market_data.get('industry_trends')), weight=1.0)
+            .add('competitors', competitor_items(market_data.get('competitor_analysis')), weight=1.0)
+            .add('opportunities', market_data.get('market_opportunities'), weight=0.5)
+            .build()
+        )
+    
+    def _market_context_key(self, market_data: Dict) -> str:
+        """Digest do contexto de mercado que entra no prompt: separa no cache semântico gerações com mercados diferentes"""
+        return SemanticCache.context_digest(self._build_market_context(market_data)['sections'])
+    
+    def _build_narrative_prompt(self, project_data: Dict, client_profile: Dict, market_data: Dict) -> str:
+        market_context = self._build_market_context(market_data)['sections']
+        return f"""
         Você é um especialista em narrativas comerciais. Crie uma narrativa persuasiva baseada nos seguintes dados:
         
         PROJETO:
@@ -66,9 +280,9 @@ class AIService:
         - Objetivos: {client_profile.get('goals', '')}
         
         INTELIGÊNCIA DE MERCADO:
-        - Tendências: {market_data.get('industry_trends', '')}
-        - Concorrentes: {market_data.get('competitor_analysis', '')}
-        - Oportunidades: {market_data.get('market_opportunities', '')}
+        - Tendências: {market_context['trends']}
+        - Concorrentes: {market_context['competitors']}
+        - Oportunidades: {market_context['opportunities']}
         
         Crie uma narrativa estruturada com:
         1. Introdução impactante
@@ -80,33 +294,140 @@ class AIService:
         
         Adapte o tom para o perfil DISC identificado.
         """
+    
+    @metrics.stage('parse')
+    def _build_narrative(self, narrative_text: str) -> Dict:
+        """Estruturar o texto gerado nas seções da narrativa"""
+        narrative = NarrativeStreamParser.parse(narrative_text)
+        narrative['full_text'] = narrative_text
+        narrative['generated_at'] = datetime.utcnow().isoformat()
+        return narrative
+    
+    def generate_narrative(self, project_data: Dict, client_profile: Dict, market_data: Dict, cache_scope: Optional[str] = None) -> Dict:
+        """Gerar narrativa comercial personalizada usando IA"""
+        return self._run(self._narrative_flow(project_data, client_profile, market_data, cache_scope))
+    
+    async def generate_narrative_async(self, project_data: Dict, client_profile: Dict, market_data: Dict,
+                                       cache_scope: Optional[str] = None) -> Dict:
+        """Versão não bloqueante de generate_narrative (modo ASGI)"""
+        return await self._run_async(self._narrative_flow(project_data, client_profile, market_data, cache_scope))
+    
+    def _narrative_flow(self, project_data: Dict, client_profile: Dict, market_data: Dict, cache_scope: Optional[str] = None):
+        # Se não há cliente OpenAI disponível, retornar narrativa de exemplo
+        if not self.router.available:
+            return self._generate_demo_narrative(project_data, client_profile)
+        
+        market_key = self._market_context_key(market_data)
+        similar = yield functools.partial(self.semantic_cache.lookup, 'narrative', project_data, client_profile, market_key)
+        if similar is not None:
+            similar['generated_at'] = datetime.utcnow().isoformat()
+            return similar
+        
+        prompt = self._build_narrative_prompt(project_data, client_profile, market_data)
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7
-            )
-            
-            narrative_text = response.choices[0].message.content
-            
-            # Estruturar a resposta
-            narrative = {
-                'introduction': self._extract_section(narrative_text, 'introdução'),
-                'problem_statement': self._extract_section(narrative_text, 'problema'),
-                'solution_overview': self._extract_section(narrative_text, 'solução'),
-                'benefits': self._extract_section(narrative_text, 'benefícios'),
-                'social_proof': self._extract_section(narrative_text, 'prova social'),
-                'call_to_action': self._extract_section(narrative_text, 'chamada para ação'),
-                'full_text': narrative_text,
-                'generated_at': datetime.utcnow().isoformat()
-            }
-            
+            narrative_text = yield ("gpt-4", prompt, 0.7, cache_scope)
+            narrative = self._build_narrative(narrative_text)
+            yield functools.partial(self.semantic_cache.add, 'narrative', project_data, client_profile, narrative, market_key)
             return narrative
             
+        except AdmissionRejected:
+            # Sobrecarga do provedor vira 503 na rota, não conteúdo de demonstração
+            raise
         except Exception as e:
             return self._generate_demo_narrative(project_data, client_profile)
     
+    def stream_narrative(self, project_data: Dict, client_profile: Dict, market_data: Dict,
+                         cache_scope: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """Gerar narrativa emitindo cada parágrafo/seção assim que o modelo os conclui
+        
+        Produz tuplas (evento, dados). O último evento é sempre ('narrative', ...) com a
+        narrativa completa no mesmo formato de generate_narrative.
+        """
+        
+        if not self.router.available:
+            yield from self._stream_complete_narrative(self._generate_demo_narrative(project_data, client_profile))
+            return
+        
+        prompt = self._build_narrative_prompt(project_data, client_profile, market_data)
+        cache_key = LLMCache.make_key("gpt-4", 0.7, prompt)
+        cached_text = self.cache.get(cache_key)
+        if cached_text is not None:
+            yield from self._stream_complete_narrative(self._build_narrative(cached_text))
+            return
+        
+        # Streaming só existe no OpenAI; com outro provedor à frente, gera e reemite as seções
+        openai_provider = self.router.get('openai')
+        if openai_provider is None or self.router.ranked_providers()[0] is not openai_provider:
+            try:
+                narrative_text = self._chat_completion("gpt-4", prompt, 0.7, cache_scope=cache_scope)
+                narrative = self._build_narrative(narrative_text)
+            except AdmissionRejected as e:
+                yield ('error', {'error': str(e), 'retry_after': round(e.retry_after, 1)})
+                return
+            except Exception as e:
+                narrative = self._generate_demo_narrative(project_data, client_profile)
+            yield from self._stream_complete_narrative(narrative)
+            return
+        
+        parser = NarrativeStreamParser()
+        chunks = []
+        started_at = time.monotonic()
+        try:
+            with self.router.limit(openai_provider, "gpt-4", prompt):
+                started_at = time.monotonic()
+                with metrics.llm_call('openai'), metrics.stage('llm'):
+                    stream = openai_provider.client.chat.completions.create(
+                        model="gpt-4",
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0.7,
+                        stream=True
+                    )
+                    for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content or ''
+                        if delta:
+                            chunks.append(delta)
+                            yield from parser.feed(delta)
+                    yield from parser.finish()
+        except AdmissionRejected as e:
+            # Evento de erro em vez da narrativa de demonstração: o cliente tenta de novo após retry_after
+            yield ('error', {'error': str(e), 'retry_after': round(e.retry_after, 1)})
+            return
+        except Exception as e:
+            self.router.record('openai', time.monotonic() - started_at, ok=False)
+            # Mesma sequência do caminho de sucesso: as seções de demonstração substituem as já emitidas
+            yield from self._stream_complete_narrative(self._generate_demo_narrative(project_data, client_profile))
+            return
+        
+        latency = time.monotonic() - started_at
+        narrative_text = ''.join(chunks)
+        self.router.record('openai', latency, ok=True)
+        self.router.record_usage('openai', "gpt-4", prompt, narrative_text, latency)
+        self.cache.set(cache_key, narrative_text, model="gpt-4", scope=cache_scope)
+        yield ('narrative', self._build_narrative(narrative_text))
+    
+    def stream_bundle_narrative(self, project_data: Dict, client_profile: Dict, market_data: Dict) -> Iterator[Tuple[str, Dict]]:
+        """Eventos de stream_narrative para a narrativa do pacote (modo bundle)
+        
+        A narrativa é a mesma de generate_pitch_bundle (e de POST /generate-narrative):
+        o pacote vem do cache quando já existe; senão é gerado e as seções são emitidas
+        quando ele fica pronto.
+        """
+        try:
+            narrative = self.generate_pitch_bundle(project_data, client_profile, market_data)['narrative']
+        except AdmissionRejected as e:
+            yield ('error', {'error': str(e), 'retry_after': round(e.retry_after, 1)})
+            return
+        yield from self._stream_complete_narrative(narrative)
+    
+    def _stream_complete_narrative(self, narrative: Dict) -> Iterator[Tuple[str, Dict]]:
+        """Emitir como eventos uma narrativa que já está pronta (cache ou demonstração)"""
+        for key, _ in NARRATIVE_SECTIONS:
+            yield ('section', {'section': key, 'content': narrative.get(key, '')})
+        yield ('narrative', narrative)
+    
     def _generate_demo_narrative(self, project_data: Dict, client_profile: Dict) -> Dict:
         """Gerar narrativa de demonstração quando APIs não estão disponíveis"""
         company_name = client_profile.get('company_name', 'sua empresa')
@@ -123,28 +444,12 @@ class AIService:
             'generated_at': datetime.utcnow().isoformat()
         }
     
-    def _extract_section(self, text: str, section: str) -> str:
-        """Extrair seção específica do texto gerado"""
-        # Implementação simplificada - em produção seria mais sofisticada
-        lines = text.split('\n')
-        section_content = []
-        capturing = False
-        
-        for line in lines:
-            if section.lower() in line.lower():
-                capturing = True
-                continue
-            elif capturing and (line.startswith('#') or line.startswith('**')):
-                break
-            elif capturing:
-                section_content.append(line)
-        
-        return '\n'.join(section_content).strip()
-    
     def analyze_disc_profile(self, client_data: Dict) -> str:
         """Analisar perfil DISC do cliente baseado nos dados disponíveis"""
-        
-        if not self.openai_client:
+        return self._run(self._disc_flow(client_data))
+    
+    def _disc_flow(self, client_data: Dict):
+        if not self.router.available:
             # Retornar perfil baseado em heurísticas simples
             industry = client_data.get('industry', '').lower()
             if 'tecnologia' in industry or 'software' in industry:
@@ -170,24 +475,32 @@ class AIService:
         """
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3
-            )
-            
-            disc_profile = response.choices[0].message.content.strip().upper()
+            # Sem escopo: a análise depende apenas dos dados enviados, não do projeto
+            disc_profile = (yield ("gpt-3.5-turbo", prompt, 0.3, None)).strip().upper()
             return disc_profile if disc_profile in ['D', 'I', 'S', 'C'] else 'D'
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return 'D'  # Default
     
-    def generate_objections_and_responses(self, project_data: Dict, client_profile: Dict) -> List[Dict]:
+    def generate_objections_and_responses(self, project_data: Dict, client_profile: Dict, cache_scope: Optional[str] = None) -> List[Dict]:
         """Gerar objeções comuns e respostas para o perfil do cliente"""
-        
-        if not self.openai_client:
+        return self._run(self._objections_flow(project_data, client_profile, cache_scope))
+    
+    async def generate_objections_and_responses_async(self, project_data: Dict, client_profile: Dict,
+                                                      cache_scope: Optional[str] = None) -> List[Dict]:
+        """Versão não bloqueante de generate_objections_and_responses (modo ASGI)"""
+        return await self._run_async(self._objections_flow(project_data, client_profile, cache_scope))
+    
+    def _objections_flow(self, project_data: Dict, client_profile: Dict, cache_scope: Optional[str] = None):
+        if not self.router.available:
             return self._generate_demo_objections(client_profile)
         
+        similar = yield functools.partial(self.semantic_cache.lookup, 'objections', project_data, client_profile)
+        if similar is not None:
+            return similar
+        
         prompt = f"""
         Baseado no projeto e perfil do cliente, gere 5 objeções comuns que podem surgir e suas respectivas respostas:
         
@@ -203,32 +516,29 @@ class AIService:
         
         Formato JSON:
         [
-            {
+            {{
                 "objection": "texto da objeção",
                 "response": "resposta persuasiva",
                 "category": "categoria",
                 "confidence_score": 0.8
-            }
+            }}
         ]
         """
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7
-            )
-            
-            objections_text = response.choices[0].message.content
+            objections_text = yield ("gpt-4", prompt, 0.7, cache_scope)
             
             # Tentar parsear JSON
             try:
                 objections = json.loads(objections_text)
+                yield functools.partial(self.semantic_cache.add, 'objections', project_data, client_profile, objections)
                 return objections
             except json.JSONDecodeError:
                 # Fallback para formato estruturado
                 return self._generate_demo_objections(client_profile)
                 
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return self._generate_demo_objections(client_profile)
     
@@ -269,6 +579,159 @@ class AIService:
             }
         ]
     
+    def _build_bundle_prompt(self, project_data: Dict, client_profile: Dict, market_data: Dict) -> str:
+        market_context = self._build_market_context(market_data)['sections']
+        return f"""
+        Você é um especialista em narrativas comerciais. Com base nos dados abaixo, produza de uma só vez
+        o perfil DISC do cliente, a narrativa comercial e as objeções prováveis com respostas.
+        
+        PROJETO:
+        - Tipo: {project_data.get('project_type', 'pitch_vendas')}
+        - Descrição: {project_data.get('description', '')}
+        - Público-alvo: {project_data.get('target_audience', '')}
+        
+        PERFIL DO CLIENTE:
+        - Empresa: {client_profile.get('company_name', '')}
+        - Setor: {client_profile.get('industry', '')}
+        - Tamanho: {client_profile.get('size', '')}
+        - Perfil DISC informado: {client_profile.get('disc_profile') or 'não informado (determine)'}
+        - Dores: {client_profile.get('pain_points', '')}
+        - Objetivos: {client_profile.get('goals', '')}
+        
+        INTELIGÊNCIA DE MERCADO:
+        - Tendências: {market_context['trends']}
+        - Concorrentes: {market_context['competitors']}
+        - Oportunidades: {market_context['opportunities']}
+        
+        Adapte o tom da narrativa e das respostas ao perfil DISC.
+        Responda apenas com JSON válido, sem texto adicional, no formato:
+        {{
+            "disc_profile": "D, I, S ou C",
+            "narrative": {{
+                "introduction": "introdução impactante",
+                "problem_statement": "identificação do problema",
+                "solution_overview": "apresentação da solução",
+                "benefits": "benefícios específicos",
+                "social_proof": "prova social",
+                "call_to_action": "chamada para ação"
+            }},
+            "objections": [
+                {{
+                    "objection": "texto da objeção",
+                    "response": "resposta persuasiva",
+                    "category": "price, timing, authority ou need",
+                    "confidence_score": 0.8
+                }}
+            ]
+        }}
+        """
+    
+    @metrics.stage('parse')
+    def _parse_bundle(self, text: str) -> Optional[Dict]:
+        """Validar o JSON do pacote em uma única leitura; None se o formato não for o esperado"""
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        try:
+            data = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        
+        narrative_data = data.get('narrative')
+        objections_data = data.get('objections')
+        disc_profile = str(data.get('disc_profile', '')).strip().upper()[:1]
+        if not isinstance(narrative_data, dict) or not isinstance(objections_data, list) or disc_profile not in DISC_PROFILES:
+            return None
+        
+        narrative = {key: str(narrative_data.get(key) or '').strip() for key, _ in NARRATIVE_SECTIONS}
+        if not any(narrative.values()):
+            return None
+        narrative['full_text'] = '\n\n'.join(
+            f"**{term.capitalize()}**\n{narrative[key]}" for key, term in NARRATIVE_SECTIONS if narrative[key]
+        )
+        narrative['generated_at'] = datetime.utcnow().isoformat()
+        
+        objections = []
+        for item in objections_data:
+            if not isinstance(item, dict) or not item.get('objection') or not item.get('response'):
+                continue
+            try:
+                confidence_score = float(item.get('confidence_score', 0.5))
+            except (TypeError, ValueError):
+                confidence_score = 0.5
+            objections.append({
+                'objection': item['objection'],
+                'response': item['response'],
+                'category': item.get('category', 'need'),
+                'confidence_score': confidence_score
+            })
+        
+        return {'disc_profile': disc_profile, 'narrative': narrative, 'objections': objections}
+    
+    def generate_pitch_bundle(self, project_data: Dict, client_profile: Dict, market_data: Dict) -> Dict:
+        """Gerar perfil DISC, narrativa e objeções em uma única chamada ao modelo
+        
+        Se a resposta não puder ser interpretada, recorre às chamadas individuais.
+        """
+        return self._run(self._bundle_flow(project_data, client_profile, market_data))
+    
+    async def generate_pitch_bundle_async(self, project_data: Dict, client_profile: Dict, market_data: Dict) -> Dict:
+        """Versão não bloqueante de generate_pitch_bundle (modo ASGI)"""
+        return await self._run_async(self._bundle_flow(project_data, client_profile, market_data))
+    
+    def _bundle_flow(self, project_data: Dict, client_profile: Dict, market_data: Dict):
+        if not self.router.available:
+            return {
+                'disc_profile': client_profile.get('disc_profile') or self.analyze_disc_profile(client_profile),
+                'narrative': self._generate_demo_narrative(project_data, client_profile),
+                'objections': self._generate_demo_objections(client_profile),
+                'source': 'demo'
+            }
+        
+        market_key = self._market_context_key(market_data)
+        similar = yield functools.partial(self.semantic_cache.lookup, 'bundle', project_data, client_profile, market_key)
+        if similar is not None:
+            if client_profile.get('disc_profile'):
+                similar['disc_profile'] = client_profile['disc_profile']
+            similar['narrative']['generated_at'] = datetime.utcnow().isoformat()
+            similar['source'] = 'semantic_cache'
+            return similar
+        
+        # Sem escopo: a chave já cobre todos os dados de entrada, e o pacote precisa
+        # sobreviver ao salvamento do perfil que ele mesmo ajudou a preencher
+        prompt = self._build_bundle_prompt(project_data, client_profile, market_data)
+        bundle_text, bundle = None, None
+        try:
+            bundle_text = yield ("gpt-4", prompt, 0.7, None)
+            bundle = self._parse_bundle(bundle_text)
+        except AdmissionRejected:
+            # Sem vaga no provedor, as chamadas individuais também não teriam
+            raise
+        except Exception as e:
+            bundle = None
+        
+        if bundle is None:
+            disc_profile = client_profile.get('disc_profile') or (yield from self._disc_flow(client_profile))
+            client_with_disc = dict(client_profile, disc_profile=disc_profile)
+            return {
+                'disc_profile': disc_profile,
+                'narrative': (yield from self._narrative_flow(project_data, client_with_disc, market_data)),
+                'objections': (yield from self._objections_flow(project_data, client_with_disc)),
+                'source': 'individual'
+            }
+        
+        if client_profile.get('disc_profile'):
+            # O perfil informado prevalece sobre o sugerido pelo modelo
+            bundle['disc_profile'] = client_profile['disc_profile']
+        else:
+            # Depois de salvo, o perfil terá o DISC inferido: reaproveita o mesmo pacote para essa entrada
+            primed_prompt = self._build_bundle_prompt(project_data, dict(client_profile, disc_profile=bundle['disc_profile']), market_data)
+            yield functools.partial(self.cache.set, LLMCache.make_key("gpt-4", 0.7, primed_prompt), bundle_text, model="gpt-4")
+        
+        yield functools.partial(self.semantic_cache.add, 'bundle', project_data, client_profile, bundle, market_key)
+        bundle['source'] = 'bundle'
+        return bundle
+    
     def generate_presentation_slides(self, narrative: Dict, style_config: Dict) -> Dict:
         """Gerar estrutura de slides baseada na narrativa"""
         
@@ -0,0 +1,178 @@
+from collections import Counter
+from sqlalchemy import func, inspect, select, text, update
+from src.models.blob import BlobJSON, JSONBlob, load_blob, store_blob
+from src.models.pitchcraft import db, MarketIntelligence, Presentation, PresentationVersion
+from src.services import slide_store
+from typing import Dict, Iterable, List, Tuple
+import json
+
+
+def blob_columns() -> List[Tuple[type, BlobJSON]]:
+    """Atributos (modelo, descritor) guardados na tabela de blobs"""
+    columns = []
+    for model in (MarketIntelligence, Presentation):
+        for value in vars(model).values():
+            if isinstance(value, BlobJSON):
+                columns.append((model, value))
+    return columns
+
+
+def _add_missing_hash_columns() -> List[str]:
+    """Criar as colunas *_hash em bancos anteriores à tabela de blobs (create_all não altera tabelas)"""
+    added = []
+    inspector = inspect(db.engine)
+    for model, column in blob_columns():
+        table = model.__table__
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        if column.hash_attr not in existing:
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.hash_attr} VARCHAR(64)'))
+            added.append(f'{table.name}.{column.hash_attr}')
+    return added
+
+
+def migrate_legacy_json(batch_size: int = 500) -> Dict:
+    """Mover o JSON das colunas antigas para a tabela de blobs, em lotes"""
+    db.create_all()
+    added_columns = _add_missing_hash_columns()
+
+    migrated = {}
+    for model, column in blob_columns():
+        table = model.__table__
+        legacy = getattr(model, column.legacy_attr).expression
+        hash_col = table.c[column.hash_attr]
+        count = 0
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, legacy).where(legacy.isnot(None), hash_col.is_(None)).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for row_id, legacy_text in rows:
+                db.session.execute(
+                    update(table).where(table.c.id == row_id).values({hash_col: store_blob(legacy_text), legacy: None})
+                )
+            db.session.commit()
+            count += len(rows)
+        migrated[f'{table.name}.{legacy.name}'] = count
+
+    return {'added_columns': added_columns, 'migrated_rows': migrated}
+
+
+def _raw_sizes(hashes: Iterable[str], batch_size: int = 500) -> Dict[str, int]:
+    blobs = JSONBlob.__table__
+    hashes = list(hashes)
+    sizes = {}
+    for start in range(0, len(hashes), batch_size):
+        sizes.update(db.session.execute(
+            select(blobs.c.hash, blobs.c.raw_size).where(blobs.c.hash.in_(hashes[start:start + batch_size]))
+        ).all())
+    return sizes
+
+
+def _manifest_refs(digest: str) -> List[str]:
+    deck = json.loads(load_blob(digest) or 'null')
+    return list(deck[slide_store.SLIDE_REFS_KEY]) if slide_store.is_manifest(deck) else []
+
+
+def _patch_refs(patch_text: str) -> List[str]:
+    """Slides referenciados por um delta (operações sobre /slide_refs guardam hashes)"""
+    refs = []
+    for op in json.loads(patch_text or '[]'):
+        if not op.get('path', '').startswith(f'/{slide_store.SLIDE_REFS_KEY}'):
+            continue
+        value = op.get('value')
+        if isinstance(value, str):
+            refs.append(value)
+        elif isinstance(value, list):
+            refs.extend(ref for ref in value if isinstance(ref, str))
+    return refs
+
+
+def _logical_size(references: Counter) -> Tuple[int, int]:
+    sizes = _raw_sizes(references)
+    return sum(references.values()), sum(sizes.get(digest, 0) * count for digest, count in references.items())
+
+
+def _version_and_slide_references() -> Dict[str, Counter]:
+    """Referências a blobs fora das colunas BlobJSON: snapshots de versões e slides dos manifestos
+
+    Sem deduplicação, cada snapshot e cada delta embutiriam os slides que
+    referenciam, e cada manifesto de apresentação o deck inteiro.
+    """
+    snapshots = Counter(dict(db.session.execute(
+        select(PresentationVersion.snapshot_hash, func.count())
+        .where(PresentationVersion.snapshot_hash.isnot(None))
+        .group_by(PresentationVersion.snapshot_hash)
+    ).all()))
+    manifests = Counter(dict(db.session.execute(
+        select(Presentation.content_hash, func.count())
+        .where(Presentation.content_hash.isnot(None))
+        .group_by(Presentation.content_hash)
+    ).all()))
+    manifests.update(snapshots)
+
+    slides = Counter()
+    for digest, count in manifests.items():
+        for ref in _manifest_refs(digest):
+            slides[ref] += count
+    for (patch_text,) in db.session.execute(
+        select(PresentationVersion.patch).where(PresentationVersion.patch.like(f'%/{slide_store.SLIDE_REFS_KEY}%'))
+    ):
+        slides.update(_patch_refs(patch_text))
+
+    return {
+        'presentation_version.snapshot_hash': snapshots,
+        f'presentation.{slide_store.SLIDE_REFS_KEY}': slides,
+    }
+
+
+def storage_report() -> Dict:
+    """Bytes que o JSON ocuparia sem deduplicação/compressão vs. bytes realmente gravados
+
+    Além das colunas BlobJSON, conta os snapshots de versões e cada slide
+    referenciado por manifestos (apresentação e snapshots) e por deltas.
+    """
+    blobs = JSONBlob.__table__
+    by_column, logical_bytes, references, legacy_bytes = {}, 0, 0, 0
+    for model, column in blob_columns():
+        table = model.__table__
+        legacy = getattr(model, column.legacy_attr).expression
+        refs, raw = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(blobs.c.raw_size), 0))
+            .select_from(table.join(blobs, blobs.c.hash == table.c[column.hash_attr]))
+        ).one()
+        legacy_rows, legacy_size = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(func.length(legacy)), 0)).where(legacy.isnot(None))
+        ).one()
+        by_column[f'{table.name}.{legacy.name}'] = {
+            'references': refs,
+            'logical_bytes': int(raw),
+            'legacy_rows': legacy_rows,
+            'legacy_bytes': int(legacy_size)
+        }
+        references += refs
+        logical_bytes += int(raw)
+        legacy_bytes += int(legacy_size)
+
+    for name, counter in _version_and_slide_references().items():
+        refs, raw = _logical_size(counter)
+        by_column[name] = {'references': refs, 'logical_bytes': raw}
+        references += refs
+        logical_bytes += raw
+
+    blob_count, unique_raw, stored = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(blobs.c.raw_size), 0), func.coalesce(func.sum(blobs.c.compressed_size), 0))
+    ).one()
+    saved = logical_bytes - int(stored)
+    return {
+        'references': references,
+        'blobs': blob_count,
+        'logical_bytes': logical_bytes,
+        'unique_raw_bytes': int(unique_raw),
+        'stored_bytes': int(stored),
+        'saved_bytes': saved,
+        'saved_ratio': round(saved / logical_bytes, 4) if logical_bytes else 0.0,
+        'legacy_bytes': legacy_bytes,
+        'by_column': by_column
+    }
@@ -1,9 +1,20 @@
 import requests
-from bs4 import BeautifulSoup
+import httpx
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from src.services.market_cache import MarketDataCache
+from src.services.metrics import metrics
+from src.services.website_extractor import WebsiteExtractor, charset_from_content_type
+import asyncio
+import contextvars
 import json
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import os
+import time
+
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
 
 class DataIntegrationService:
     def __init__(self):
@@ -11,50 +22,115 @@ class DataIntegrationService:
         self.hubspot_api_key = os.getenv('HUBSPOT_API_KEY')
         self.salesforce_api_key = os.getenv('SALESFORCE_API_KEY')
         self.google_news_api_key = os.getenv('GOOGLE_NEWS_API_KEY')
+        
+        # Pool compartilhado para consultar as fontes de enriquecimento em paralelo
+        self.max_workers = int(os.getenv('ENRICHMENT_MAX_WORKERS', '8'))
+        self.source_timeout = float(os.getenv('ENRICHMENT_SOURCE_TIMEOUT', '10'))
+        self.enrichment_deadline = float(os.getenv('ENRICHMENT_DEADLINE', '12'))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='enrichment')
+        
+        # Extração do site: 'stream' para no limite de bytes ou quando já tem o necessário; 'full' baixa e parseia tudo
+        self.scrape_mode = os.getenv('SCRAPE_MODE', 'stream').lower()
+        self.scrape_max_bytes = int(os.getenv('SCRAPE_MAX_BYTES', str(1024 * 1024)))
+        self.scrape_chunk_bytes = int(os.getenv('SCRAPE_CHUNK_BYTES', str(16 * 1024)))
+        
+        # Notícias e concorrência dependem do setor: cache compartilhado entre projetos
+        self.market_cache = MarketDataCache()
     
-    def scrape_company_website(self, website_url: str) -> Dict:
+    def scrape_company_website(self, website_url: str, timeout: Optional[float] = None) -> Dict:
         """Extrair informações básicas do site da empresa"""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(website_url, headers=headers, timeout=10)
-            response.raise_for_status()
+            if self.scrape_mode == 'full':
+                with metrics.stage('scrape'):
+                    response = requests.get(website_url, headers=SCRAPE_HEADERS, timeout=timeout or self.source_timeout)
+                    response.raise_for_status()
+                return self._parse_website(website_url, response.content)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Download em blocos com parse incremental: encerra a conexão assim que o conteúdo basta
+            with metrics.stage('scrape'):
+                with requests.get(website_url, headers=SCRAPE_HEADERS, timeout=timeout or self.source_timeout,
+                                  stream=True) as response:
+                    response.raise_for_status()
+                    extractor = WebsiteExtractor(charset_from_content_type(response.headers.get('Content-Type')))
+                    for chunk in response.iter_content(chunk_size=self.scrape_chunk_bytes):
+                        extractor.feed_bytes(chunk)
+                        if extractor.done or extractor.bytes_read >= self.scrape_max_bytes:
+                            break
+                extractor.close()
+            return self._extraction_result(website_url, extractor)
             
-            # Extrair informações básicas
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else ''
-            
-            # Buscar descrição
-            description = soup.find('meta', attrs={'name': 'description'})
-            description_text = description.get('content', '') if description else ''
-            
-            # Buscar palavras-chave
-            keywords = soup.find('meta', attrs={'name': 'keywords'})
-            keywords_text = keywords.get('content', '') if keywords else ''
-            
-            # Extrair texto principal
-            main_content = []
-            for tag in soup.find_all(['h1', 'h2', 'h3', 'p']):
-                text = tag.get_text().strip()
-                if text and len(text) > 20:
-                    main_content.append(text)
-            
-            return {
-                'url': website_url,
-                'title': title_text,
-                'description': description_text,
-                'keywords': keywords_text,
-                'main_content': main_content[:10],  # Primeiros 10 parágrafos
-                'scraped_at': datetime.utcnow().isoformat()
-            }
+        except Exception as e:
+            return {'error': f'Erro ao extrair dados do site: {str(e)}'}
+    
+    async def scrape_company_website_async(self, website_url: str, timeout: Optional[float] = None) -> Dict:
+        """Versão não bloqueante de scrape_company_website (httpx.AsyncClient; o parse roda em thread)"""
+        try:
+            async with httpx.AsyncClient(headers=SCRAPE_HEADERS, timeout=timeout or self.source_timeout,
+                                         follow_redirects=True) as client:
+                if self.scrape_mode == 'full':
+                    with metrics.stage('scrape'):
+                        response = await client.get(website_url)
+                        response.raise_for_status()
+                    return await asyncio.to_thread(self._parse_website, website_url, response.content)
+                
+                with metrics.stage('scrape'):
+                    async with client.stream('GET', website_url) as response:
+                        response.raise_for_status()
+                        extractor = WebsiteExtractor(response.charset_encoding)
+                        async for chunk in response.aiter_bytes(chunk_size=self.scrape_chunk_bytes):
+                            await asyncio.to_thread(extractor.feed_bytes, chunk)
+                            if extractor.done or extractor.bytes_read >= self.scrape_max_bytes:
+                                break
+                    extractor.close()
+            return self._extraction_result(website_url, extractor)
             
         except Exception as e:
             return {'error': f'Erro ao extrair dados do site: {str(e)}'}
     
+    def _extraction_result(self, website_url: str, extractor: WebsiteExtractor) -> Dict:
+        return {
+            'url': website_url,
+            'title': extractor.title or '',
+            'description': extractor.meta.get('description', ''),
+            'keywords': extractor.meta.get('keywords', ''),
+            'main_content': extractor.main_content,
+            'scraped_at': datetime.utcnow().isoformat()
+        }
+    
+    @metrics.stage('scrape_parse')
+    def _parse_website(self, website_url: str, content: bytes) -> Dict:
+        """Extrair título, metadados e parágrafos principais do HTML já baixado"""
+        from bs4 import BeautifulSoup  # só carregado quando algum site é de fato extraído
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Extrair informações básicas
+        title = soup.find('title')
+        title_text = title.get_text().strip() if title else ''
+        
+        # Buscar descrição
+        description = soup.find('meta', attrs={'name': 'description'})
+        description_text = description.get('content', '') if description else ''
+        
+        # Buscar palavras-chave
+        keywords = soup.find('meta', attrs={'name': 'keywords'})
+        keywords_text = keywords.get('content', '') if keywords else ''
+        
+        # Extrair texto principal
+        main_content = []
+        for tag in soup.find_all(['h1', 'h2', 'h3', 'p']):
+            text = tag.get_text().strip()
+            if text and len(text) > 20:
+                main_content.append(text)
+        
+        return {
+            'url': website_url,
+            'title': title_text,
+            'description': description_text,
+            'keywords': keywords_text,
+            'main_content': main_content[:10],  # Primeiros 10 parágrafos
+            'scraped_at': datetime.utcnow().isoformat()
+        }
+    
     def get_company_linkedin_data(self, company_name: str) -> Dict:
         """Buscar dados da empresa no LinkedIn (simulado)"""
         # Em produção, usaria a API oficial do LinkedIn
@@ -186,36 +262,153 @@ class DataIntegrationService:
         
         return crm_data.get(crm_type.lower(), {})
     
-    def enrich_client_profile(self, basic_data: Dict) -> Dict:
-        """Enriquecer perfil do cliente com dados de múltiplas fontes"""
+    def enrich_client_profile(self, basic_data: Dict, deadline: Optional[float] = None,
+                              source_timeout: Optional[float] = None) -> Dict:
+        """Enriquecer perfil do cliente com dados de múltiplas fontes
+        
+        As fontes são consultadas em paralelo. Cada uma tem `source_timeout`
+        segundos a partir do momento em que começa a rodar (no pool compartilhado
+        ela pode esperar na fila) e o conjunto tem o prazo geral `deadline`,
+        contado do início da chamada. Fontes que estouram qualquer um dos dois
+        ficam de fora do resultado e são marcadas em 'source_status'.
+        """
+        
+        enriched_profile, sources, deadline, source_timeout = self._plan_enrichment(basic_data, deadline, source_timeout)
+        
+        started_at = time.monotonic()
+        source_started = {}
+        # Cada fonte roda com uma cópia do contexto: suas etapas entram no Server-Timing da requisição
+        futures = {
+            name: self._executor.submit(contextvars.copy_context().run, self._run_source, source_started, name, func, *args)
+            for name, (_, func, args) in sources.items()
+        }
+        with metrics.stage('enrichment'):
+            timed_out = self._wait_sources(futures, source_started, started_at + deadline, source_timeout)
+        
+        return self._merge_sources(enriched_profile, sources, futures, started_at, timed_out)
+    
+    async def enrich_client_profile_async(self, basic_data: Dict, deadline: Optional[float] = None,
+                                          source_timeout: Optional[float] = None) -> Dict:
+        """Versão não bloqueante de enrich_client_profile (modo ASGI)
+        
+        O site é baixado com httpx.AsyncClient; as demais fontes (simuladas ou
+        atrás do cache de mercado, que pode bloquear aguardando outra busca)
+        rodam em threads. Os limites são os mesmos do modo síncrono: cada fonte
+        com seu timeout e o conjunto com o prazo geral.
+        """
+        enriched_profile, sources, deadline, source_timeout = self._plan_enrichment(basic_data, deadline, source_timeout)
+        
+        started_at = time.monotonic()
+        tasks = {}
+        for name, (_, func, args) in sources.items():
+            if func == self.scrape_company_website:
+                source = self.scrape_company_website_async(*args)
+            else:
+                source = asyncio.to_thread(func, *args)
+            tasks[name] = asyncio.ensure_future(asyncio.wait_for(source, timeout=source_timeout))
+        timed_out = set()
+        if tasks:
+            with metrics.stage('enrichment'):
+                _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+            timed_out = {name for name, task in tasks.items() if task in pending}
+        
+        return self._merge_sources(enriched_profile, sources, tasks, started_at, timed_out)
+    
+    @staticmethod
+    def _run_source(source_started: Dict, name: str, func, *args):
+        source_started[name] = time.monotonic()
+        return func(*args)
+    
+    @staticmethod
+    def _wait_sources(futures: Dict, source_started: Dict, deadline_at: float, source_timeout: float) -> set:
+        """Aguardar as fontes até o prazo geral, descartando as que passam do próprio timeout; devolve as que estouraram"""
+        pending = dict(futures)
+        timed_out = set()
+        while pending:
+            now = time.monotonic()
+            for name in list(pending):
+                started = source_started.get(name)
+                if started is not None and now - started >= source_timeout and not pending[name].done():
+                    timed_out.add(name)
+                    del pending[name]
+            if not pending or now >= deadline_at:
+                break
+            
+            # Acorda no prazo geral, no fim do timeout da próxima fonte em execução ou, se alguma
+            # ainda está na fila, no máximo source_timeout depois (quando ela já terá começado)
+            wake_at = [deadline_at] + [source_started[name] + source_timeout for name in pending if name in source_started]
+            if any(name not in source_started for name in pending):
+                wake_at.append(now + source_timeout)
+            wait(pending.values(), timeout=max(min(wake_at) - now, 0), return_when=FIRST_COMPLETED)
+            for name in [name for name, future in pending.items() if future.done()]:
+                del pending[name]
         
+        timed_out.update(pending)
+        return timed_out
+    
+    def _plan_enrichment(self, basic_data: Dict, deadline: Optional[float], source_timeout: Optional[float]):
+        """Fontes a consultar para os dados informados, o prazo geral e o timeout de cada fonte"""
         company_name = basic_data.get('company_name', '')
         industry = basic_data.get('industry', '')
         website = basic_data.get('website', '')
         
+        deadline = float(deadline) if deadline is not None else self.enrichment_deadline
+        source_timeout = min(float(source_timeout) if source_timeout is not None else self.source_timeout, deadline)
+        
         enriched_profile = basic_data.copy()
         
-        # Dados do LinkedIn
+        # Fonte -> (chave no perfil, função, argumentos); só entram as fontes com dados suficientes.
+        # As fontes setoriais passam pelo cache compartilhado e retornam (valor, estado do cache)
+        sources = {}
         if company_name:
-            linkedin_data = self.get_company_linkedin_data(company_name)
-            enriched_profile['linkedin_data'] = linkedin_data
-        
-        # Dados do site
+            sources['linkedin'] = ('linkedin_data', self.get_company_linkedin_data, (company_name,))
         if website:
-            website_data = self.scrape_company_website(website)
-            enriched_profile['website_data'] = website_data
-        
-        # Notícias do setor
+            sources['website'] = ('website_data', self.scrape_company_website, (website, source_timeout))
         if industry:
-            news_data = self.get_industry_news(industry)
-            enriched_profile['industry_news'] = news_data
-        
-        # Análise de concorrentes
+            sources['industry_news'] = ('industry_news', self.market_cache.get, (
+                'industry_news', industry, lambda: self.get_industry_news(industry)
+            ))
         if company_name and industry:
-            competitor_data = self.get_competitor_analysis(company_name, industry)
-            enriched_profile['competitor_analysis'] = competitor_data
+            sources['competitor_analysis'] = ('competitor_analysis', self.market_cache.get, (
+                'competitor_analysis', industry, lambda: self.get_competitor_analysis(company_name, industry)
+            ))
+        
+        return enriched_profile, sources, deadline, source_timeout
+    
+    def _merge_sources(self, enriched_profile: Dict, sources: Dict, futures: Dict, started_at: float,
+                       timed_out: set) -> Dict:
+        """Incorporar ao perfil o resultado de cada fonte (futures ou tasks asyncio) e o status de cada uma"""
+        source_status = {}
+        for name, future in futures.items():
+            key = sources[name][0]
+            if name in timed_out or not future.done():
+                # Não bloqueia a resposta; a thread termina em segundo plano
+                future.cancel()
+                source_status[name] = {'status': 'timeout'}
+                continue
+            
+            exception = future.exception()
+            if isinstance(exception, (TimeoutError, asyncio.TimeoutError)):
+                source_status[name] = {'status': 'timeout'}
+                continue
+            if exception is not None:
+                source_status[name] = {'status': 'error', 'error': str(exception)}
+                continue
+            
+            result, cache_state = future.result(), None
+            if sources[name][1] == self.market_cache.get:
+                result, cache_state = result
+            enriched_profile[key] = result
+            if isinstance(result, dict) and result.get('error'):
+                source_status[name] = {'status': 'error', 'error': result['error']}
+            else:
+                source_status[name] = {'status': 'ok'}
+            if cache_state:
+                source_status[name]['cache'] = cache_state
         
+        enriched_profile['source_status'] = source_status
+        enriched_profile['enrichment_complete'] = all(s['status'] == 'ok' for s in source_status.values())
+        enriched_profile['enrichment_duration_ms'] = int((time.monotonic() - started_at) * 1000)
         enriched_profile['enrichment_date'] = datetime.utcnow().isoformat()
         
         return enriched_profile
-
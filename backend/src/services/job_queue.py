@@ -0,0 +1,263 @@
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import DBAPIError, OperationalError
+from werkzeug.exceptions import HTTPException
+from src.models.pitchcraft import db, Job
+from src.services.llm_router import error_status, is_retryable
+from src.services.rate_limiter import AdmissionRejected
+from typing import Callable, Dict, Optional
+from datetime import datetime, timedelta
+import httpx
+import json
+import os
+import requests
+import threading
+import time
+
+
+def is_transient(error: Exception) -> bool:
+    """Falhas que podem não se repetir numa nova tentativa: rede, timeouts, sobrecarga do provedor, banco indisponível
+
+    Erros determinísticos (projeto inexistente, dados inválidos, bugs) falham
+    de imediato em vez de consumir as tentativas restantes.
+    """
+    if isinstance(error, HTTPException):
+        return False  # ex.: NotFound de get_or_404
+    if isinstance(error, (AdmissionRejected, OperationalError)):
+        return True
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated
+    if error_status(error) is None and isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return True
+    return is_retryable(error)
+
+
+class JobQueue:
+    """Fila de tarefas persistida no banco, executada por um pool local de threads.
+
+    Não depende de broker externo: os workers buscam tarefas na tabela Job e as
+    reservam com um UPDATE condicional, o que permite vários processos
+    compartilharem a mesma fila. Cada tarefa em execução tem um lease renovado
+    periodicamente; se o processo cai, o lease vence e a tarefa volta à fila.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers if workers is not None else int(os.getenv('JOB_WORKERS', '2'))
+        self.poll_interval = float(os.getenv('JOB_POLL_INTERVAL', '0.5'))
+        self.default_max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        self.retry_backoff = float(os.getenv('JOB_RETRY_BACKOFF', '2'))
+        self.lease_seconds = float(os.getenv('JOB_LEASE_SECONDS', '60'))
+        self._handlers: Dict[str, Callable] = {}
+        self._running = set()  # tarefas em execução neste processo (lease renovado pelo heartbeat)
+        self._running_lock = threading.Lock()
+        self._next_reclaim_at = 0.0
+        self._app = None
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def register(self, kind: str, handler: Callable) -> None:
+        """Registrar a função que executa tarefas do tipo `kind` (recebe o payload como kwargs)"""
+        self._handlers[kind] = handler
+
+    def init_app(self, app) -> None:
+        """Associar a fila à aplicação e iniciar os workers"""
+        self._app = app
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.workers:
+            thread = threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def enqueue(self, kind: str, payload: Dict, max_attempts: Optional[int] = None) -> Job:
+        """Criar uma tarefa na fila e acordar os workers"""
+        if kind not in self._handlers:
+            raise ValueError(f'Tipo de tarefa desconhecido: {kind}')
+
+        job = Job(
+            kind=kind,
+            payload=json.dumps(payload),
+            status='queued',
+            max_attempts=max_attempts or self.default_max_attempts
+        )
+        db.session.add(job)
+        db.session.commit()
+        self._wakeup.set()
+        return job
+
+    def cancel(self, job: Job) -> Job:
+        """Cancelar uma tarefa; se já estiver em execução, o resultado é descartado ao final
+
+        As duas transições são UPDATEs condicionais: um worker que reserve a
+        tarefa ao mesmo tempo não tem o status trocado por baixo.
+        """
+        table = Job.__table__
+        cancelled = db.session.execute(
+            update(table)
+            .where(table.c.id == job.id, table.c.status == 'queued')
+            .values(status='cancelled', finished_at=datetime.utcnow())
+        )
+        if cancelled.rowcount == 0:
+            db.session.execute(
+                update(table)
+                .where(table.c.id == job.id, table.c.status == 'running')
+                .values(cancel_requested=True)
+            )
+        db.session.commit()
+        db.session.refresh(job)
+        return job
+
+    def metrics(self) -> Dict:
+        """Profundidade da fila e contagem de tarefas por status"""
+        table = Job.__table__
+        with db.engine.connect() as conn:
+            counts = dict(conn.execute(
+                select(table.c.status, func.count()).group_by(table.c.status)
+            ).all())
+            oldest_queued = conn.execute(
+                select(func.min(table.c.created_at)).where(table.c.status == 'queued')
+            ).scalar()
+
+        return {
+            'queue_depth': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'by_status': counts,
+            'oldest_queued_age_seconds': round((datetime.utcnow() - oldest_queued).total_seconds(), 3) if oldest_queued else 0,
+            'workers': len([t for t in self._threads if t.is_alive()]),
+            'registered_kinds': sorted(self._handlers)
+        }
+
+    def _worker_loop(self) -> None:
+        with self._app.app_context():
+            while not self._stop.is_set():
+                try:
+                    job_id = self._claim_next()
+                except Exception:
+                    job_id = None
+                if job_id is None:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self._execute(job_id)
+
+    def _heartbeat_loop(self) -> None:
+        """Renovar o lease das tarefas em execução neste processo"""
+        table = Job.__table__
+        with self._app.app_context():
+            while not self._stop.wait(self.lease_seconds / 3):
+                with self._running_lock:
+                    running = list(self._running)
+                if not running:
+                    continue
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(
+                            update(table)
+                            .where(table.c.id.in_(running), table.c.status == 'running')
+                            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                        )
+                except Exception:
+                    continue
+
+    def _reclaim_expired(self, conn, now: datetime) -> None:
+        """Devolver à fila (ou falhar, sem tentativas restantes) as tarefas cujo worker parou de renovar o lease"""
+        table = Job.__table__
+        expired = and_(
+            table.c.status == 'running',
+            or_(
+                table.c.lease_expires_at < now,
+                # Tarefas reservadas antes da coluna de lease existir
+                and_(table.c.lease_expires_at.is_(None), table.c.started_at < now - timedelta(seconds=self.lease_seconds))
+            )
+        )
+        conn.execute(
+            update(table)
+            .where(expired, table.c.attempts < table.c.max_attempts)
+            .values(status='queued', available_at=now, lease_expires_at=None, error='Lease expirado: worker interrompido')
+        )
+        conn.execute(
+            update(table)
+            .where(expired)
+            .values(status='failed', finished_at=now, lease_expires_at=None, error='Lease expirado: worker interrompido')
+        )
+
+    def _claim_next(self) -> Optional[int]:
+        """Reservar a tarefa mais antiga disponível; retorna None se a fila estiver vazia"""
+        table = Job.__table__
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            if time.monotonic() >= self._next_reclaim_at:
+                self._next_reclaim_at = time.monotonic() + self.lease_seconds / 3
+                self._reclaim_expired(conn, now)
+
+            candidates = conn.execute(
+                select(table.c.id)
+                .where(table.c.status == 'queued', table.c.available_at <= now)
+                .order_by(table.c.available_at, table.c.id)
+                .limit(self.workers)
+            ).scalars().all()
+
+            for job_id in candidates:
+                claimed = conn.execute(
+                    update(table)
+                    .where(table.c.id == job_id, table.c.status == 'queued')
+                    .values(status='running', started_at=now, attempts=table.c.attempts + 1,
+                            lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+                )
+                if claimed.rowcount == 1:
+                    with self._running_lock:
+                        self._running.add(job_id)
+                    return job_id
+        return None
+
+    def _execute(self, job_id: int) -> None:
+        table = Job.__table__
+        with db.engine.connect() as conn:
+            job = conn.execute(select(table).where(table.c.id == job_id)).first()
+
+        values = {'finished_at': datetime.utcnow(), 'lease_expires_at': None}
+        try:
+            handler = self._handlers[job.kind]
+            result = handler(**json.loads(job.payload or '{}'))
+            values.update(status='succeeded', result=json.dumps(result), error=None)
+        except Exception as e:
+            db.session.rollback()
+            values['error'] = str(e)
+            if is_transient(e) and job.attempts < job.max_attempts:
+                # Backoff exponencial antes da próxima tentativa (ou o Retry-After do provedor, se maior)
+                delay = self.retry_backoff ** job.attempts
+                if isinstance(e, AdmissionRejected):
+                    delay = max(delay, e.retry_after)
+                values.update(
+                    status='queued',
+                    finished_at=None,
+                    available_at=datetime.utcnow() + timedelta(seconds=delay)
+                )
+            else:
+                values['status'] = 'failed'
+        finally:
+            db.session.remove()
+            with self._running_lock:
+                self._running.discard(job_id)
+
+        with db.engine.begin() as conn:
+            cancel_requested = conn.execute(
+                select(table.c.cancel_requested).where(table.c.id == job_id)
+            ).scalar()
+            if cancel_requested:
+                values.update(status='cancelled', result=None, finished_at=datetime.utcnow())
+            # Só grava se a reserva ainda é desta tentativa (o lease pode ter vencido e outra tentativa começado)
+            conn.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status == 'running', table.c.attempts == job.attempts)
+                .values(**values)
+            )
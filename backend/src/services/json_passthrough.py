@@ -0,0 +1,49 @@
+from flask import current_app
+from src.services.metrics import metrics
+from typing import Optional
+import json
+import re
+import uuid
+
+
+class RawJSON:
+    """Texto JSON já serializado (ex.: coluna do banco) que vai para a resposta sem ser decodificado"""
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def raw_json(text: Optional[str], default=None):
+    """RawJSON para textos não vazios; `default` caso contrário (mesma regra do json.loads condicional)"""
+    return RawJSON(text) if text else default
+
+
+def dumps_with_raw(payload) -> str:
+    """Serializar `payload` inserindo os RawJSON literalmente no resultado
+
+    Cada RawJSON é trocado por um marcador com um nonce da resposta, que depois
+    é substituído pelo texto original; um texto do usuário não consegue forjar
+    o marcador porque não conhece o nonce.
+    """
+    nonce = uuid.uuid4().hex
+    fragments = []
+
+    def default(value):
+        if isinstance(value, RawJSON):
+            fragments.append(value.text)
+            return f'\x00{nonce}:{len(fragments) - 1}\x00'
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+    body = json.dumps(payload, default=default, separators=(',', ':'))
+    if not fragments:
+        return body
+    marker = re.compile(r'"\\u0000' + nonce + r':(\d+)\\u0000"')
+    return marker.sub(lambda match: fragments[int(match.group(1))], body)
+
+
+def passthrough_jsonify(payload, status: int = 200):
+    """Equivalente ao jsonify para payloads com RawJSON"""
+    with metrics.stage('json'):
+        body = dumps_with_raw(payload)
+    return current_app.response_class(body + '\n', status=status, mimetype='application/json')
@@ -0,0 +1,116 @@
+from typing import Dict, List
+import copy
+import re
+
+# Índice de lista da RFC 6901: "0" ou inteiro sem zeros à esquerda (nada de negativos)
+ARRAY_INDEX = re.compile(r'^(0|[1-9][0-9]*)$')
+
+
+class JSONPatchError(ValueError):
+    pass
+
+
+def _escape(token) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _list_index(items: list, token: str, for_add: bool = False) -> int:
+    """Posição válida na lista; "-" e len(items) só servem para add (acrescentar no fim)"""
+    if for_add and token == '-':
+        return len(items)
+    if not ARRAY_INDEX.match(token):
+        raise JSONPatchError(f'Índice de lista inválido: {token}')
+    index = int(token)
+    if index > len(items) or (index == len(items) and not for_add):
+        raise JSONPatchError(f'Índice fora da lista: {token}')
+    return index
+
+
+def make_patch(old, new, path: str = '') -> List[Dict]:
+    """Diferença entre dois documentos JSON como operações JSON Patch (RFC 6902: add/remove/replace)
+
+    Dicts e listas são comparados recursivamente; listas posição a posição, o
+    que gera patches pequenos para edições de slides no lugar.
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f'{path}/{_escape(key)}'})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({'op': 'add', 'path': f'{path}/{_escape(key)}', 'value': value})
+            else:
+                ops.extend(make_patch(old[key], value, f'{path}/{_escape(key)}'))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            ops.extend(make_patch(old[index], new[index], f'{path}/{index}'))
+        # Remoções do fim para o início, para os índices continuarem válidos
+        for index in range(len(old) - 1, common - 1, -1):
+            ops.append({'op': 'remove', 'path': f'{path}/{index}'})
+        for index in range(common, len(new)):
+            ops.append({'op': 'add', 'path': f'{path}/{index}', 'value': new[index]})
+        return ops
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def apply_patch(document, ops: List[Dict], in_place: bool = False):
+    """Aplicar operações add/remove/replace; retorna o novo documento"""
+    if not in_place:
+        document = copy.deepcopy(document)
+    for op in ops:
+        kind, path = op.get('op'), op.get('path', '')
+        if kind not in ('add', 'remove', 'replace'):
+            raise JSONPatchError(f'Operação não suportada: {kind}')
+        if path == '':
+            if kind == 'remove':
+                raise JSONPatchError('Não é possível remover o documento inteiro')
+            document = copy.deepcopy(op['value'])
+            continue
+
+        tokens = [_unescape(token) for token in path.split('/')[1:]]
+        parent = document
+        try:
+            for token in tokens[:-1]:
+                parent = parent[_list_index(parent, token)] if isinstance(parent, list) else parent[token]
+            last = tokens[-1]
+            if isinstance(parent, list):
+                index = _list_index(parent, last, for_add=kind == 'add')
+                if kind == 'add':
+                    parent.insert(index, copy.deepcopy(op['value']))
+                elif kind == 'remove':
+                    del parent[index]
+                else:
+                    parent[index] = copy.deepcopy(op['value'])
+            else:
+                if kind != 'add' and last not in parent:
+                    raise KeyError(last)
+                if kind == 'remove':
+                    del parent[last]
+                else:
+                    parent[last] = copy.deepcopy(op['value'])
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            raise JSONPatchError(f'Caminho inválido {path}: {e}')
+    return document
+
+
+def merge_patch(target, patch):
+    """JSON Merge Patch (RFC 7386): dicts são mesclados recursivamente e null remove a chave"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
@@ -0,0 +1,32 @@
+import threading
+
+
+class lazy_property:
+    """Atributo calculado no primeiro acesso e guardado na instância
+
+    Como functools.cached_property, mas com trava: a fábrica roda uma única vez
+    por instância mesmo com várias threads acessando ao mesmo tempo. Usado
+    para clientes de SDK caros de importar/instanciar, que só devem existir se
+    forem de fato usados. Atribuir um valor diretamente substitui a fábrica.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+        self._lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            pass
+        with self._lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.func(instance)
+        return instance.__dict__[self.name]
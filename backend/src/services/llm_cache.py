@@ -0,0 +1,218 @@
+from sqlalchemy import bindparam, delete, event, func, select, update
+from src.models.pitchcraft import db, LLMCacheEntry, ClientProfile, MarketIntelligence
+from typing import Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def project_scope(project_id: int) -> str:
+    """Escopo de invalidação das respostas geradas para um projeto"""
+    return f'project:{project_id}'
+
+
+class LLMCache:
+    """Cache persistente de respostas de LLM endereçado pelo conteúdo da chamada.
+
+    As entradas ficam na tabela LLMCacheEntry (mesmo banco da aplicação), expiram
+    após o TTL e, quando o limite de tamanho é atingido, as menos acessadas
+    recentemente (LRU) são removidas.
+
+    Um hit é só leitura: o último acesso fica em memória e é gravado em lote
+    (junto com o próximo `set` ou a cada LLM_CACHE_TOUCH_FLUSH_SECONDS), para
+    não transformar leituras em escritas que travam o SQLite. A limpeza roda a
+    cada LLM_CACHE_EVICT_EVERY gravações ou quando a contagem aproximada de
+    entradas passa do limite, em vez de um COUNT(*) a cada `set`.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.enabled = os.getenv('LLM_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv('LLM_CACHE_TTL_SECONDS', '86400'))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1000'))
+        self.touch_flush_seconds = float(os.getenv('LLM_CACHE_TOUCH_FLUSH_SECONDS', '30'))
+        self.evict_every = int(os.getenv('LLM_CACHE_EVICT_EVERY', '50'))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # chave -> (último acesso, hits ainda não gravados)
+        self._touches: Dict[str, Tuple[datetime, int]] = {}
+        self._flushed_at = time.monotonic()
+        self._approx_entries: Optional[int] = None
+        self._sets_since_evict = 0
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        """Gerar a chave a partir do modelo, temperatura e prompt normalizado"""
+        normalized_prompt = ' '.join(prompt.split())
+        payload = json.dumps({
+            'model': model,
+            'temperature': round(float(temperature), 3),
+            'prompt': normalized_prompt
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Buscar resposta em cache; retorna None em caso de miss ou expiração"""
+        if not self.enabled:
+            return None
+
+        table = LLMCacheEntry.__table__
+        now = datetime.utcnow()
+        try:
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(table.c.response, table.c.expires_at).where(table.c.cache_key == key)
+                ).first()
+        except Exception:
+            # Falhas no cache nunca devem impedir a geração
+            return None
+
+        if row is None or (row.expires_at and row.expires_at <= now):
+            # Entradas expiradas são removidas na próxima limpeza
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        with self._lock:
+            _, pending_hits = self._touches.get(key, (now, 0))
+            self._touches[key] = (now, pending_hits + 1)
+            flush_due = time.monotonic() - self._flushed_at >= self.touch_flush_seconds
+        if flush_due:
+            self.flush_touches()
+        return row.response
+
+    def set(self, key: str, response: str, model: str = '', scope: Optional[str] = None) -> None:
+        """Armazenar resposta e aplicar os limites de TTL e tamanho"""
+        if not self.enabled or response is None:
+            return
+
+        table = LLMCacheEntry.__table__
+        now = datetime.utcnow()
+        values = {
+            'scope': scope,
+            'model': model,
+            'response': response,
+            'created_at': now,
+            'last_accessed_at': now,
+            'expires_at': now + timedelta(seconds=self.ttl_seconds) if self.ttl_seconds else None
+        }
+        try:
+            with db.engine.begin() as conn:
+                updated = conn.execute(update(table).where(table.c.cache_key == key).values(**values))
+                inserted = updated.rowcount == 0
+                if inserted:
+                    conn.execute(table.insert().values(cache_key=key, hit_count=0, **values))
+                # Já é uma transação de escrita: grava junto os acessos pendentes
+                self._write_touches(conn)
+                if self._eviction_due(conn, inserted):
+                    self._evict(conn, now)
+        except Exception:
+            pass
+
+    def flush_touches(self) -> None:
+        """Gravar os últimos acessos e hits acumulados em memória (uma única transação)"""
+        try:
+            with db.engine.begin() as conn:
+                self._write_touches(conn)
+        except Exception:
+            pass
+
+    def invalidate_scope(self, scope: str) -> None:
+        """Remover todas as respostas associadas a um escopo (ex.: um projeto)"""
+        with db.engine.begin() as conn:
+            conn.execute(delete(LLMCacheEntry.__table__).where(LLMCacheEntry.__table__.c.scope == scope))
+
+    def clear(self) -> None:
+        with db.engine.begin() as conn:
+            conn.execute(delete(LLMCacheEntry.__table__))
+        with self._lock:
+            self._touches.clear()
+            self._approx_entries = 0
+            self._sets_since_evict = 0
+
+    def stats(self) -> Dict:
+        """Contadores de hit/miss do processo e tamanho atual do cache"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        try:
+            with db.engine.connect() as conn:
+                entries = conn.execute(select(func.count()).select_from(LLMCacheEntry.__table__)).scalar()
+        except Exception:
+            entries = None
+        return {
+            'enabled': self.enabled,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _write_touches(self, conn) -> None:
+        with self._lock:
+            touches, self._touches = self._touches, {}
+            self._flushed_at = time.monotonic()
+        if not touches:
+            return
+        table = LLMCacheEntry.__table__
+        conn.execute(
+            update(table)
+            .where(table.c.cache_key == bindparam('key'))
+            .values(last_accessed_at=bindparam('accessed_at'), hit_count=table.c.hit_count + bindparam('hits')),
+            [{'key': key, 'accessed_at': accessed_at, 'hits': hits} for key, (accessed_at, hits) in touches.items()]
+        )
+
+    def _eviction_due(self, conn, inserted: bool) -> bool:
+        """Limpar a cada `evict_every` gravações ou quando a contagem aproximada passa do limite"""
+        with self._lock:
+            if self._approx_entries is not None and inserted:
+                self._approx_entries += 1
+            known = self._approx_entries is not None
+        if not known:
+            # Primeira gravação do processo: parte da contagem real (já com esta entrada)
+            total = conn.execute(select(func.count()).select_from(LLMCacheEntry.__table__)).scalar()
+            with self._lock:
+                self._approx_entries = total
+        with self._lock:
+            self._sets_since_evict += 1
+            return self._approx_entries > self.max_entries or self._sets_since_evict >= self.evict_every
+
+    def _evict(self, conn, now: datetime) -> None:
+        table = LLMCacheEntry.__table__
+        conn.execute(delete(table).where(table.c.expires_at <= now))
+
+        total = conn.execute(select(func.count()).select_from(table)).scalar()
+        overflow = total - self.max_entries
+        if overflow > 0:
+            oldest = select(table.c.id).order_by(table.c.last_accessed_at.asc()).limit(overflow)
+            conn.execute(delete(table).where(table.c.id.in_(oldest.scalar_subquery())))
+        with self._lock:
+            self._approx_entries = total - max(overflow, 0)
+            self._sets_since_evict = 0
+
+
+def _invalidate_project_cache(mapper, connection, target):
+    """Invalidar respostas do projeto quando perfil do cliente ou inteligência de mercado mudam"""
+    if target.project_id is not None:
+        connection.execute(
+            delete(LLMCacheEntry.__table__).where(
+                LLMCacheEntry.__table__.c.scope == project_scope(target.project_id)
+            )
+        )
+
+
+for _model in (ClientProfile, MarketIntelligence):
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _invalidate_project_cache)
@@ -0,0 +1,556 @@
+from src.services.rate_limiter import AdmissionRejected, ProviderLimiter
+from src.services.prompt_builder import estimate_tokens
+from src.services.lazy import lazy_property
+from src.services.metrics import metrics
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+# Modelo equivalente em cada provedor para os modelos pedidos pelo AIService
+MODEL_EQUIVALENTS = {
+    'anthropic': {
+        'gpt-4': os.getenv('ANTHROPIC_MODEL', 'claude-3-5-sonnet-latest'),
+        'gpt-3.5-turbo': os.getenv('ANTHROPIC_FAST_MODEL', 'claude-3-5-haiku-latest'),
+    },
+}
+
+
+class LLMProvider:
+    """Interface mínima de um provedor: `complete(model, prompt, temperature)`
+
+    O retorno é o texto gerado ou um dict {'text', 'prompt_tokens', 'completion_tokens'}
+    quando o provedor informa o consumo. Qualquer objeto com `name`, `rate_limiter`
+    (um ProviderLimiter)
+    e `complete` pode ser usado pelo roteador, o que permite exercitá-lo com
+    provedores stub locais. `complete_async` é usado no modo ASGI; a
+    implementação padrão executa `complete` em uma thread.
+    """
+
+    name = 'provider'
+
+    def __init__(self):
+        self.rate_limiter = ProviderLimiter.from_env(self.name)
+
+    def complete(self, model: str, prompt: str, temperature: float):
+        raise NotImplementedError
+
+    async def complete_async(self, model: str, prompt: str, temperature: float):
+        """Versão awaitable de `complete`; sem cliente assíncrono nativo, roda em uma thread"""
+        return await asyncio.to_thread(self.complete, model, prompt, temperature)
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI; o SDK só é importado e o cliente só é criado na primeira chamada"""
+
+    name = 'openai'
+
+    def __init__(self, client=None, async_client=None, api_key: Optional[str] = None):
+        super().__init__()
+        self.api_key = api_key
+        if client is not None:
+            self.client = client
+        if async_client is not None:
+            self.async_client = async_client
+
+    @lazy_property
+    def client(self):
+        import openai
+        # Sem retentativas no SDK: o roteador repete a chamada respeitando os limites do provedor
+        return openai.OpenAI(api_key=self.api_key, max_retries=0)
+
+    @lazy_property
+    def async_client(self):
+        if self.api_key is None:
+            # Cliente injetado sem chave: complete_async recorre a uma thread
+            return None
+        import openai
+        return openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
+
+    def complete(self, model: str, prompt: str, temperature: float) -> Dict:
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature
+        )
+        return self._result(response)
+
+    async def complete_async(self, model: str, prompt: str, temperature: float) -> Dict:
+        if self.async_client is None:
+            return await super().complete_async(model, prompt, temperature)
+        response = await self.async_client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature
+        )
+        return self._result(response)
+
+    @staticmethod
+    def _result(response) -> Dict:
+        usage = getattr(response, 'usage', None)
+        return {
+            'text': response.choices[0].message.content,
+            'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+            'completion_tokens': getattr(usage, 'completion_tokens', None)
+        }
+
+
+class AnthropicProvider(LLMProvider):
+    """Anthropic; o SDK só é importado e o cliente só é criado na primeira chamada"""
+
+    name = 'anthropic'
+
+    def __init__(self, client=None, async_client=None, api_key: Optional[str] = None):
+        super().__init__()
+        self.api_key = api_key
+        if client is not None:
+            self.client = client
+        if async_client is not None:
+            self.async_client = async_client
+
+    @lazy_property
+    def client(self):
+        import anthropic
+        return anthropic.Anthropic(api_key=self.api_key, max_retries=0)
+
+    @lazy_property
+    def async_client(self):
+        if self.api_key is None:
+            return None
+        import anthropic
+        return anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=0)
+
+    def complete(self, model: str, prompt: str, temperature: float) -> Dict:
+        response = self.client.messages.create(**self._request(model, prompt, temperature))
+        return self._result(response)
+
+    async def complete_async(self, model: str, prompt: str, temperature: float) -> Dict:
+        if self.async_client is None:
+            return await super().complete_async(model, prompt, temperature)
+        response = await self.async_client.messages.create(**self._request(model, prompt, temperature))
+        return self._result(response)
+
+    @staticmethod
+    def _request(model: str, prompt: str, temperature: float) -> Dict:
+        return {
+            'model': MODEL_EQUIVALENTS['anthropic'].get(model, model),
+            'max_tokens': int(os.getenv('ANTHROPIC_MAX_TOKENS', '2048')),
+            'temperature': temperature,
+            'messages': [{"role": "user", "content": prompt}]
+        }
+
+    @staticmethod
+    def _result(response) -> Dict:
+        usage = getattr(response, 'usage', None)
+        return {
+            'text': ''.join(block.text for block in response.content if getattr(block, 'text', None)),
+            'prompt_tokens': getattr(usage, 'input_tokens', None),
+            'completion_tokens': getattr(usage, 'output_tokens', None)
+        }
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini; o SDK (o mais lento de importar) só é carregado na primeira chamada"""
+
+    name = 'gemini'
+
+    def __init__(self, model=None, api_key: Optional[str] = None):
+        super().__init__()
+        self.api_key = api_key
+        if model is not None:
+            self.model = model
+
+    @lazy_property
+    def model(self):
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+        return genai.GenerativeModel(os.getenv('GEMINI_MODEL', 'gemini-pro'))
+
+    def complete(self, model: str, prompt: str, temperature: float) -> Dict:
+        response = self.model.generate_content(prompt, generation_config={'temperature': temperature})
+        usage = getattr(response, 'usage_metadata', None)
+        return {
+            'text': response.text,
+            'prompt_tokens': getattr(usage, 'prompt_token_count', None),
+            'completion_tokens': getattr(usage, 'candidates_token_count', None)
+        }
+
+
+# Erros transitórios pelo nome da classe, sem importar os SDKs (carregados só no primeiro uso)
+RETRYABLE_ERRORS = ('APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError',
+                    'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded', 'TransportError')
+
+
+def error_status(error: Exception) -> Optional[int]:
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is None and type(error).__name__ == 'ResourceExhausted':
+        return 429
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """429, 408/409, 5xx, timeouts e falhas de conexão valem uma nova tentativa"""
+    status = error_status(error)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Espera pedida pelo provedor nos cabeçalhos retry-after-ms / Retry-After (segundos ou data HTTP)"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return max(0.0, float(headers['retry-after-ms']) / 1000)
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderStats:
+    """Janela móvel de latência e erros de um provedor"""
+
+    def __init__(self, window: int = 50, failure_threshold: int = 3, cooldown_seconds: float = 30):
+        self.samples = deque(maxlen=window)  # (latência em segundos, sucesso)
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.samples.append((latency, ok))
+            if ok:
+                self.consecutive_failures = 0
+            else:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= self.failure_threshold:
+                    # Circuito aberto: o provedor sai da rotação durante o cooldown
+                    self.unhealthy_until = time.monotonic() + self.cooldown_seconds
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))
+        return latencies[index]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def to_dict(self) -> Dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            'samples': len(self.samples),
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'error_rate': round(self.error_rate, 4),
+            'healthy': self.healthy
+        }
+
+
+class LLMRouter:
+    """Escolher o provedor saudável mais rápido, com failover e hedging opcional.
+
+    Os provedores são ordenados pela latência p50 observada (ajustada pela taxa
+    de erro); sem amostras, vale a ordem configurada. Com hedging ativo, se o
+    primeiro provedor não responder dentro do orçamento de latência, um segundo
+    é acionado em paralelo e vence quem responder primeiro.
+    """
+
+    def __init__(self, providers: List, hedge_enabled: Optional[bool] = None,
+                 hedge_after_seconds: Optional[float] = None):
+        self.providers = list(providers)
+        self.stats = {provider.name: ProviderStats() for provider in self.providers}
+        if hedge_enabled is None:
+            hedge_enabled = os.getenv('LLM_HEDGE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+        self.hedge_enabled = hedge_enabled
+        if hedge_after_seconds is None and os.getenv('LLM_HEDGE_AFTER_SECONDS'):
+            hedge_after_seconds = float(os.getenv('LLM_HEDGE_AFTER_SECONDS'))
+        self.hedge_after_seconds = hedge_after_seconds
+        self.hedges_fired = 0
+        self.usage_totals = {}  # (provedor, modelo) -> contadores acumulados
+        self.recent_calls = deque(maxlen=int(os.getenv('LLM_USAGE_HISTORY', '100')))
+        self._usage_lock = threading.Lock()
+        # Retentativas de erros transitórios: Retry-After do provedor ou backoff exponencial com jitter
+        self.max_retries = int(os.getenv('LLM_MAX_RETRIES', '2'))
+        self.retry_base_seconds = float(os.getenv('LLM_RETRY_BASE_SECONDS', '0.5'))
+        self.retry_max_seconds = float(os.getenv('LLM_RETRY_MAX_SECONDS', '20'))
+        # Estimativas usadas pelo controle de admissão antes da chamada
+        self.expected_latency_seconds = float(os.getenv('LLM_EXPECTED_LATENCY_SECONDS', '5'))
+        self.expected_completion_tokens = int(os.getenv('LLM_EXPECTED_COMPLETION_TOKENS', '800'))
+        # Pool usado apenas nas chamadas com hedging (primária + secundária de cada requisição)
+        self._executor = ThreadPoolExecutor(max_workers=int(os.getenv('LLM_ROUTER_MAX_WORKERS', '32')), thread_name_prefix='llm-router')
+
+    @property
+    def available(self) -> bool:
+        return bool(self.providers)
+
+    def get(self, name: str):
+        return next((provider for provider in self.providers if provider.name == name), None)
+
+    def ranked_providers(self) -> List:
+        """Provedores saudáveis do mais rápido ao mais lento; os em cooldown ficam por último"""
+        def score(item):
+            position, provider = item
+            stats = self.stats[provider.name]
+            p50 = stats.percentile(50)
+            if p50 is not None:
+                latency = p50
+            else:
+                # Sem sucesso registrado: desconhecido (0) se nunca foi usado, pior caso se só falhou
+                latency = float('inf') if stats.samples else 0.0
+            return (not stats.healthy, latency * (1 + stats.error_rate * 4), position)
+        return [provider for _, provider in sorted(enumerate(self.providers), key=score)]
+
+    def record(self, name: str, latency: float, ok: bool) -> None:
+        self.stats[name].record(latency, ok)
+
+    def record_usage(self, name: str, model: str, prompt: str, text: str, latency: float,
+                     prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None) -> Dict:
+        """Registrar tokens de entrada/saída da chamada (estimados quando o provedor não informa)"""
+        call = {
+            'provider': name,
+            'model': model,
+            'prompt_tokens': prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt),
+            'completion_tokens': completion_tokens if completion_tokens is not None else estimate_tokens(text),
+            'estimated': prompt_tokens is None or completion_tokens is None,
+            'latency_ms': round(latency * 1000, 1),
+            'at': time.time()
+        }
+        with self._usage_lock:
+            self.recent_calls.append(call)
+            totals = self.usage_totals.setdefault(f'{name}:{model}', {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0})
+            totals['calls'] += 1
+            totals['prompt_tokens'] += call['prompt_tokens']
+            totals['completion_tokens'] += call['completion_tokens']
+        return call
+
+    def complete(self, model: str, prompt: str, temperature: float) -> Tuple[str, str]:
+        """Executar a chamada no melhor provedor; retorna (texto, nome do provedor)"""
+        if not self.providers:
+            raise RuntimeError('Nenhum provedor de IA configurado')
+
+        ranked = self.ranked_providers()
+        last_error = None
+        while ranked:
+            primary = ranked.pop(0)
+            budget = self._hedge_budget(primary)
+            try:
+                if budget is not None and ranked:
+                    secondary = ranked.pop(0)
+                    return self._complete_hedged(primary, secondary, budget, model, prompt, temperature)
+                return self._call(primary, model, prompt, temperature), primary.name
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    async def complete_async(self, model: str, prompt: str, temperature: float) -> Tuple[str, str]:
+        """Mesma escolha de provedor de `complete`, aguardando a resposta sem bloquear o event loop"""
+        if not self.providers:
+            raise RuntimeError('Nenhum provedor de IA configurado')
+
+        ranked = self.ranked_providers()
+        last_error = None
+        while ranked:
+            primary = ranked.pop(0)
+            budget = self._hedge_budget(primary)
+            try:
+                if budget is not None and ranked:
+                    secondary = ranked.pop(0)
+                    return await self._complete_hedged_async(primary, secondary, budget, model, prompt, temperature)
+                return await self._call_async(primary, model, prompt, temperature), primary.name
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def snapshot(self) -> Dict:
+        return {
+            'providers': {name: stats.to_dict() for name, stats in self.stats.items()},
+            'order': [provider.name for provider in self.ranked_providers()],
+            'hedge_enabled': self.hedge_enabled,
+            'hedges_fired': self.hedges_fired,
+            'limits': {provider.name: provider.rate_limiter.snapshot() for provider in self.providers},
+            'usage': self.usage_snapshot()
+        }
+
+    def usage_snapshot(self) -> Dict:
+        with self._usage_lock:
+            return {
+                'totals': {key: dict(value) for key, value in self.usage_totals.items()},
+                'recent_calls': list(self.recent_calls)
+            }
+
+    def _hedge_budget(self, provider) -> Optional[float]:
+        if not self.hedge_enabled:
+            return None
+        if self.hedge_after_seconds is not None:
+            return self.hedge_after_seconds
+        # Sem orçamento fixo, dispara o hedge quando o provedor passa do próprio p95
+        return self.stats[provider.name].percentile(95)
+
+    def call_tokens(self, prompt: str) -> int:
+        """Tokens reservados para uma chamada: o prompt estimado mais a resposta esperada"""
+        return estimate_tokens(prompt) + self.expected_completion_tokens
+
+    def expected_latency(self, provider) -> float:
+        p50 = self.stats[provider.name].percentile(50) if provider.name in self.stats else None
+        return p50 if p50 is not None else self.expected_latency_seconds
+
+    def limit(self, provider, model: str, prompt: str):
+        """Vaga do provedor para uma chamada fora do roteador (ex.: streaming)"""
+        return provider.rate_limiter.slot(model, self.call_tokens(prompt), self.expected_latency(provider))
+
+    def _retry_delay(self, provider, model: str, error: Exception, attempt: int) -> Optional[float]:
+        """Espera antes da próxima tentativa; None se o erro não for transitório ou as tentativas acabaram
+
+        Um 429 segura as próximas chamadas ao modelo pelo Retry-After. Se o
+        provedor pedir mais espera do que LLM_RETRY_MAX_SECONDS, ou os 429
+        esgotarem as tentativas, a chamada falha como sobrecarga (HTTP 503)
+        em vez de cair no conteúdo de demonstração.
+        """
+        if not is_retryable(error):
+            return None
+        retry_after = retry_after_seconds(error)
+        throttled = error_status(error) == 429
+        if retry_after is None:
+            # Full jitter: clientes que falharam juntos não voltam todos ao mesmo tempo
+            delay = random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+        else:
+            delay = retry_after + random.uniform(0, self.retry_base_seconds)
+        if throttled:
+            provider.rate_limiter.pause(model, delay)
+        if attempt >= self.max_retries or (retry_after is not None and retry_after > self.retry_max_seconds):
+            if throttled:
+                raise AdmissionRejected(provider.name, max(delay, 1.0), 'limite do provedor') from error
+            return None
+        return delay
+
+    def _call(self, provider, model: str, prompt: str, temperature: float) -> str:
+        tokens = self.call_tokens(prompt)
+        attempt = 0
+        while True:
+            started_at = None
+            try:
+                with provider.rate_limiter.slot(model, tokens, self.expected_latency(provider)):
+                    started_at = time.monotonic()
+                    with metrics.llm_call(provider.name):
+                        result = provider.complete(model, prompt, temperature)
+            except AdmissionRejected:
+                raise
+            except Exception as e:
+                if started_at is not None:
+                    self.record(provider.name, time.monotonic() - started_at, ok=False)
+                delay = self._retry_delay(provider, model, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            latency = time.monotonic() - started_at
+            self.record(provider.name, latency, ok=True)
+            return self._finish_call(provider, model, prompt, result, latency, tokens)
+
+    async def _call_async(self, provider, model: str, prompt: str, temperature: float) -> str:
+        tokens = self.call_tokens(prompt)
+        attempt = 0
+        while True:
+            started_at = None
+            try:
+                async with provider.rate_limiter.slot_async(model, tokens, self.expected_latency(provider)):
+                    started_at = time.monotonic()
+                    with metrics.llm_call(provider.name):
+                        if hasattr(provider, 'complete_async'):
+                            result = await provider.complete_async(model, prompt, temperature)
+                        else:
+                            result = await asyncio.to_thread(provider.complete, model, prompt, temperature)
+            except AdmissionRejected:
+                raise
+            except Exception as e:
+                if started_at is not None:
+                    self.record(provider.name, time.monotonic() - started_at, ok=False)
+                delay = self._retry_delay(provider, model, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            latency = time.monotonic() - started_at
+            self.record(provider.name, latency, ok=True)
+            return self._finish_call(provider, model, prompt, result, latency, tokens)
+
+    def _finish_call(self, provider, model: str, prompt: str, result, latency: float, reserved_tokens: int = 0) -> str:
+        if not isinstance(result, dict):
+            result = {'text': result}
+        call = self.record_usage(provider.name, model, prompt, result['text'], latency,
+                                 result.get('prompt_tokens'), result.get('completion_tokens'))
+        if not call['estimated']:
+            provider.rate_limiter.settle(model, reserved_tokens, call['prompt_tokens'] + call['completion_tokens'])
+        return result['text']
+
+    def _complete_hedged(self, primary, secondary, budget: float, model: str, prompt: str,
+                         temperature: float) -> Tuple[str, str]:
+        futures = {self._executor.submit(self._call, primary, model, prompt, temperature): primary.name}
+        done, _ = wait(futures, timeout=budget)
+        if not done:
+            self.hedges_fired += 1
+            futures[self._executor.submit(self._call, secondary, model, prompt, temperature)] = secondary.name
+        elif next(iter(done)).exception() is not None:
+            # O primário falhou antes do orçamento: vai direto para o secundário
+            futures[self._executor.submit(self._call, secondary, model, prompt, temperature)] = secondary.name
+
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # A chamada perdedora segue em segundo plano só para registrar a latência
+                    return future.result(), futures[future]
+                last_error = future.exception()
+        raise last_error
+
+    async def _complete_hedged_async(self, primary, secondary, budget: float, model: str, prompt: str,
+                                     temperature: float) -> Tuple[str, str]:
+        tasks = {asyncio.ensure_future(self._call_async(primary, model, prompt, temperature)): primary.name}
+        done, _ = await asyncio.wait(tasks, timeout=budget)
+        if not done:
+            self.hedges_fired += 1
+            tasks[asyncio.ensure_future(self._call_async(secondary, model, prompt, temperature))] = secondary.name
+        elif next(iter(done)).exception() is not None:
+            tasks[asyncio.ensure_future(self._call_async(secondary, model, prompt, temperature))] = secondary.name
+
+        pending = set(tasks)
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    # A tarefa perdedora continua no event loop só para registrar a latência
+                    return task.result(), tasks[task]
+                last_error = task.exception()
+        raise last_error
@@ -0,0 +1,136 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import copy
+import json
+import os
+import threading
+import time
+
+
+# TTL padrão (segundos) de cada fonte de inteligência de mercado
+DEFAULT_SOURCE_TTLS = {
+    'industry_news': 3600,
+    'competitor_analysis': 86400,
+}
+
+
+class MarketDataCache:
+    """Cache compartilhado entre projetos para dados que dependem do setor
+
+    A chave é (fonte, setor, parâmetros). Entradas dentro do TTL são servidas
+    direto; entradas vencidas, mas dentro da janela de obsolescência, são
+    servidas na hora enquanto um refresh roda em segundo plano
+    (stale-while-revalidate). Buscas simultâneas da mesma chave compartilham
+    uma única execução (single-flight), evitando a corrida de vários projetos
+    do mesmo setor.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, stale_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.enabled = os.getenv('MARKET_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.ttls = dict(DEFAULT_SOURCE_TTLS)
+        for source in DEFAULT_SOURCE_TTLS:
+            env_value = os.getenv(f'MARKET_CACHE_TTL_{source.upper()}')
+            if env_value:
+                self.ttls[source] = float(env_value)
+        self.ttls.update(ttls or {})
+        self.stale_seconds = stale_seconds if stale_seconds is not None else float(os.getenv('MARKET_CACHE_STALE_SECONDS', '604800'))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('MARKET_CACHE_MAX_ENTRIES', '500'))
+        self._entries = OrderedDict()  # chave -> (valor, obtido em)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='market-cache-refresh')
+        self.counters = {'fresh': 0, 'stale': 0, 'miss': 0, 'coalesced': 0, 'refreshes': 0}
+
+    @staticmethod
+    def make_key(source: str, industry: str, params: Optional[Dict] = None) -> str:
+        normalized_industry = ' '.join((industry or '').lower().split())
+        return f"{source}:{normalized_industry}:{json.dumps(params or {}, sort_keys=True)}"
+
+    def get(self, source: str, industry: str, fetch: Callable, params: Optional[Dict] = None) -> Tuple[object, str]:
+        """Valor da fonte para o setor; retorna (valor, estado) com estado fresh, stale, miss ou coalesced"""
+        if not self.enabled:
+            return fetch(), 'miss'
+
+        key = self.make_key(source, industry, params)
+        now = time.time()
+        ttl = self.ttls.get(source, 3600)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age <= ttl:
+                    self._entries.move_to_end(key)
+                    self.counters['fresh'] += 1
+                    return copy.deepcopy(value), 'fresh'
+                if age <= ttl + self.stale_seconds:
+                    self._entries.move_to_end(key)
+                    self.counters['stale'] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = Future()
+                        self.counters['refreshes'] += 1
+                        self._refresher.submit(self._load, key, fetch)
+                    return copy.deepcopy(value), 'stale'
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = self._inflight[key] = Future()
+                owner = True
+                self.counters['miss'] += 1
+            else:
+                owner = False
+                self.counters['coalesced'] += 1
+
+        if owner:
+            # Quem chegou primeiro busca na fonte; os demais aguardam o mesmo resultado
+            self._load(key, fetch)
+        return copy.deepcopy(inflight.result()), 'miss' if owner else 'coalesced'
+
+    def invalidate(self, source: Optional[str] = None) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if source is None or key.startswith(f'{source}:')]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._entries)
+            inflight = len(self._inflight)
+        served = counters['fresh'] + counters['stale'] + counters['coalesced']
+        total = served + counters['miss']
+        return {
+            'enabled': self.enabled,
+            'entries': entries,
+            'inflight': inflight,
+            'ttls': self.ttls,
+            'stale_seconds': self.stale_seconds,
+            'hit_rate': round(served / total, 4) if total else 0.0,
+            **counters
+        }
+
+    def _load(self, key: str, fetch: Callable) -> None:
+        """Executar a busca e publicar o resultado para todos que aguardam a chave"""
+        with self._lock:
+            future = self._inflight[key]
+        try:
+            value = fetch()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            # Resultados vazios ou com erro não são guardados
+            if value and not (isinstance(value, dict) and value.get('error')):
+                self._entries[key] = (value, time.time())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(value)
@@ -0,0 +1,253 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from typing import Callable, Dict, List, Optional, Tuple
+import contextvars
+import os
+import threading
+import time
+
+# Limites (segundos) dos buckets: de consultas ao banco (ms) a chamadas de modelo (dezenas de segundos)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INF_LABEL = 'le="+Inf"'
+
+# Etapas da requisição em andamento: lista compartilhada pelas threads/tasks que copiam o contexto
+_request_stages: contextvars.ContextVar = contextvars.ContextVar('request_stages', default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Histograma com rótulos no formato de exposição do Prometheus"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, List] = {}  # rótulos -> [contagem por bucket, soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _labels(self.label_names, labels, 'le="%s"' % _number(bound))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, INF_LABEL)} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {count}')
+        return lines
+
+
+class Gauge:
+    """Valor instantâneo (ex.: chamadas em andamento) por combinação de rótulos"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} gauge']
+        lines.extend(f'{self.name}{_labels(self.label_names, labels)} {_number(value)}' for labels, value in sorted(values.items()))
+        return lines
+
+
+class Metrics:
+    """Duração por etapa das requisições (cabeçalho Server-Timing) e métricas no formato do Prometheus
+
+    As etapas (banco, modelo, cache, scraping, parse, JSON) são registradas com
+    `metrics.stage('nome')` (bloco `with` ou decorador) em qualquer ponto do
+    caminho da requisição. Cada etapa alimenta o histograma do processo e, se
+    houver uma requisição em andamento no contexto, entra no Server-Timing da
+    resposta. Etapas em paralelo (fontes de enriquecimento) aparecem somadas.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.server_timing = os.getenv('METRICS_SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+        self.stage_seconds = Histogram(
+            'pitchcraft_stage_duration_seconds', 'Duração de cada etapa do processamento das requisições', ('stage',)
+        )
+        self.request_seconds = Histogram(
+            'pitchcraft_http_request_duration_seconds', 'Duração das requisições HTTP por rota', ('method', 'endpoint', 'status')
+        )
+        self.requests_in_flight = Gauge('pitchcraft_http_requests_in_flight', 'Requisições HTTP em andamento')
+        self.llm_in_flight = Gauge('pitchcraft_llm_calls_in_flight', 'Chamadas aos provedores de IA em andamento', ('provider',))
+        self._caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Medir um trecho como a etapa `name` (também serve como decorador)"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - started_at)
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        self.stage_seconds.observe(seconds, name)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((name, seconds))
+
+    @contextmanager
+    def llm_call(self, provider: str):
+        """Contar uma chamada ao provedor como em andamento enquanto o bloco executa"""
+        self.llm_in_flight.inc(provider)
+        try:
+            yield
+        finally:
+            self.llm_in_flight.dec(provider)
+
+    def register_cache(self, name: str, counters: Callable[[], Tuple[int, int]]) -> None:
+        """Expor hits/misses de um cache; `counters` devolve (hits, misses) sem consultar o banco"""
+        self._caches[name] = counters
+
+    def begin_request(self):
+        """Abrir a coleta de etapas da requisição atual; devolve o token para end_request"""
+        self.requests_in_flight.inc()
+        return time.perf_counter(), _request_stages.set([])
+
+    def end_request(self, handle, method: str, endpoint: str, status: int) -> Optional[str]:
+        """Fechar a coleta, registrar a duração da rota e devolver o valor do Server-Timing (ou None)"""
+        started_at, token = handle
+        elapsed = time.perf_counter() - started_at
+        stages = _request_stages.get() or []
+        _request_stages.reset(token)
+        self.requests_in_flight.dec()
+        if not self.enabled:
+            return None
+        self.request_seconds.observe(elapsed, method, endpoint, str(status))
+        return self.server_timing_header(stages, elapsed) if self.server_timing else None
+
+    @staticmethod
+    def server_timing_header(stages: List[Tuple[str, float]], total: float) -> str:
+        totals, counts = {}, {}
+        for name, seconds in list(stages):
+            totals[name] = totals.get(name, 0.0) + seconds
+            counts[name] = counts.get(name, 0) + 1
+        entries = [f'{name};dur={seconds * 1000:.1f};desc="{counts[name]}x"' for name, seconds in totals.items()]
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+    def render(self) -> str:
+        lines = self.stage_seconds.render() + self.request_seconds.render()
+        lines += self.requests_in_flight.render() + self.llm_in_flight.render()
+
+        caches = {}
+        for name, counters in sorted(self._caches.items()):
+            try:
+                caches[name] = counters()
+            except Exception:
+                continue
+        for metric, help_text, value in (
+            ('pitchcraft_cache_hits_total', 'Consultas atendidas pelo cache', lambda hits, misses: hits),
+            ('pitchcraft_cache_misses_total', 'Consultas não atendidas pelo cache', lambda hits, misses: misses),
+            ('pitchcraft_cache_hit_ratio', 'Fração das consultas atendidas pelo cache', lambda hits, misses: round(hits / (hits + misses), 4) if hits + misses else 0),
+        ):
+            metric_type = 'gauge' if metric.endswith('ratio') else 'counter'
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {metric_type}']
+            lines += [f'{metric}{{cache="{_escape(name)}"}} {_number(value(hits, misses))}' for name, (hits, misses) in caches.items()]
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app) -> None:
+        """Medir cada requisição Flask, cronometrar o JSON das respostas e devolver o Server-Timing"""
+        app.json = TimedJSONProvider(app)
+
+        @app.before_request
+        def _begin_metrics():
+            g._metrics_handle = self.begin_request()
+
+        @app.after_request
+        def _end_metrics(response):
+            handle = g.pop('_metrics_handle', None)
+            if handle is not None:
+                endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+                header = self.end_request(handle, request.method, endpoint, response.status_code)
+                if header:
+                    response.headers['Server-Timing'] = header
+            return response
+
+        @app.teardown_request
+        def _abort_metrics(exception=None):
+            # Exceção não tratada: after_request não rodou
+            handle = g.pop('_metrics_handle', None)
+            if handle is not None:
+                self.end_request(handle, request.method, request.url_rule.rule if request.url_rule is not None else 'unmatched', 500)
+
+    def instrument_engine(self, engine) -> None:
+        """Registrar cada consulta SQL do engine como a etapa 'db'"""
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('metrics_started_at', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.get('metrics_started_at')
+            if started:
+                self.record_stage('db', time.perf_counter() - started.pop())
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON do Flask (jsonify, request.get_json) medido como a etapa 'json'"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        with metrics.stage('json'):
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        with metrics.stage('json'):
+            return super().loads(s, **kwargs)
+
+
+metrics = Metrics()
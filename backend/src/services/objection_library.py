@@ -0,0 +1,295 @@
+from collections import deque
+from flask import current_app
+from sqlalchemy import event, inspect, or_, select
+from src.models.pitchcraft import db, Project, ClientProfile, Objection
+from src.services.objection_store import normalize_objection
+from src.services.semantic_cache import HashingEmbedder
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+import os
+import threading
+import time
+
+# Projetos cujas objeções, perfil ou contexto mudaram neste processo, como (sequência, project_id).
+# Cada biblioteca relê só as linhas desses projetos; se ficou para trás além do tamanho do
+# registro, recarrega tudo.
+_changes = deque(maxlen=int(os.getenv('OBJECTION_LIBRARY_CHANGE_LOG', '10000')))
+_change_seq = 0
+_changes_lock = threading.Lock()
+
+
+def _record_change(project_ids) -> None:
+    global _change_seq
+    with _changes_lock:
+        for project_id in project_ids:
+            _change_seq += 1
+            _changes.append((_change_seq, project_id))
+
+
+def _changes_since(seq: int) -> Tuple[int, Optional[Set[int]]]:
+    """Sequência atual e projetos alterados depois de `seq` (None se o registro já descartou parte deles)"""
+    with _changes_lock:
+        if _changes and _changes[0][0] > seq + 1:
+            return _change_seq, None
+        return _change_seq, {project_id for change_seq, project_id in _changes if change_seq > seq}
+
+
+class ObjectionLibrary:
+    """Biblioteca reutilizável com as objeções já geradas e pontuadas
+
+    Cada objeção vira uma linha de uma matriz NumPy contígua (embedding do
+    contexto em que foi gerada + texto da objeção). A busca é um produto
+    matricial único, com máscaras de categoria, setor e DISC, e o ranking
+    pondera a similaridade pelo confidence_score. A cada consulta entram os
+    ids novos e são refeitas só as linhas dos projetos cujas objeções, perfil
+    ou contexto mudaram neste processo. Alterações feitas fora dele (ex.:
+    `objections dedupe`) chegam pela recarga completa a cada
+    OBJECTION_LIBRARY_RELOAD_SECONDS, montada em segundo plano e trocada de
+    uma vez; só a primeira carga acontece dentro da consulta.
+    """
+
+    def __init__(self, embedder=None, min_similarity: Optional[float] = None):
+        self.embedder = embedder or HashingEmbedder(int(os.getenv('OBJECTION_LIBRARY_EMBEDDING_DIM', '512')))
+        self.enabled = os.getenv('OBJECTION_LIBRARY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.min_similarity = min_similarity if min_similarity is not None else float(os.getenv('OBJECTION_LIBRARY_MIN_SIMILARITY', '0.3'))
+        self.reload_interval = float(os.getenv('OBJECTION_LIBRARY_RELOAD_SECONDS', '300'))
+        self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._confidence = np.zeros(0, dtype=np.float32)
+        self._categories = np.empty(0, dtype=object)
+        self._industries = np.empty(0, dtype=object)
+        self._discs = np.empty(0, dtype=object)
+        self._projects = np.zeros(0, dtype=np.int64)
+        self._entries = []  # dicts na mesma ordem das linhas da matriz
+        self._size = 0
+        self._max_id = 0
+        self._change_seq = 0
+        self._loaded = False
+        self._reloaded_at = 0.0
+        self._reload_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def context_text(project_data: Dict, client_profile: Dict) -> str:
+        parts = [
+            project_data.get('project_type'),
+            project_data.get('description'),
+            client_profile.get('industry'),
+            client_profile.get('pain_points'),
+        ]
+        return ' '.join(str(part) for part in parts if part)
+
+    def sync(self) -> int:
+        """Carregar objeções novas e refazer as linhas dos projetos alterados desde a última sincronização
+
+        Retorna quantas linhas entraram.
+        """
+        with self._lock:
+            loaded, max_id, seen_seq = self._loaded, self._max_id, self._change_seq
+            reload_due = (loaded and time.monotonic() - self._reloaded_at >= self.reload_interval
+                          and not (self._reload_thread and self._reload_thread.is_alive()))
+            if reload_due:
+                self._reload_thread = self._start_background_reload()
+
+        current_seq, changed = _changes_since(seen_seq)
+        if not loaded or changed is None:
+            return self.reload()
+
+        condition = Objection.id > max_id
+        if changed:
+            condition = or_(condition, Objection.project_id.in_(changed))
+        rows = self._query(condition)
+        if not rows and not changed:
+            return 0
+        vectors = self._embed(rows)
+
+        with self._lock:
+            if (self._max_id, self._change_seq) != (max_id, seen_seq):
+                # Outra thread (ou a recarga completa) atualizou a matriz: a próxima consulta retoma daí
+                return 0
+            if changed:
+                self._drop_projects(changed)
+            self._append(vectors, rows)
+            self._max_id = max([max_id] + [row.id for row in rows])
+            self._change_seq = current_seq
+        return len(rows)
+
+    def reload(self) -> int:
+        """Refazer a matriz inteira a partir do banco e trocá-la de uma vez; retorna o total de linhas"""
+        with _changes_lock:
+            # Lida antes da consulta: mudanças durante a carga são refeitas na sincronização seguinte
+            current_seq = _change_seq
+        rows = self._query(None)
+        vectors = self._embed(rows)
+        with self._lock:
+            self._size = 0
+            self._entries = []
+            self._append(vectors, rows)
+            self._max_id = rows[-1].id if rows else 0
+            self._change_seq = current_seq
+            self._loaded = True
+            self._reloaded_at = time.monotonic()
+        return len(rows)
+
+    def search(self, project_data: Dict, client_profile: Dict, k: int = 5,
+               categories: Optional[List[str]] = None) -> List[Dict]:
+        """Top-k objeções do mesmo setor/DISC mais próximas do contexto, sem repetições"""
+        if not self.enabled:
+            return []
+        self.sync()
+
+        query = self.embedder.embed([self.context_text(project_data, client_profile)])[0]
+        industry = normalize_objection(client_profile.get('industry'))
+        disc = (client_profile.get('disc_profile') or '').upper()
+
+        with self._lock:
+            size = self._size
+            if not size:
+                return []
+            similarity = self._matrix[:size] @ query
+            mask = similarity >= self.min_similarity
+            if industry:
+                mask &= self._industries[:size] == industry
+            if disc:
+                mask &= self._discs[:size] == disc
+            if categories:
+                mask &= np.isin(self._categories[:size], list(categories))
+            candidates = np.flatnonzero(mask)
+            if not len(candidates):
+                return []
+
+            scores = similarity[candidates] * self._confidence[candidates]
+            order = candidates[np.argsort(-scores, kind='stable')]
+            entries = [(self._entries[i], float(similarity[i])) for i in order]
+
+        results, seen = [], set()
+        for entry, score in entries:
+            key = normalize_objection(entry['objection'])
+            if key in seen:
+                continue
+            seen.add(key)
+            results.append(dict(entry, similarity=round(score, 4)))
+            if len(results) >= k:
+                break
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'entries': self._size,
+                'last_objection_id': self._max_id,
+                'seconds_since_reload': round(time.monotonic() - self._reloaded_at, 1) if self._reloaded_at else None
+            }
+
+    def _query(self, condition) -> List:
+        statement = (
+            select(
+                Objection.id, Objection.project_id, Objection.objection_text, Objection.response_text,
+                Objection.category, Objection.confidence_score, Project.project_type, Project.description,
+                ClientProfile.industry, ClientProfile.disc_profile, ClientProfile.pain_points
+            )
+            .join(Project, Project.id == Objection.project_id)
+            .outerjoin(ClientProfile, ClientProfile.project_id == Objection.project_id)
+            .order_by(Objection.id)
+        )
+        if condition is not None:
+            statement = statement.where(condition)
+        return db.session.execute(statement).all()
+
+    def _embed(self, rows) -> np.ndarray:
+        if not rows:
+            return np.zeros((0, self.embedder.dim), dtype=np.float32)
+        return self.embedder.embed([
+            self.context_text(
+                {'project_type': row.project_type, 'description': row.description},
+                {'industry': row.industry, 'pain_points': row.pain_points}
+            ) + ' ' + row.objection_text
+            for row in rows
+        ])
+
+    def _start_background_reload(self) -> threading.Thread:
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                try:
+                    self.reload()
+                finally:
+                    db.session.remove()
+
+        thread = threading.Thread(target=run, name='objection-library-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def _drop_projects(self, project_ids: Set[int]) -> None:
+        """Remover da matriz as linhas dos projetos (serão recarregadas), mantendo-a contígua"""
+        keep = np.flatnonzero(~np.isin(self._projects[:self._size], list(project_ids)))
+        if len(keep) == self._size:
+            return
+        for name in ('_matrix', '_confidence', '_categories', '_industries', '_discs', '_projects'):
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self._entries = [self._entries[i] for i in keep]
+        self._size = len(keep)
+
+    def _append(self, vectors: np.ndarray, rows) -> None:
+        needed = self._size + len(rows)
+        if needed > len(self._matrix):
+            # Crescimento geométrico mantém a matriz contígua sem realocar a cada lote
+            capacity = max(needed, 2 * len(self._matrix), 256)
+            self._matrix = self._grow(self._matrix, (capacity, self.embedder.dim), np.float32)
+            self._confidence = self._grow(self._confidence, (capacity,), np.float32)
+            self._categories = self._grow(self._categories, (capacity,), object)
+            self._industries = self._grow(self._industries, (capacity,), object)
+            self._discs = self._grow(self._discs, (capacity,), object)
+            self._projects = self._grow(self._projects, (capacity,), np.int64)
+
+        start = self._size
+        self._matrix[start:needed] = vectors
+        self._confidence[start:needed] = [row.confidence_score if row.confidence_score is not None else 0.5 for row in rows]
+        self._categories[start:needed] = [row.category or '' for row in rows]
+        self._industries[start:needed] = [normalize_objection(row.industry) for row in rows]
+        self._discs[start:needed] = [(row.disc_profile or '').upper() for row in rows]
+        self._projects[start:needed] = [row.project_id for row in rows]
+        self._entries.extend({
+            'id': row.id,
+            'objection': row.objection_text,
+            'response': row.response_text,
+            'category': row.category,
+            'confidence_score': row.confidence_score
+        } for row in rows)
+        self._size = needed
+
+    def _grow(self, array: np.ndarray, shape, dtype) -> np.ndarray:
+        grown = np.zeros(shape, dtype=dtype) if dtype is not object else np.empty(shape, dtype=object)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+
+def _affected_projects(target, key: str) -> List[int]:
+    """Projeto atual do registro e, se o vínculo mudou, o anterior"""
+    history = inspect(target).attrs[key].history
+    values = [getattr(target, key)] + list(history.deleted or ())
+    return [value for value in dict.fromkeys(values) if value is not None]
+
+
+def _invalidate_projects(key: str, *attributes):
+    """Listener que marca os projetos do registro para recarga (em updates, só se mudou campo usado pela biblioteca)"""
+    def listener(mapper, connection, target):
+        state = inspect(target)
+        if state.persistent and attributes and not any(state.attrs[name].history.has_changes() for name in attributes):
+            return
+        _record_change(_affected_projects(target, key))
+    return listener
+
+
+# Campos que entram no embedding, nos filtros ou nas entradas devolvidas
+for _model, _key, _attributes in (
+    (Objection, 'project_id', ('objection_text', 'response_text', 'category', 'confidence_score', 'project_id')),
+    (ClientProfile, 'project_id', ('industry', 'disc_profile', 'pain_points', 'project_id')),
+    (Project, 'id', ('project_type', 'description')),
+):
+    event.listen(_model, 'after_update', _invalidate_projects(_key, *_attributes))
+    event.listen(_model, 'after_delete', _invalidate_projects(_key))
+# Perfil criado depois das objeções: o setor/DISC das linhas do projeto muda
+event.listen(ClientProfile, 'after_insert', _invalidate_projects('project_id'))
@@ -0,0 +1,140 @@
+from sqlalchemy import event, func, insert, inspect, select, text, update
+from src.models.pitchcraft import db, Objection
+from datetime import datetime
+from typing import Dict, List
+import hashlib
+import re
+import unicodedata
+
+
+def normalize_objection(text: str) -> str:
+    """Texto comparável: sem acentos, pontuação, caixa e espaços repetidos"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+
+def objection_hash(text: str) -> str:
+    return hashlib.sha256(normalize_objection(text).encode('utf-8')).hexdigest()
+
+
+@event.listens_for(Objection, 'before_insert')
+def _fill_text_hash(mapper, connection, target):
+    if target.text_hash is None:
+        target.text_hash = objection_hash(target.objection_text)
+
+
+def _has_unique_index() -> bool:
+    """O índice único (project_id, text_hash) existe? ensure_indexes não cria índices únicos"""
+    table = Objection.__table__
+    existing = {index['name'] for index in inspect(db.session.connection()).get_indexes(table.name)}
+    return all(index.name in existing for index in table.indexes if index.unique)
+
+
+def upsert_objections(project_id: int, items: List[Dict]) -> int:
+    """Inserir as objeções do projeto em um único INSERT, ignorando textos já existentes
+
+    Sem o índice único (banco antigo ainda não limpo por `objections dedupe`), consulta
+    os hashes existentes antes de inserir.
+
+    Retorna quantas linhas novas foram gravadas (sem commit).
+    """
+    rows, seen = [], set()
+    for item in items:
+        digest = objection_hash(item['objection'])
+        if digest in seen:
+            continue
+        seen.add(digest)
+        rows.append({
+            'project_id': project_id,
+            'objection_text': item['objection'],
+            'response_text': item['response'],
+            'category': item.get('category'),
+            'confidence_score': item.get('confidence_score'),
+            'text_hash': digest,
+            'created_at': datetime.utcnow()
+        })
+    if not rows:
+        return 0
+
+    table = Objection.__table__
+    dialect = db.session.get_bind().dialect.name
+    if not _has_unique_index():
+        # Banco anterior ao índice único (até rodar `objections dedupe`): ON CONFLICT não teria o alvo
+        dialect = None
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        statement = dialect_insert(table).values(rows).on_conflict_do_nothing(index_elements=['project_id', 'text_hash'])
+        return db.session.execute(statement).rowcount
+
+    existing = set(db.session.execute(
+        select(table.c.text_hash).where(table.c.project_id == project_id, table.c.text_hash.in_(seen))
+    ).scalars())
+    rows = [row for row in rows if row['text_hash'] not in existing]
+    if rows:
+        db.session.execute(insert(table), rows)
+    return len(rows)
+
+
+def dedupe_objections(batch_size: int = 500) -> Dict:
+    """Preparar bancos antigos para o índice único e colapsar objeções duplicadas
+
+    Cria a coluna text_hash se faltar, preenche os hashes, mantém em cada grupo
+    (projeto, texto normalizado) a objeção de maior confiança (a mais antiga no
+    empate), remove as demais e cria o índice único.
+    """
+    table = Objection.__table__
+    inspector = inspect(db.engine)
+    added_column = 'text_hash' not in {c['name'] for c in inspector.get_columns(table.name)}
+    if added_column:
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN text_hash VARCHAR(64)'))
+
+    backfilled = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.objection_text).where(table.c.text_hash.is_(None)).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        for row_id, objection_text in rows:
+            db.session.execute(update(table).where(table.c.id == row_id).values(text_hash=objection_hash(objection_text)))
+        db.session.commit()
+        backfilled += len(rows)
+
+    duplicate_groups = db.session.execute(
+        select(table.c.project_id, table.c.text_hash)
+        .group_by(table.c.project_id, table.c.text_hash)
+        .having(func.count() > 1)
+    ).all()
+    deleted = 0
+    for project_id, digest in duplicate_groups:
+        ids = db.session.execute(
+            select(table.c.id)
+            .where(table.c.project_id == project_id, table.c.text_hash == digest)
+            .order_by(func.coalesce(table.c.confidence_score, 0).desc(), table.c.id)
+        ).scalars().all()
+        db.session.execute(table.delete().where(table.c.id.in_(ids[1:])))
+        deleted += len(ids) - 1
+    db.session.commit()
+
+    index_names = {index['name'] for index in inspect(db.engine).get_indexes(table.name)}
+    index_created = False
+    for index in table.indexes:
+        if index.name not in index_names:
+            index.create(db.engine)
+            index_created = True
+
+    return {
+        'added_column': added_column,
+        'backfilled': backfilled,
+        'duplicate_groups': len(duplicate_groups),
+        'deleted': deleted,
+        'index_created': index_created
+    }
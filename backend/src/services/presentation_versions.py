@@ -0,0 +1,128 @@
+from sqlalchemy.exc import IntegrityError
+from src.models.blob import load_blob, store_blob
+from src.models.pitchcraft import db, Presentation, PresentationVersion
+from src.services.json_patch import apply_patch, make_patch
+from typing import Callable, Dict, List, Optional
+import json
+import os
+
+
+class PresentationVersioning:
+    """Versões de apresentação como snapshot base + deltas JSON Patch
+
+    A versão mais recente continua em Presentation.content (leitura O(1)). Cada
+    edição grava só o patch em relação à versão anterior; a cada
+    PRESENTATION_SNAPSHOT_INTERVAL versões um novo snapshot encurta a cadeia de
+    deltas necessária para reconstruir versões antigas. Snapshots usam a
+    tabela de blobs, então não duplicam o conteúdo já gravado em Presentation.
+    """
+
+    def __init__(self, snapshot_interval: Optional[int] = None):
+        self.snapshot_interval = snapshot_interval or int(os.getenv('PRESENTATION_SNAPSHOT_INTERVAL', '10'))
+        self.save_attempts = int(os.getenv('PRESENTATION_SAVE_ATTEMPTS', '5'))
+
+    def latest(self, presentation_id: int) -> Optional[PresentationVersion]:
+        return PresentationVersion.query.filter_by(presentation_id=presentation_id) \
+            .order_by(PresentationVersion.version.desc()).first()
+
+    def edit(self, presentation_id: int, change: Callable[[Presentation], object]):
+        """Executar uma edição da apresentação (`change` chama save) e fazer o commit; retorna o valor de `change`
+
+        A linha da apresentação fica travada (SELECT ... FOR UPDATE) até o commit,
+        o que serializa edições simultâneas no Postgres. No SQLite, sem trava de
+        linha, a edição que perde a corrida pelo número da versão
+        (uq_presentation_version) é repetida sobre o estado já gravado.
+        """
+        for attempt in range(self.save_attempts):
+            presentation = Presentation.query.filter_by(id=presentation_id).with_for_update().first_or_404()
+            try:
+                result = change(presentation)
+                db.session.commit()
+                return result
+            except IntegrityError:
+                db.session.rollback()
+                if attempt + 1 >= self.save_attempts:
+                    raise
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def save(self, presentation: Presentation, content: Dict, message: Optional[str] = None) -> PresentationVersion:
+        """Atualizar o conteúdo da apresentação registrando a nova versão (sem commit)
+
+        Conteúdo igual ao atual não gera versão: retorna a versão mais recente.
+        """
+        latest = self.latest(presentation.id)
+        previous = json.loads(presentation.content) if presentation.content else None
+        if latest is None and previous is not None:
+            # Apresentação anterior ao versionamento: o conteúdo atual vira a versão 1
+            latest = self._snapshot(presentation.id, 1, presentation.content, message='Versão inicial')
+        if latest is not None and previous == content:
+            return latest
+
+        number = latest.version + 1 if latest else 1
+        content_text = json.dumps(content)
+        if latest is None or number - latest.base_version >= self.snapshot_interval:
+            version = self._snapshot(presentation.id, number, content_text, message)
+        else:
+            version = PresentationVersion(
+                presentation_id=presentation.id,
+                version=number,
+                kind='delta',
+                base_version=latest.base_version,
+                patch=json.dumps(make_patch(previous, content)),
+                message=message
+            )
+            db.session.add(version)
+
+        presentation.content = content_text
+        return version
+
+    def content_at(self, presentation_id: int, version: int) -> Optional[Dict]:
+        """Reconstruir uma versão: snapshot base + deltas até ela"""
+        target = PresentationVersion.query.filter_by(presentation_id=presentation_id, version=version).first()
+        if target is None:
+            return None
+        chain = PresentationVersion.query.filter(
+            PresentationVersion.presentation_id == presentation_id,
+            PresentationVersion.version >= target.base_version,
+            PresentationVersion.version <= version
+        ).order_by(PresentationVersion.version).all()
+
+        document = json.loads(load_blob(chain[0].snapshot_hash))
+        for step in chain[1:]:
+            document = apply_patch(document, json.loads(step.patch), in_place=True)
+        return document
+
+    def diff(self, presentation_id: int, from_version: int, to_version: int) -> Optional[List[Dict]]:
+        """Operações JSON Patch que levam `from_version` a `to_version`"""
+        if to_version == from_version + 1:
+            # Versões consecutivas: o delta gravado já é a diferença
+            step = PresentationVersion.query.filter_by(presentation_id=presentation_id, version=to_version).first()
+            if step is not None and step.kind == 'delta':
+                return json.loads(step.patch)
+        old = self.content_at(presentation_id, from_version)
+        new = self.content_at(presentation_id, to_version)
+        if old is None or new is None:
+            return None
+        return make_patch(old, new)
+
+    def restore(self, presentation: Presentation, version: int) -> Optional[PresentationVersion]:
+        """Tornar `version` a versão atual, gravando apenas o delta a partir da versão corrente"""
+        content = self.content_at(presentation.id, version)
+        if content is None:
+            return None
+        return self.save(presentation, content, message=f'Restaurada a versão {version}')
+
+    def _snapshot(self, presentation_id: int, number: int, content_text: str,
+                  message: Optional[str]) -> PresentationVersion:
+        version = PresentationVersion(
+            presentation_id=presentation_id,
+            version=number,
+            kind='snapshot',
+            base_version=number,
+            snapshot_hash=store_blob(content_text),
+            message=message
+        )
+        db.session.add(version)
+        return version
@@ -0,0 +1,113 @@
+from typing import Callable, Dict, List, Optional
+import json
+import math
+import os
+import re
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens (~4 caracteres por token, como nos tokenizadores BPE em texto latino)"""
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / 4))
+
+
+def compact_json(value) -> str:
+    """Serialização sem espaços nem escapes de acentos"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _market_share(item: Dict) -> float:
+    match = re.search(r'[\d.]+', str(item.get('market_share', '')))
+    return float(match.group()) if match else 0.0
+
+
+def news_items(news) -> List[Dict]:
+    """Notícias ordenadas por relevância, só com os campos úteis ao prompt"""
+    if not isinstance(news, list):
+        return []
+    ranked = sorted(
+        (item for item in news if isinstance(item, dict)),
+        key=lambda item: item.get('relevance_score') or 0,
+        reverse=True
+    )
+    return [{'title': item.get('title'), 'summary': item.get('summary')} for item in ranked]
+
+
+def competitor_items(analysis) -> List:
+    """Concorrentes por participação de mercado, seguidos das tendências do setor"""
+    if not isinstance(analysis, dict):
+        return []
+    competitors = sorted(
+        (item for item in analysis.get('competitors', []) if isinstance(item, dict)),
+        key=_market_share,
+        reverse=True
+    )
+    items = [{
+        'name': item.get('name'),
+        'share': item.get('market_share'),
+        'strengths': item.get('strengths'),
+        'weaknesses': item.get('weaknesses')
+    } for item in competitors]
+    items.extend(analysis.get('market_trends', []))
+    return items
+
+
+class PromptBuilder:
+    """Montar seções de contexto do prompt dentro de um orçamento de tokens
+
+    Cada seção recebe uma fatia do orçamento proporcional ao seu peso; os itens
+    já devem vir ordenados por prioridade e entram até a fatia esgotar. Sobras
+    de seções pequenas são redistribuídas às demais.
+    """
+
+    def __init__(self, budget_tokens: Optional[int] = None, counter: Callable[[str], int] = estimate_tokens):
+        self.budget_tokens = budget_tokens if budget_tokens is not None else int(os.getenv('PROMPT_CONTEXT_TOKEN_BUDGET', '1200'))
+        self.counter = counter
+        self._sections = []
+
+    def add(self, name: str, items, weight: float = 1.0) -> 'PromptBuilder':
+        if isinstance(items, (list, tuple)):
+            items = list(items)
+        elif items in (None, '', {}):
+            items = []
+        else:
+            items = [items]
+        self._sections.append({'name': name, 'items': items, 'weight': weight})
+        return self
+
+    def build(self) -> Dict:
+        """Retorna {'sections': {nome: texto}, 'report': {nome: {...}}, 'tokens': total}"""
+        serialized = {section['name']: [compact_json(item) for item in section['items']] for section in self._sections}
+        full_cost = {name: sum(self.counter(item) for item in items) for name, items in serialized.items()}
+
+        # Seções que cabem inteiras liberam o restante do orçamento para as outras
+        allocation = {}
+        remaining = self.budget_tokens
+        pending = list(self._sections)
+        while pending:
+            total_weight = sum(section['weight'] for section in pending) or 1
+            fitting = [s for s in pending if full_cost[s['name']] <= remaining * s['weight'] / total_weight]
+            if not fitting:
+                for section in pending:
+                    allocation[section['name']] = int(remaining * section['weight'] / total_weight)
+                break
+            for section in fitting:
+                allocation[section['name']] = full_cost[section['name']]
+                remaining -= full_cost[section['name']]
+                pending.remove(section)
+
+        sections, report, total = {}, {}, 0
+        for name, items in serialized.items():
+            kept, used = [], 0
+            for item in items:
+                cost = self.counter(item)
+                if used + cost > allocation[name]:
+                    break
+                kept.append(item)
+                used += cost
+            sections[name] = '[' + ','.join(kept) + ']' if kept else ''
+            report[name] = {'tokens': used, 'items_kept': len(kept), 'items_dropped': len(items) - len(kept)}
+            total += used
+
+        return {'sections': sections, 'report': report, 'tokens': total}
@@ -0,0 +1,261 @@
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from src.services.metrics import metrics
+from typing import Dict, Optional
+import asyncio
+import json
+import os
+import threading
+import time
+
+
+class TokenBucket:
+    """Limitador token bucket thread-safe (ex.: requisições por minuto a um provedor de IA)
+
+    Uma taxa <= 0 desativa o limite.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity if capacity is not None else max(rate_per_minute, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_minute / 60.0)
+        self._updated_at = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """Consumir `amount` já, mesmo sem saldo (o saldo fica negativo), e retornar a espera até a vez desta reserva
+
+        Reservas seguidas formam uma fila: cada uma espera o déficit acumulado
+        pelas anteriores, o que permite prever a espera antes de aguardar.
+        """
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            wait_seconds = -self._tokens * 60.0 / self.rate_per_minute if self._tokens < 0 else 0.0
+            return max(wait_seconds, self._paused_until - now)
+
+    def refund(self, amount: float) -> None:
+        """Devolver tokens de uma reserva cancelada (ou cobrar mais, com `amount` negativo)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def pause(self, seconds: float) -> None:
+        """Suspender novas liberações por `seconds` (ex.: Retry-After de um 429 do provedor)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AdmissionRejected(Exception):
+    """A espera prevista por um provedor passa do SLO de fila: falhar rápido (HTTP 503) em vez de enfileirar"""
+
+    def __init__(self, provider: str, retry_after: float, reason: str = 'fila'):
+        super().__init__(f'Provedor de IA {provider} sobrecarregado ({reason}); tente novamente em {retry_after:.0f}s')
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+# Rajada máxima dos buckets de provedor, em segundos de cota (evita estourar o limite por minuto logo na partida)
+PROVIDER_BURST_SECONDS = 10
+
+
+class ProviderLimiter:
+    """Limites de um provedor: requisições e tokens por minuto (por modelo) e chamadas simultâneas
+
+    Cada chamada reserva 1 requisição e os tokens estimados nos buckets do
+    modelo e depois aguarda uma vaga entre as `max_concurrency` chamadas em
+    andamento. Se a espera prevista (buckets + fila de vagas, pela latência
+    esperada da chamada) passar de `max_queue_seconds`, a reserva é desfeita e
+    AdmissionRejected é lançada sem esperar. Limites <= 0 ficam desativados.
+
+    Configuração por ambiente (NOME = OPENAI, ANTHROPIC, GEMINI...):
+    NOME_REQUESTS_PER_MINUTE, NOME_TOKENS_PER_MINUTE, NOME_MAX_CONCURRENCY e
+    NOME_MODEL_LIMITS, um JSON com limites próprios por modelo, ex.:
+    {"gpt-4": {"requests_per_minute": 500, "tokens_per_minute": 30000}}.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_concurrency: int = 0, max_queue_seconds: float = 0,
+                 model_limits: Optional[Dict[str, Dict]] = None):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_queue_seconds = max_queue_seconds
+        self.model_limits = model_limits or {}
+        self.rejected = 0
+        self._buckets: Dict[str, tuple] = {}
+        self._active = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        self._async_waiters = deque()  # (event loop, future) das chamadas assíncronas aguardando vaga
+
+    @classmethod
+    def from_env(cls, name: str) -> 'ProviderLimiter':
+        prefix = name.upper()
+        return cls(
+            name,
+            requests_per_minute=float(os.getenv(f'{prefix}_REQUESTS_PER_MINUTE', '60')),
+            tokens_per_minute=float(os.getenv(f'{prefix}_TOKENS_PER_MINUTE', '0')),
+            max_concurrency=int(os.getenv(f'{prefix}_MAX_CONCURRENCY', '16')),
+            max_queue_seconds=float(os.getenv('LLM_MAX_QUEUE_SECONDS', '10')),
+            model_limits=json.loads(os.getenv(f'{prefix}_MODEL_LIMITS', '{}') or '{}'),
+        )
+
+    def buckets(self, model: str):
+        """(requisições, tokens) do modelo; modelos sem limite próprio usam os limites do provedor"""
+        with self._lock:
+            buckets = self._buckets.get(model)
+            if buckets is None:
+                limits = self.model_limits.get(model, {})
+                buckets = self._buckets[model] = tuple(
+                    TokenBucket(rate, capacity=max(rate * PROVIDER_BURST_SECONDS / 60.0, 1))
+                    for rate in (float(limits.get('requests_per_minute', self.requests_per_minute)),
+                                 float(limits.get('tokens_per_minute', self.tokens_per_minute)))
+                )
+            return buckets
+
+    def _admit(self, model: str, tokens: int, expected_latency: float) -> float:
+        """Reservar a chamada e retornar a espera pelos buckets; AdmissionRejected se a espera total passar do SLO"""
+        requests_bucket, tokens_bucket = self.buckets(model)
+        tokens = min(tokens, tokens_bucket.capacity) if tokens_bucket.enabled else tokens
+        wait_seconds = max(requests_bucket.reserve(1), tokens_bucket.reserve(tokens))
+        with self._lock:
+            queued = self._active + self._waiting
+            slot_wait = 0.0
+            if self.max_concurrency > 0 and queued >= self.max_concurrency:
+                # Cada leva de max_concurrency chamadas à frente ocupa ~uma latência esperada
+                slot_wait = (queued - self.max_concurrency + 1) / self.max_concurrency * expected_latency
+            # As duas filas andam juntas: quem aguarda os buckets também conta entre as chamadas à frente
+            predicted = max(wait_seconds, slot_wait)
+            if self.max_queue_seconds > 0 and predicted > self.max_queue_seconds:
+                self.rejected += 1
+                rejected = True
+            else:
+                self._waiting += 1
+                rejected = False
+        if rejected:
+            requests_bucket.refund(1)
+            tokens_bucket.refund(tokens)
+            raise AdmissionRejected(self.name, predicted, 'limite de taxa' if wait_seconds >= slot_wait else 'concorrência')
+        return wait_seconds
+
+    def _has_free_slot(self) -> bool:
+        return self.max_concurrency <= 0 or self._active < self.max_concurrency
+
+    def _wake_async_waiter(self) -> None:
+        """Acordar a próxima chamada assíncrona da fila (chamar com o lock adquirido)"""
+        while self._async_waiters:
+            loop, future = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(lambda future=future: future.done() or future.set_result(None))
+                return
+            except RuntimeError:
+                # Event loop já encerrado: a vaga vai para o próximo da fila
+                continue
+
+    async def _enter_async(self) -> None:
+        """Ocupar uma vaga; sem vaga livre, aguarda ser acordado por `_leave` em vez de consultar em intervalos"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._has_free_slot():
+                    self._waiting -= 1
+                    self._active += 1
+                    return
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1]
+            except BaseException:
+                with self._lock:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                    else:
+                        # Já tinha sido acordado: repassa a vaga para não deixá-la ociosa
+                        self._wake_async_waiter()
+                raise
+
+    def _leave(self) -> None:
+        with self._slot_free:
+            self._active -= 1
+            # Quem acordar e encontrar a vaga tomada volta para a fila
+            self._slot_free.notify()
+            self._wake_async_waiter()
+
+    def _abandon(self) -> None:
+        with self._lock:
+            self._waiting -= 1
+
+    @contextmanager
+    def slot(self, model: str, tokens: int = 0, expected_latency: float = 0.0):
+        """Aguardar os limites do modelo e ocupar uma vaga de concorrência durante o bloco"""
+        wait_seconds = self._admit(model, tokens, expected_latency)
+        try:
+            with metrics.stage('rate_limit'):
+                if wait_seconds > 0:
+                    time.sleep(wait_seconds)
+                with self._slot_free:
+                    while not self._has_free_slot():
+                        self._slot_free.wait()
+                    self._waiting -= 1
+                    self._active += 1
+        except BaseException:
+            self._abandon()
+            raise
+        try:
+            yield
+        finally:
+            self._leave()
+
+    @asynccontextmanager
+    async def slot_async(self, model: str, tokens: int = 0, expected_latency: float = 0.0):
+        """Como `slot`, sem bloquear o event loop; a vaga é compartilhada com as chamadas síncronas"""
+        wait_seconds = self._admit(model, tokens, expected_latency)
+        try:
+            with metrics.stage('rate_limit'):
+                if wait_seconds > 0:
+                    await asyncio.sleep(wait_seconds)
+                await self._enter_async()
+        except BaseException:
+            self._abandon()
+            raise
+        try:
+            yield
+        finally:
+            self._leave()
+
+    def settle(self, model: str, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        """Acertar o bucket de tokens com o consumo informado pelo provedor"""
+        if used_tokens is not None:
+            self.buckets(model)[1].refund(reserved_tokens - used_tokens)
+
+    def pause(self, model: str, seconds: float) -> None:
+        """Segurar novas chamadas ao modelo (Retry-After de um 429)"""
+        self.buckets(model)[0].pause(seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'active': self._active,
+                'waiting': self._waiting,
+                'max_concurrency': self.max_concurrency,
+                'max_queue_seconds': self.max_queue_seconds,
+                'rejected': self.rejected,
+            }
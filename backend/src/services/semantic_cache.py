@@ -0,0 +1,320 @@
+from src.services.metrics import metrics
+from typing import Dict, List, Optional
+import numpy as np
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+
+
+class HashingEmbedder:
+    """Embedding local por feature hashing de palavras e bigramas (sem chamadas externas)
+
+    Suficiente para reconhecer perfis quase idênticos que diferem só na redação.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r'\w+', text.lower())
+            for token in words + [f'{a} {b}' for a, b in zip(words, words[1:])]:
+                digest = hashlib.md5(token.encode('utf-8')).digest()
+                index = int.from_bytes(digest[:4], 'little') % self.dim
+                vectors[row, index] += 1.0 if digest[4] & 1 else -1.0
+        return _normalize(vectors)
+
+
+class OpenAIEmbedder:
+    """Embeddings da API da OpenAI (text-embedding-3-small por padrão)"""
+
+    def __init__(self, client, model: Optional[str] = None):
+        self.client = client
+        self.model = model or os.getenv('SEMANTIC_CACHE_EMBEDDING_MODEL', 'text-embedding-3-small')
+        self.dim = None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        vectors = np.array([item.embedding for item in response.data], dtype=np.float32)
+        self.dim = vectors.shape[1]
+        return _normalize(vectors)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class InMemoryVectorIndex:
+    """Índice de cosseno em uma matriz NumPy contígua (vetores já normalizados)
+
+    Guarda no máximo `max_entries` vetores; acima disso as entradas mais
+    antigas são descartadas, para o índice não crescer durante toda a vida do
+    processo.
+    """
+
+    name = 'memory'
+
+    def __init__(self, dim: int, capacity: int = 1024, max_entries: Optional[int] = None):
+        self.dim = dim
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '10000'))
+        capacity = min(capacity, self.max_entries)
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._filters = np.empty(capacity, dtype=object)
+        self._payloads = []
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def upsert(self, vectors: np.ndarray, payloads: List[Dict]) -> None:
+        vectors, payloads = vectors[-self.max_entries:], payloads[-self.max_entries:]
+        with self._lock:
+            # Descarta as entradas mais antigas que não cabem no limite
+            overflow = self._size + len(payloads) - self.max_entries
+            if overflow > 0:
+                keep = self._size - overflow
+                self._matrix[:keep] = self._matrix[overflow:self._size]
+                self._filters[:keep] = self._filters[overflow:self._size]
+                self._filters[keep:self._size] = None
+                del self._payloads[:overflow]
+                self._size = keep
+            needed = self._size + len(payloads)
+            if needed > len(self._matrix):
+                capacity = min(max(needed, 2 * len(self._matrix)), self.max_entries)
+                matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+                matrix[:self._size] = self._matrix[:self._size]
+                filters = np.empty(capacity, dtype=object)
+                filters[:self._size] = self._filters[:self._size]
+                self._matrix, self._filters = matrix, filters
+            self._matrix[self._size:needed] = vectors
+            self._filters[self._size:needed] = [_filter_key(payload['kind'], payload.get('context', '')) for payload in payloads]
+            self._payloads.extend(payloads)
+            self._size = needed
+
+    def search(self, vector: np.ndarray, kind: str, threshold: float, context: str = '') -> Optional[Dict]:
+        with self._lock:
+            if not self._size:
+                return None
+            scores = self._matrix[:self._size] @ vector
+            scores[self._filters[:self._size] != _filter_key(kind, context)] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                return None
+            return dict(self._payloads[best], score=float(scores[best]))
+
+
+def _filter_key(kind: str, context: str) -> str:
+    return f'{kind}:{context}'
+
+
+class QdrantVectorIndex:
+    """Mesmo papel do índice em memória, persistido em uma coleção do Qdrant"""
+
+    name = 'qdrant'
+
+    def __init__(self, client, dim: int, collection: Optional[str] = None):
+        from qdrant_client.models import Distance, VectorParams
+        self.client = client
+        self.dim = dim
+        self.collection = collection or os.getenv('SEMANTIC_CACHE_COLLECTION', 'pitchcraft_semantic_cache')
+        if not self.client.collection_exists(self.collection):
+            self.client.create_collection(
+                collection_name=self.collection,
+                vectors_config=VectorParams(size=dim, distance=Distance.COSINE)
+            )
+
+    def __len__(self) -> int:
+        return self.client.count(collection_name=self.collection).count
+
+    def upsert(self, vectors: np.ndarray, payloads: List[Dict]) -> None:
+        from qdrant_client.models import PointStruct
+        points = [
+            PointStruct(id=str(uuid.uuid4()), vector=vector.tolist(), payload=payload)
+            for vector, payload in zip(vectors, payloads)
+        ]
+        self.client.upsert(collection_name=self.collection, points=points)
+
+    def search(self, vector: np.ndarray, kind: str, threshold: float, context: str = '') -> Optional[Dict]:
+        from qdrant_client.models import FieldCondition, Filter, MatchValue
+        result = self.client.query_points(
+            collection_name=self.collection,
+            query=vector.tolist(),
+            query_filter=Filter(must=[
+                FieldCondition(key='kind', match=MatchValue(value=kind)),
+                FieldCondition(key='context', match=MatchValue(value=context)),
+            ]),
+            score_threshold=threshold,
+            limit=1
+        )
+        if not result.points:
+            return None
+        return dict(result.points[0].payload, score=result.points[0].score)
+
+
+class SemanticCache:
+    """Reaproveitar narrativas/objeções geradas para entradas semanticamente equivalentes
+
+    As entradas normalizadas da geração (setor, porte, DISC, dores...) são
+    convertidas em embedding; se um resultado anterior do mesmo tipo estiver
+    acima do limiar de similaridade, ele é adaptado (nome da empresa) e
+    devolvido sem chamar o modelo. Novos resultados são inseridos em lotes.
+    
+    Entradas que não entram no embedding mas mudam a resposta (ex.: o contexto
+    de mercado do prompt) vão em `context`, um digest comparado por igualdade:
+    só são reaproveitados resultados gerados com o mesmo contexto.
+    """
+
+    def __init__(self, index, embedder, threshold: Optional[float] = None, batch_size: Optional[int] = None):
+        self.index = index
+        self.embedder = embedder
+        self.enabled = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.threshold = threshold if threshold is not None else float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+        self.batch_size = batch_size if batch_size is not None else int(os.getenv('SEMANTIC_CACHE_BATCH_SIZE', '16'))
+        self.hits = 0
+        self.misses = 0
+        self._pending_vectors = []
+        self._pending_payloads = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, qdrant_client=None, openai_client=None) -> 'SemanticCache':
+        """Qdrant quando configurado; caso contrário, índice NumPy em memória"""
+        if os.getenv('SEMANTIC_CACHE_EMBEDDINGS', 'hashing') == 'openai' and openai_client:
+            embedder = OpenAIEmbedder(openai_client)
+            dim = int(os.getenv('SEMANTIC_CACHE_EMBEDDING_DIM', '1536'))
+        else:
+            embedder = HashingEmbedder(int(os.getenv('SEMANTIC_CACHE_EMBEDDING_DIM', '512')))
+            dim = embedder.dim
+
+        index = None
+        if qdrant_client is not None:
+            try:
+                index = QdrantVectorIndex(qdrant_client, dim)
+            except Exception:
+                index = None
+        return cls(index or InMemoryVectorIndex(dim), embedder)
+
+    @staticmethod
+    def normalize_inputs(kind: str, project_data: Dict, client_profile: Dict) -> str:
+        """Texto canônico das entradas; o nome da empresa fica de fora porque é adaptado"""
+        fields = [
+            ('tipo', project_data.get('project_type')),
+            ('descrição', project_data.get('description')),
+            ('público', project_data.get('target_audience')),
+            ('setor', client_profile.get('industry')),
+            ('porte', client_profile.get('size')),
+            ('disc', client_profile.get('disc_profile')),
+            ('dores', client_profile.get('pain_points')),
+            ('objetivos', client_profile.get('goals')),
+        ]
+        text = ' | '.join(f'{label}: {value}' for label, value in fields if value)
+        return f'{kind} | ' + ' '.join(text.lower().split())
+
+    @staticmethod
+    def context_digest(context) -> str:
+        """Digest estável de um contexto serializável em JSON (para o parâmetro `context`)"""
+        if not context:
+            return ''
+        canonical = json.dumps(context, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+    def lookup(self, kind: str, project_data: Dict, client_profile: Dict, context: str = ''):
+        """Resultado adaptado de uma geração equivalente com o mesmo contexto, ou None"""
+        if not self.enabled:
+            return None
+        try:
+            with metrics.stage('semantic_cache'):
+                vector = self.embedder.embed([self.normalize_inputs(kind, project_data, client_profile)])[0]
+                match = self.index.search(vector, kind, self.threshold, context) or self._search_pending(vector, kind, context)
+        except Exception:
+            match = None
+
+        with self._lock:
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self._adapt(json.loads(match['result']), match.get('company_name'), client_profile.get('company_name'))
+
+    def add(self, kind: str, project_data: Dict, client_profile: Dict, result, context: str = '') -> None:
+        """Enfileirar um resultado; a inserção no índice acontece em lotes"""
+        if not self.enabled:
+            return
+        try:
+            vector = self.embedder.embed([self.normalize_inputs(kind, project_data, client_profile)])[0]
+        except Exception:
+            return
+        payload = {
+            'kind': kind,
+            'context': context,
+            'company_name': client_profile.get('company_name') or '',
+            'result': json.dumps(result, ensure_ascii=False)
+        }
+        with self._lock:
+            self._pending_vectors.append(vector)
+            self._pending_payloads.append(payload)
+            should_flush = len(self._pending_payloads) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending_payloads:
+                return
+            vectors, payloads = np.vstack(self._pending_vectors), self._pending_payloads
+            self._pending_vectors, self._pending_payloads = [], []
+        try:
+            self.index.upsert(vectors, payloads)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses, pending = self.hits, self.misses, len(self._pending_payloads)
+        total = hits + misses
+        try:
+            entries = len(self.index)
+        except Exception:
+            entries = None
+        return {
+            'enabled': self.enabled,
+            'backend': self.index.name,
+            'threshold': self.threshold,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+            'entries': entries,
+            'max_entries': getattr(self.index, 'max_entries', None),
+            'pending': pending
+        }
+
+    def _search_pending(self, vector: np.ndarray, kind: str, context: str) -> Optional[Dict]:
+        with self._lock:
+            candidates = [
+                (float(pending_vector @ vector), payload)
+                for pending_vector, payload in zip(self._pending_vectors, self._pending_payloads)
+                if payload['kind'] == kind and payload['context'] == context
+            ]
+        if not candidates:
+            return None
+        score, payload = max(candidates, key=lambda item: item[0])
+        return dict(payload, score=score) if score >= self.threshold else None
+
+    def _adapt(self, value, old_name: Optional[str], new_name: Optional[str]):
+        """Trocar o nome da empresa do resultado reaproveitado pelo do cliente atual"""
+        if not old_name or not new_name or old_name == new_name:
+            return value
+        if isinstance(value, str):
+            return value.replace(old_name, new_name)
+        if isinstance(value, list):
+            return [self._adapt(item, old_name, new_name) for item in value]
+        if isinstance(value, dict):
+            return {key: self._adapt(item, old_name, new_name) for key, item in value.items()}
+        return value
@@ -0,0 +1,79 @@
+from src.models.blob import load_blob, prefetch_blobs, store_blob
+from typing import Dict, List, Optional
+import json
+
+# Chave do manifesto: lista de hashes (tabela json_blob), um por slide, na ordem do deck
+SLIDE_REFS_KEY = 'slide_refs'
+
+
+def is_manifest(deck) -> bool:
+    return isinstance(deck, dict) and SLIDE_REFS_KEY in deck
+
+
+def pack(deck: Dict) -> Dict:
+    """Trocar os slides do deck por referências a blobs (um blob por slide)"""
+    if not isinstance(deck, dict) or not isinstance(deck.get('slides'), list):
+        return deck
+    manifest = {key: value for key, value in deck.items() if key != 'slides'}
+    manifest[SLIDE_REFS_KEY] = [store_blob(json.dumps(slide)) for slide in deck['slides']]
+    return manifest
+
+
+def slide_count(deck) -> int:
+    if is_manifest(deck):
+        return len(deck[SLIDE_REFS_KEY])
+    if isinstance(deck, dict) and isinstance(deck.get('slides'), list):
+        return len(deck['slides'])
+    return 0
+
+
+def slide_texts(deck, start: int = 0, end: Optional[int] = None) -> List[str]:
+    """Texto JSON dos slides [start, end) sem decodificá-los (uma consulta para o intervalo)"""
+    if is_manifest(deck):
+        refs = deck[SLIDE_REFS_KEY][start:end]
+        prefetch_blobs(refs)
+        return [load_blob(ref) for ref in refs]
+    if isinstance(deck, dict) and isinstance(deck.get('slides'), list):
+        return [json.dumps(slide) for slide in deck['slides'][start:end]]
+    return []
+
+
+def unpack(deck) -> Dict:
+    """Deck completo, com os slides carregados (decks antigos, com slides embutidos, passam direto)"""
+    if not is_manifest(deck):
+        return deck
+    full = {key: value for key, value in deck.items() if key != SLIDE_REFS_KEY}
+    full['slides'] = [json.loads(text) for text in slide_texts(deck)]
+    return full
+
+
+def summary(deck) -> Dict:
+    """Metadados do deck sem os slides (para listagens)"""
+    if not isinstance(deck, dict):
+        return deck
+    result = {key: value for key, value in deck.items() if key not in ('slides', SLIDE_REFS_KEY)}
+    result['total_slides'] = slide_count(deck)
+    return result
+
+
+def expand_patch(ops: List[Dict]) -> List[Dict]:
+    """Traduzir operações sobre o manifesto (/slide_refs/n -> hash) em operações sobre /slides/n"""
+    prefix = f'/{SLIDE_REFS_KEY}'
+    refs = [op['value'] for op in ops if op.get('path', '').startswith(prefix) and isinstance(op.get('value'), str)]
+    prefetch_blobs(refs)
+
+    expanded = []
+    for op in ops:
+        path = op.get('path', '')
+        if not path.startswith(prefix):
+            expanded.append(op)
+            continue
+        op = dict(op, path='/slides' + path[len(prefix):])
+        if 'value' in op:
+            value = op['value']
+            if isinstance(value, str):
+                op['value'] = json.loads(load_blob(value))
+            elif isinstance(value, list):
+                op['value'] = [json.loads(load_blob(ref)) for ref in value]
+        expanded.append(op)
+    return expanded
@@ -0,0 +1,170 @@
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+import codecs
+import re
+
+# Elementos cujo texto vira conteúdo principal (os mesmos do find_all do modo completo)
+CONTENT_TAGS = ('h1', 'h2', 'h3', 'p')
+# Início de bloco que encerra um <p> aberto sem </p>, como fazem os navegadores
+BLOCK_TAGS = CONTENT_TAGS + ('h4', 'h5', 'h6', 'div', 'ul', 'ol', 'table', 'section', 'article', 'header',
+                             'footer', 'nav', 'aside', 'form', 'blockquote', 'pre', 'hr')
+# Conteúdo que não é texto da página (também ignorado pelo get_text do BeautifulSoup)
+SKIP_TAGS = ('script', 'style', 'template')
+MIN_CONTENT_LENGTH = 20
+# Sem charset no cabeçalho HTTP, o <meta charset> é procurado nestes primeiros bytes (como o BeautifulSoup)
+SNIFF_BYTES = 2048
+# <meta charset="..."> e <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb'<\s*meta[^>]+charset\s*=\s*["\']?([^>]*?)[ /;\'">]', re.IGNORECASE)
+
+
+def _codec_name(label: str) -> Optional[str]:
+    try:
+        return codecs.lookup(label.strip()).name
+    except LookupError:
+        return None
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    match = re.search(r'charset=["\']?([\w.:-]+)', content_type or '', re.IGNORECASE)
+    return _codec_name(match.group(1)) if match else None
+
+
+def charset_from_meta(head: bytes) -> Optional[str]:
+    match = META_CHARSET.search(head)
+    return _codec_name(match.group(1).decode('ascii', 'ignore')) if match else None
+
+
+class WebsiteExtractor(HTMLParser):
+    """Extração incremental de título, metadados e parágrafos do HTML, bloco a bloco
+
+    Recebe os bytes à medida que são baixados (`feed_bytes`) e sinaliza `done`
+    assim que o cabeçalho da página terminou e os `max_paragraphs` primeiros
+    textos de h1/h2/h3/p com mais de 20 caracteres estão completos, o que
+    permite encerrar o download sem montar a árvore do documento inteiro.
+    O resultado é o mesmo do parse completo com BeautifulSoup.
+
+    Sem `encoding` (charset ausente no Content-Type), os primeiros SNIFF_BYTES
+    ficam retidos até se saber o charset declarado no <meta> da página (UTF-8
+    se não houver), já que muitos sites brasileiros ainda usam ISO-8859-1.
+    """
+
+    def __init__(self, encoding: Optional[str] = None, max_paragraphs: int = 10):
+        super().__init__(convert_charrefs=True)
+        self.max_paragraphs = max_paragraphs
+        self.bytes_read = 0
+        self.title: Optional[str] = None
+        self.meta: Dict[str, str] = {}
+        self.encoding = encoding
+        self._decoder = self._make_decoder(encoding) if encoding else None
+        self._pending = b''
+        self._in_title = False
+        self._title_parts: List[str] = []
+        self._head_done = False
+        self._skip_depth = 0
+        # Textos na ordem de abertura das tags (como o find_all); None enquanto a tag está aberta
+        self._entries: List[Optional[str]] = []
+        self._open: List[tuple] = []  # (tag, índice em _entries, partes do texto)
+
+    @property
+    def done(self) -> bool:
+        if not self._head_done:
+            return False
+        found = 0
+        for text in self._entries:
+            if text is None:
+                # Tag anterior ainda aberta: o texto dela pode entrar antes dos seguintes
+                return False
+            if len(text) > MIN_CONTENT_LENGTH:
+                found += 1
+                if found >= self.max_paragraphs:
+                    return True
+        return False
+
+    @property
+    def main_content(self) -> List[str]:
+        return [text for text in self._entries if text and len(text) > MIN_CONTENT_LENGTH][:self.max_paragraphs]
+
+    def feed_bytes(self, chunk: bytes) -> None:
+        self.bytes_read += len(chunk)
+        if self._decoder is None:
+            self._pending += chunk
+            if len(self._pending) < SNIFF_BYTES:
+                return
+            chunk = self._sniff_encoding()
+        self.feed(self._decoder.decode(chunk))
+
+    def close(self) -> None:
+        chunk = self._sniff_encoding() if self._decoder is None else b''
+        self.feed(self._decoder.decode(chunk, final=True))
+        super().close()
+        # Tags sem fechamento até o fim do documento (ou do limite de bytes)
+        while self._open:
+            self._close_entry()
+        if self._in_title:
+            self._finish_title()
+
+    def _make_decoder(self, encoding: str):
+        return codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    def _sniff_encoding(self) -> bytes:
+        """Escolher o decodificador pelo <meta> do início do documento; retorna os bytes retidos"""
+        head, self._pending = self._pending, b''
+        self.encoding = charset_from_meta(head) or 'utf-8'
+        self._decoder = self._make_decoder(self.encoding)
+        return head
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if tag == 'title' and self.title is None:
+            self._in_title = True
+        elif tag == 'meta':
+            attrs = dict(attrs)
+            name = (attrs.get('name') or '').lower()
+            if name in ('description', 'keywords') and name not in self.meta:
+                self.meta[name] = attrs.get('content') or ''
+        elif tag == 'body':
+            self._head_done = True
+
+        if tag in BLOCK_TAGS and self._open and self._open[-1][0] == 'p':
+            self._close_entry()
+        if tag in CONTENT_TAGS:
+            self._head_done = True
+            self._entries.append(None)
+            self._open.append((tag, len(self._entries) - 1, []))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in SKIP_TAGS:
+            self._skip_depth -= 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'title' and self._in_title:
+            self._finish_title()
+        elif tag == 'head':
+            self._head_done = True
+        elif tag in CONTENT_TAGS and any(open_tag == tag for open_tag, _, _ in self._open):
+            # Fecha também as tags internas deixadas abertas
+            while self._open:
+                if self._close_entry() == tag:
+                    break
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._in_title:
+            self._title_parts.append(data)
+        for _, _, parts in self._open:
+            parts.append(data)
+
+    def _finish_title(self) -> None:
+        self._in_title = False
+        self.title = ''.join(self._title_parts).strip()
+
+    def _close_entry(self) -> str:
+        tag, index, parts = self._open.pop()
+        self._entries[index] = ''.join(parts).strip()
+        return tag
@@ -0,0 +1,60 @@
+"""Configuração comum dos testes do backend
+
+Uso (a partir de backend/):
+    python -m pytest tests/
+
+O app é importado com um banco SQLite temporário, sem workers da fila e sem
+chaves de provedores (as rotas de IA respondem com o conteúdo de demonstração).
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Antes de importar src.main: o banco é criado na importação e load_dotenv não sobrescreve estes valores
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='pitchcraft-tests-'), 'test.db')}"
+os.environ['JOB_WORKERS'] = '0'
+os.environ['SEMANTIC_CACHE_ENABLED'] = 'false'
+for name in ('OPENAI_API_KEY', 'ANTHROPIC_API_KEY', 'GOOGLE_API_KEY', 'QDRANT_API_KEY'):
+    os.environ[name] = ''
+
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import app
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Contar as instruções SQL executadas dentro do bloco: `with count_queries() as statements: ...`"""
+    from src.models.user import db
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counter
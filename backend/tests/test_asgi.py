@@ -0,0 +1,32 @@
+"""Modo ASGI: rotas Flask atendidas pela ponte WSGI (a2wsgi), inclusive em streaming"""
+import asyncio
+
+import httpx
+
+from src.asgi import app as asgi_app
+
+
+def request(method, url, **kwargs):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url='http://test') as client:
+            return await client.request(method, url, **kwargs)
+    return asyncio.run(send())
+
+
+def test_flask_routes_are_served_through_the_wsgi_bridge(app):
+    created = request('POST', '/api/projects', json={'title': 'ASGI'})
+    assert created.status_code == 201
+
+    project_id = created.json()['id']
+    response = request('GET', f'/api/projects/{project_id}')
+    assert response.status_code == 200
+    assert response.json()['title'] == 'ASGI'
+
+
+def test_narrative_stream_is_forwarded_by_the_bridge(app):
+    project_id = request('POST', '/api/projects', json={'title': 'Streaming', 'description': 'Demo'}).json()['id']
+    response = request('GET', f'/api/projects/{project_id}/generate-narrative/stream')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert 'event: narrative' in response.text
@@ -0,0 +1,30 @@
+"""Perfil do banco: colunas novas criadas na partida em bancos já existentes"""
+import os
+import tempfile
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, inspect
+
+from src.models.db_profile import ensure_columns
+from src.models.pitchcraft import db
+
+
+def test_nullable_foreign_key_columns_are_added_to_existing_tables(app):
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='pitchcraft-schema-'), 'old.db')}")
+    with engine.begin() as conn:
+        # Esquema anterior à tabela de blobs: o JSON ficava na própria coluna content
+        conn.exec_driver_sql('CREATE TABLE json_blob (hash VARCHAR(64) PRIMARY KEY, data BLOB NOT NULL, '
+                             'raw_size INTEGER NOT NULL, compressed_size INTEGER NOT NULL, created_at DATETIME)')
+        conn.exec_driver_sql('CREATE TABLE presentation (id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL, '
+                             'title VARCHAR(200) NOT NULL, content TEXT, style_config TEXT, '
+                             'created_at DATETIME, updated_at DATETIME)')
+        conn.exec_driver_sql("INSERT INTO presentation (id, project_id, title, content) VALUES (1, 1, 'Deck', '{}')")
+
+    created = ensure_columns(SimpleNamespace(engine=engine, metadata=db.metadata))
+
+    assert 'presentation.content_hash' in created
+    foreign_keys = [(fk['constrained_columns'], fk['referred_table'], fk['referred_columns'])
+                    for fk in inspect(engine).get_foreign_keys('presentation')]
+    assert foreign_keys == [(['content_hash'], 'json_blob', ['hash'])]
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql('SELECT content, content_hash FROM presentation').one() == ('{}', None)
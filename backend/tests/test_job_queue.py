@@ -0,0 +1,114 @@
+"""Fila de tarefas: lease vencido, tentativa antiga cercada, cancelamento em execução e erros sem retry
+
+Sem workers (JOB_WORKERS=0): cada teste reserva e executa a tarefa chamando
+`_claim_next`/`_execute` diretamente, na mesma thread.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.pitchcraft import db, Job
+from src.services.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(app):
+    queue = JobQueue(workers=1)
+    with app.app_context():
+        # Tarefas enfileiradas por outros testes ficariam à frente na reserva
+        Job.query.filter_by(status='queued').update({'status': 'cancelled'})
+        db.session.commit()
+        yield queue
+
+
+def enqueue(queue, handler, max_attempts=3) -> int:
+    queue.register('test', handler)
+    return queue.enqueue('test', {}, max_attempts=max_attempts).id
+
+
+def expire_lease(queue, job_id: int) -> None:
+    Job.query.filter_by(id=job_id).update({'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    queue._next_reclaim_at = 0.0
+
+
+def test_expired_lease_returns_job_to_the_queue(queue):
+    job_id = enqueue(queue, lambda: 'ok')
+    assert queue._claim_next() == job_id
+
+    # O worker parou de renovar o lease: a próxima reserva devolve a tarefa à fila e a pega de novo
+    expire_lease(queue, job_id)
+    assert queue._claim_next() == job_id
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('running', 2)
+
+    queue._execute(job_id)
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.result) == ('succeeded', '"ok"')
+
+
+def test_expired_lease_without_attempts_left_fails(queue):
+    job_id = enqueue(queue, lambda: 'ok', max_attempts=1)
+    assert queue._claim_next() == job_id
+
+    expire_lease(queue, job_id)
+    assert queue._claim_next() is None
+    job = db.session.get(Job, job_id)
+    assert job.status == 'failed'
+    assert 'Lease expirado' in job.error
+
+
+def test_stale_attempt_does_not_overwrite_the_newer_one(queue):
+    def slow_handler():
+        # Durante a execução o lease vence e outra tentativa reserva a tarefa
+        expire_lease(queue, job_id)
+        assert queue._claim_next() == job_id
+        return 'stale'
+
+    job_id = enqueue(queue, slow_handler)
+    assert queue._claim_next() == job_id
+    queue._execute(job_id)
+
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts, job.result) == ('running', 2, None)
+
+
+def test_cancelling_a_running_job_discards_its_result(queue):
+    def handler():
+        queue.cancel(db.session.get(Job, job_id))
+        return 'done'
+
+    job_id = enqueue(queue, handler)
+    assert queue._claim_next() == job_id
+    queue._execute(job_id)
+
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.result) == ('cancelled', None)
+    assert job.finished_at is not None
+
+
+def test_deterministic_error_fails_without_retry(queue):
+    def handler():
+        raise ValueError('Projeto sem descrição')
+
+    job_id = enqueue(queue, handler)
+    assert queue._claim_next() == job_id
+    queue._execute(job_id)
+
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('failed', 1)
+    assert job.error == 'Projeto sem descrição'
+
+
+def test_transient_error_is_requeued_with_backoff(queue):
+    def handler():
+        raise ConnectionError('conexão recusada')
+
+    job_id = enqueue(queue, handler)
+    assert queue._claim_next() == job_id
+    queue._execute(job_id)
+
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('queued', 1)
+    assert job.available_at > datetime.utcnow()
+    assert queue._claim_next() is None
@@ -0,0 +1,75 @@
+"""Cache de respostas de LLM: TTL, LRU, hits sem escrita e invalidação por projeto"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from src.models.pitchcraft import db, LLMCacheEntry, MarketIntelligence
+from src.services.llm_cache import LLMCache, project_scope
+
+
+def entry(key):
+    return db.session.execute(
+        db.select(LLMCacheEntry).where(LLMCacheEntry.cache_key == key).execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+
+
+def test_expired_entries_are_misses_and_are_removed_by_eviction(app):
+    cache = LLMCache(ttl_seconds=60, max_entries=100)
+    with app.app_context():
+        cache.clear()
+        cache.set('expira', 'resposta')
+        assert cache.get('expira') == 'resposta'
+
+        with db.engine.begin() as conn:
+            conn.execute(update(LLMCacheEntry.__table__).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        assert cache.get('expira') is None
+
+        cache.evict_every = 1
+        cache.set('outra', 'resposta')
+        assert entry('expira') is None
+
+
+def test_least_recently_used_entry_is_evicted_first(app):
+    cache = LLMCache(ttl_seconds=0, max_entries=3)
+    with app.app_context():
+        cache.clear()
+        for key in ('a', 'b', 'c'):
+            cache.set(key, f'resposta {key}')
+        assert cache.get('a') == 'resposta a'
+
+        cache.set('d', 'resposta d')
+
+        assert [key for key in 'abcd' if entry(key) is not None] == ['a', 'c', 'd']
+
+
+def test_hits_are_batched_instead_of_writing_on_every_get(app, count_queries):
+    cache = LLMCache(ttl_seconds=0, max_entries=100)
+    with app.app_context():
+        cache.clear()
+        cache.set('lido', 'resposta')
+        with count_queries() as statements:
+            for _ in range(3):
+                assert cache.get('lido') == 'resposta'
+        assert not [sql for sql in statements if not sql.lstrip().upper().startswith('SELECT')]
+        assert entry('lido').hit_count == 0
+
+        cache.flush_touches()
+        assert entry('lido').hit_count == 3
+
+
+def test_profile_and_market_changes_invalidate_the_project_scope(app, client):
+    project_id = client.post('/api/projects', json={'title': 'Cache'}).get_json()['id']
+    cache = LLMCache(ttl_seconds=0, max_entries=100)
+    with app.app_context():
+        cache.set('perfil', 'resposta', scope=project_scope(project_id))
+        cache.set('global', 'resposta')
+
+    client.post(f'/api/projects/{project_id}/client-profile', json={'company_name': 'ACME', 'disc_profile': 'S'})
+    with app.app_context():
+        assert cache.get('perfil') is None
+        assert cache.get('global') == 'resposta'
+
+        cache.set('mercado', 'resposta', scope=project_scope(project_id))
+        db.session.add(MarketIntelligence(project_id=project_id))
+        db.session.commit()
+        assert cache.get('mercado') is None
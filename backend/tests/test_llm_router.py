@@ -0,0 +1,103 @@
+"""Roteador de provedores: failover, hedging do provedor lento, ordenação por latência e circuit breaker"""
+import asyncio
+import threading
+
+from src.services.llm_router import LLMProvider, LLMRouter
+
+
+class StubProvider(LLMProvider):
+    def __init__(self, name, error=None, delay=0.0):
+        self.name = name
+        super().__init__()
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.release = threading.Event()
+
+    def complete(self, model, prompt, temperature):
+        self.calls += 1
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return f'resposta de {self.name}'
+
+
+def test_failing_first_provider_falls_over_to_the_next():
+    first = StubProvider('primeiro', error=ValueError('resposta inválida'))
+    second = StubProvider('segundo')
+    router = LLMRouter([first, second], hedge_enabled=False)
+
+    assert router.complete('m', 'prompt', 0.5) == ('resposta de segundo', 'segundo')
+    assert (first.calls, second.calls) == (1, 1)
+    assert router.stats['primeiro'].error_rate == 1.0
+    # A falha registrada manda o primeiro provedor para o fim da fila
+    assert [provider.name for provider in router.ranked_providers()] == ['segundo', 'primeiro']
+
+
+def test_failover_async():
+    first = StubProvider('primeiro', error=ValueError('resposta inválida'))
+    second = StubProvider('segundo')
+    router = LLMRouter([first, second], hedge_enabled=False)
+
+    assert asyncio.run(router.complete_async('m', 'prompt', 0.5)) == ('resposta de segundo', 'segundo')
+    assert (first.calls, second.calls) == (1, 1)
+
+
+def test_slow_first_provider_is_hedged():
+    slow = StubProvider('lento', delay=5)
+    fast = StubProvider('rapido')
+    router = LLMRouter([slow, fast], hedge_enabled=True, hedge_after_seconds=0.05)
+    try:
+        assert router.complete('m', 'prompt', 0.5) == ('resposta de rapido', 'rapido')
+        assert router.hedges_fired == 1
+        assert (slow.calls, fast.calls) == (1, 1)
+    finally:
+        slow.release.set()
+
+
+def test_fast_first_provider_is_not_hedged():
+    first = StubProvider('primeiro')
+    second = StubProvider('segundo')
+    router = LLMRouter([first, second], hedge_enabled=True, hedge_after_seconds=5)
+
+    assert router.complete('m', 'prompt', 0.5) == ('resposta de primeiro', 'primeiro')
+    assert router.hedges_fired == 0
+    assert second.calls == 0
+
+
+def test_ranked_providers_by_latency_and_errors():
+    providers = [StubProvider(name) for name in ('a', 'b', 'c', 'd')]
+    router = LLMRouter(providers, hedge_enabled=False)
+    # Sem amostras vale a ordem configurada
+    assert [provider.name for provider in router.ranked_providers()] == ['a', 'b', 'c', 'd']
+
+    router.record('a', 0.8, ok=True)
+    router.record('b', 0.2, ok=True)
+    # c é o mais rápido, mas metade das chamadas falha: 0.1 * (1 + 0.5 * 4) = 0.3
+    router.record('c', 0.1, ok=True)
+    router.record('c', 0.1, ok=False)
+    # d nunca foi usado: desconhecido vai na frente para ganhar amostras
+    assert [provider.name for provider in router.ranked_providers()] == ['d', 'b', 'c', 'a']
+
+
+def test_circuit_breaker_moves_failing_provider_out_of_rotation():
+    flaky = StubProvider('instavel')
+    backup = StubProvider('reserva')
+    router = LLMRouter([flaky, backup], hedge_enabled=False)
+    router.record('instavel', 0.01, ok=True)
+    router.record('reserva', 0.5, ok=True)
+    assert router.ranked_providers()[0] is flaky
+
+    # Falhas seguidas até o limite abrem o circuito, mesmo com a menor latência
+    for _ in range(router.stats['instavel'].failure_threshold):
+        router.record('instavel', 0.01, ok=False)
+    assert not router.stats['instavel'].healthy
+    assert router.ranked_providers() == [backup, flaky]
+    assert router.complete('m', 'prompt', 0.5) == ('resposta de reserva', 'reserva')
+    assert flaky.calls == 0
+
+    # Passado o cooldown, o provedor volta à rotação
+    router.stats['instavel'].unhealthy_until = 0.0
+    assert router.stats['instavel'].healthy
+    assert router.snapshot()['providers']['instavel']['healthy']
@@ -0,0 +1,88 @@
+"""Biblioteca de objeções: remoções e mudanças de perfil chegam à matriz em memória sem recarga completa"""
+from src.models.pitchcraft import db, Objection
+from src.services.objection_library import ObjectionLibrary
+
+PROJECT = {'project_type': 'pitch_vendas', 'description': 'Automação comercial para o varejo'}
+
+
+def create_project_with_objections(client, industry: str) -> int:
+    project_id = client.post('/api/projects', json={
+        'title': 'Biblioteca', 'description': PROJECT['description']
+    }).get_json()['id']
+    client.post(f'/api/projects/{project_id}/client-profile', json={
+        'company_name': 'ACME', 'industry': industry, 'disc_profile': 'D'
+    })
+    client.post(f'/api/projects/{project_id}/objections', json={'use_library': False})
+    return project_id
+
+
+def search(library, industry: str):
+    return library.search(PROJECT, {'industry': industry, 'disc_profile': 'D'}, k=10)
+
+
+def test_library_follows_profile_changes_and_deletions(app, client):
+    project_id = create_project_with_objections(client, 'Varejo Têxtil')
+    library = ObjectionLibrary(min_similarity=0.0)
+
+    with app.app_context():
+        found = search(library, 'Varejo Têxtil')
+        assert found
+
+        # Setor do perfil alterado pela API: as objeções passam a responder pelo novo setor
+        client.post(f'/api/projects/{project_id}/client-profile', json={
+            'company_name': 'ACME', 'industry': 'Logística Portuária', 'disc_profile': 'D'
+        })
+        assert not search(library, 'Varejo Têxtil')
+        assert search(library, 'Logística Portuária')
+
+        # Remoção pelo ORM invalida a biblioteca na hora
+        removed = db.session.get(Objection, found[0]['id'])
+        db.session.delete(removed)
+        db.session.commit()
+        assert removed.id not in {entry['id'] for entry in search(library, 'Logística Portuária')}
+
+
+def test_library_reloads_periodically_for_changes_made_elsewhere(app, client):
+    project_id = create_project_with_objections(client, 'Mineração')
+    library = ObjectionLibrary(min_similarity=0.0)
+
+    with app.app_context():
+        assert search(library, 'Mineração')
+
+        # Ex.: `flask objections dedupe` em outro processo (DELETE direto, sem eventos do ORM)
+        table = Objection.__table__
+        db.session.execute(table.delete().where(table.c.project_id == project_id))
+        db.session.commit()
+        assert search(library, 'Mineração'), 'sem recarga, a matriz ainda tem as linhas removidas'
+
+        # A recarga periódica roda em segundo plano e troca a matriz quando termina
+        library.reload_interval = 0
+        search(library, 'Mineração')
+        library._reload_thread.join(timeout=10)
+        library.reload_interval = 300
+        assert not search(library, 'Mineração')
+
+
+def test_profile_change_reembeds_only_that_project(app, client):
+    create_project_with_objections(client, 'Agronegócio')
+    changed_id = create_project_with_objections(client, 'Construção Civil')
+    library = ObjectionLibrary(min_similarity=0.0)
+    embedded = []
+    embed = library.embedder.embed
+    library.embedder.embed = lambda texts: embedded.append(len(texts)) or embed(texts)
+
+    with app.app_context():
+        library.sync()
+        total = Objection.query.count()
+        project_rows = Objection.query.filter_by(project_id=changed_id).count()
+        assert embedded == [total]
+
+        client.post(f'/api/projects/{changed_id}/client-profile', json={
+            'company_name': 'ACME', 'industry': 'Saneamento', 'disc_profile': 'D'
+        })
+        assert search(library, 'Saneamento')
+        assert not search(library, 'Construção Civil')
+        assert search(library, 'Agronegócio')
+
+    # Carga inicial, linhas do projeto alterado e os embeddings das três consultas
+    assert embedded == [total, project_rows, 1, 1, 1]
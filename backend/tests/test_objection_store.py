@@ -0,0 +1,55 @@
+"""Gravação de objeções: upsert por texto normalizado e limpeza de bancos antigos (objections dedupe)"""
+from sqlalchemy import text
+
+from src.models.pitchcraft import db, Objection
+from src.services.objection_store import dedupe_objections, upsert_objections
+
+INDEX_NAME = 'uq_objection_project_text_hash'
+
+
+def create_project(client) -> int:
+    return client.post('/api/projects', json={'title': 'Objeções'}).get_json()['id']
+
+
+def objection(text_value: str, confidence: float = 0.5) -> dict:
+    return {'objection': text_value, 'response': 'Resposta', 'category': 'price', 'confidence_score': confidence}
+
+
+def texts(project_id):
+    return sorted(o.objection_text for o in Objection.query.filter_by(project_id=project_id))
+
+
+def test_upsert_skips_texts_that_differ_only_in_accents_case_or_punctuation(app, client):
+    project_id = create_project(client)
+    with app.app_context():
+        assert upsert_objections(project_id, [objection('O preço está alto'), objection('o preco esta alto!')]) == 1
+        db.session.commit()
+        assert upsert_objections(project_id, [objection('O PREÇO ESTÁ ALTO.'), objection('Não é o momento')]) == 1
+        db.session.commit()
+        assert texts(project_id) == ['Não é o momento', 'O preço está alto']
+
+
+def test_upsert_without_unique_index_and_dedupe_restores_it(app, client):
+    project_id = create_project(client)
+    with app.app_context():
+        # Banco anterior ao índice: coluna text_hash criada por ensure_columns, índice ausente e duplicatas
+        db.session.execute(text(f'DROP INDEX {INDEX_NAME}'))
+        db.session.commit()
+        for confidence in (0.4, 0.9):
+            db.session.add(Objection(project_id=project_id, objection_text='Falta orçamento',
+                                     response_text=f'Resposta {confidence}', confidence_score=confidence))
+        db.session.commit()
+
+        assert upsert_objections(project_id, [objection('falta orcamento'), objection('Sem tempo agora')]) == 1
+        db.session.commit()
+
+        result = dedupe_objections()
+        assert result['index_created'] is True
+        assert result['deleted'] == 1
+        kept = Objection.query.filter_by(project_id=project_id, objection_text='Falta orçamento').one()
+        assert kept.confidence_score == 0.9
+        assert texts(project_id) == ['Falta orçamento', 'Sem tempo agora']
+
+        # Com o índice de volta, o upsert usa ON CONFLICT
+        assert upsert_objections(project_id, [objection('Falta orçamento!')]) == 0
+        db.session.commit()
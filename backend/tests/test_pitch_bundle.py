@@ -0,0 +1,72 @@
+"""Pacote de pitch (DISC + narrativa + objeções em uma chamada): quando é gerado e como é reaproveitado"""
+import json
+
+from src.routes.pitchcraft import ai_service
+from src.services.llm_router import LLMProvider, LLMRouter
+
+BUNDLE = {
+    'disc_profile': 'C',
+    'narrative': {
+        'introduction': 'Introdução do pacote',
+        'problem_statement': 'Problema do pacote',
+        'solution_overview': 'Solução do pacote',
+        'benefits': 'Benefícios do pacote',
+        'social_proof': 'Prova social do pacote',
+        'call_to_action': 'Chamada do pacote',
+    },
+    'objections': [{'objection': 'Caro', 'response': 'Retorno em 6 meses', 'category': 'price', 'confidence_score': 0.7}],
+}
+
+
+class BundleProvider(LLMProvider):
+    name = 'stub'
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def complete(self, model, prompt, temperature):
+        self.prompts.append(prompt)
+        return json.dumps(BUNDLE)
+
+
+def sse_events(text):
+    events = []
+    for block in text.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_profile_save_uses_the_light_disc_analysis_instead_of_the_bundle(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai_service, 'bundle_enabled', True)
+    monkeypatch.setattr(ai_service, 'analyze_disc_profile', lambda data: calls.append('disc') or 'I')
+    monkeypatch.setattr(ai_service, 'generate_pitch_bundle', lambda *args: calls.append('bundle'))
+    project_id = client.post('/api/projects', json={'title': 'Perfil'}).get_json()['id']
+
+    response = client.post(f'/api/projects/{project_id}/client-profile', json={'company_name': 'ACME', 'industry': 'Varejo'})
+
+    assert response.status_code == 200
+    assert response.get_json()['disc_profile'] == 'I'
+    assert calls == ['disc']
+
+
+def test_stream_replays_the_bundle_narrative_returned_by_post(client, monkeypatch):
+    provider = BundleProvider()
+    monkeypatch.setattr(ai_service, 'bundle_enabled', True)
+    monkeypatch.setattr(ai_service, 'router', LLMRouter([provider]))
+    project_id = client.post('/api/projects', json={'title': 'Stream do pacote', 'description': 'CRM'}).get_json()['id']
+    client.post(f'/api/projects/{project_id}/client-profile', json={'company_name': 'ACME', 'disc_profile': 'C'})
+
+    posted = client.post(f'/api/projects/{project_id}/generate-narrative', json={}).get_json()
+    events = sse_events(client.get(f'/api/projects/{project_id}/generate-narrative/stream').get_data(as_text=True))
+
+    event, streamed = events[-1]
+    assert event == 'narrative'
+    assert streamed['project_id'] == posted['project_id']
+    without_timestamp = lambda narrative: {key: value for key, value in narrative.items() if key != 'generated_at'}
+    assert without_timestamp(streamed['narrative']) == without_timestamp(posted['narrative'])
+    assert streamed['narrative']['introduction'] == 'Introdução do pacote'
+    assert [payload['section'] for name, payload in events if name == 'section'][0] == 'introduction'
+    assert len(provider.prompts) == 1  # o stream reaproveita o pacote em cache
@@ -0,0 +1,91 @@
+"""Versionamento de apresentações: edições simultâneas e edições sem mudança"""
+from src.models.pitchcraft import db, PresentationVersion
+from src.routes.pitchcraft import presentation_versions
+
+
+def create_presentation(client) -> int:
+    project_id = client.post('/api/projects', json={'title': 'Versões'}).get_json()['id']
+    response = client.post(f'/api/projects/{project_id}/presentations', json={
+        'title': 'Deck',
+        'content': {'slides': [{'title': f'Slide {n}', 'content': 'Texto'} for n in range(1, 4)]}
+    })
+    return response.get_json()['id']
+
+
+def versions(client, presentation_id):
+    return [item['version'] for item in client.get(f'/api/presentations/{presentation_id}/versions').get_json()]
+
+
+def test_edit_that_loses_the_version_race_is_retried(app, client, monkeypatch):
+    presentation_id = create_presentation(client)
+    client.patch(f'/api/presentations/{presentation_id}/slides/1', json={'content': 'Editado'})
+    original_latest = presentation_versions.latest
+    raced = []
+
+    def latest_with_concurrent_commit(pk):
+        latest = original_latest(pk)
+        if not raced:
+            # Outra requisição grava a versão seguinte entre a leitura e o INSERT desta
+            raced.append(latest.version + 1)
+            with db.engine.begin() as conn:
+                conn.execute(PresentationVersion.__table__.insert().values(
+                    presentation_id=pk, version=latest.version + 1, kind='delta',
+                    base_version=latest.base_version, patch='[]', message='concorrente'
+                ))
+        return latest
+
+    monkeypatch.setattr(presentation_versions, 'latest', latest_with_concurrent_commit)
+    response = client.post(f'/api/presentations/{presentation_id}/versions/1/restore')
+
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 4
+    assert versions(client, presentation_id) == [1, 2, 3, 4]
+
+
+def test_unchanged_content_does_not_create_a_version(client):
+    presentation_id = create_presentation(client)
+    slides = client.get(f'/api/presentations/{presentation_id}/slides').get_json()['slides']
+
+    response = client.put(f'/api/presentations/{presentation_id}', json={'content': {'slides': slides}})
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 1
+
+    client.patch(f'/api/presentations/{presentation_id}/slides/1', json={'title': 'Slide 1'})
+    assert versions(client, presentation_id) == [1]
+
+
+def test_slide_field_named_message_is_kept_and_version_message_comes_from_header(client):
+    presentation_id = create_presentation(client)
+    response = client.patch(
+        f'/api/presentations/{presentation_id}/slides/2',
+        json={'message': 'Fale com a gente'},
+        headers={'X-Version-Message': 'Chamada%20para%20a%C3%A7%C3%A3o'}
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()['slide']['message'] == 'Fale com a gente'
+    history = client.get(f'/api/presentations/{presentation_id}/versions').get_json()
+    assert [item['message'] for item in history if item['version'] == 2] == ['Chamada para ação']
+
+
+def test_patch_with_invalid_list_index_is_rejected_and_not_versioned(client):
+    presentation_id = create_presentation(client)
+    invalid_ops = [
+        {'op': 'add', 'path': '/slides/9', 'value': {'title': 'Fora'}},
+        {'op': 'replace', 'path': '/slides/-1', 'value': {'title': 'Negativo'}},
+        {'op': 'remove', 'path': '/slides/-2'},
+        {'op': 'remove', 'path': '/slides/3'},
+        {'op': 'replace', 'path': '/slides/1x/title', 'value': 'Não numérico'},
+    ]
+    for op in invalid_ops:
+        response = client.put(f'/api/presentations/{presentation_id}', json={'patch': [op]})
+        assert response.status_code == 400, op
+    assert versions(client, presentation_id) == [1]
+
+    response = client.put(f'/api/presentations/{presentation_id}', json={'patch': [
+        {'op': 'add', 'path': '/slides/3', 'value': {'title': 'Slide 4'}},
+        {'op': 'add', 'path': '/slides/-', 'value': {'title': 'Slide 5'}},
+    ]})
+    assert response.status_code == 200
+    slides = client.get(f'/api/presentations/{presentation_id}/slides').get_json()['slides']
+    assert [slide['title'] for slide in slides] == ['Slide 1', 'Slide 2', 'Slide 3', 'Slide 4', 'Slide 5']
@@ -0,0 +1,49 @@
+"""Número de consultas de GET /projects/<id> (relacionamentos carregados antecipadamente)"""
+
+# Projeto com cliente e mercado (JOIN), apresentações e objeções (selectin) e os blobs JSON
+MAX_PROJECT_DETAIL_QUERIES = 4
+
+
+def create_project(client, presentations: int, objections: bool) -> int:
+    project_id = client.post('/api/projects', json={'title': 'Projeto de teste'}).get_json()['id']
+    client.post(f'/api/projects/{project_id}/client-profile', json={
+        'company_name': 'ACME', 'industry': 'Tecnologia', 'disc_profile': 'D'
+    })
+    client.post(f'/api/projects/{project_id}/enrich-data', json={'company_name': 'ACME', 'industry': 'Tecnologia'})
+    if objections:
+        client.post(f'/api/projects/{project_id}/objections', json={})
+    for index in range(presentations):
+        client.post(f'/api/projects/{project_id}/presentations', json={
+            'title': f'Deck {index}',
+            'content': {'slides': [{'title': f'Slide {n}', 'content': 'Texto'} for n in range(3)]}
+        })
+    return project_id
+
+
+def get_project_queries(client, count_queries, project_id):
+    with count_queries() as statements:
+        response = client.get(f'/api/projects/{project_id}')
+    assert response.status_code == 200
+    return response.get_json(), statements
+
+
+def test_get_project_loads_children_within_query_bound(client, count_queries):
+    project_id = create_project(client, presentations=3, objections=True)
+
+    body, statements = get_project_queries(client, count_queries, project_id)
+
+    assert len(body['presentations']) == 3
+    assert body['objections']
+    assert body['client_profile']['company_name'] == 'ACME'
+    assert body['market_intelligence'] is not None
+    assert len(statements) <= MAX_PROJECT_DETAIL_QUERIES, '\n'.join(statements)
+
+
+def test_get_project_query_count_does_not_grow_with_children(client, count_queries):
+    small = create_project(client, presentations=1, objections=False)
+    large = create_project(client, presentations=5, objections=True)
+
+    _, small_statements = get_project_queries(client, count_queries, small)
+    _, large_statements = get_project_queries(client, count_queries, large)
+
+    assert len(large_statements) == len(small_statements), '\n'.join(large_statements)
@@ -0,0 +1,137 @@
+"""Controle de admissão: vagas assíncronas sem polling, devolução de reservas rejeitadas e 429 com Retry-After"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.llm_router import LLMProvider, LLMRouter
+from src.services.rate_limiter import AdmissionRejected, ProviderLimiter
+
+
+class ThrottledError(Exception):
+    """Erro no formato dos SDKs: status_code e cabeçalhos na resposta"""
+
+    def __init__(self, headers):
+        super().__init__('429 Too Many Requests')
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers=headers)
+
+
+class ThrottledProvider(LLMProvider):
+    name = 'stub'
+
+    def __init__(self, failures, headers):
+        super().__init__()
+        self.rate_limiter = ProviderLimiter('stub', requests_per_minute=600, max_queue_seconds=5)
+        self.failures = failures
+        self.headers = headers
+        self.calls = 0
+
+    def complete(self, model, prompt, temperature):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ThrottledError(self.headers)
+        return 'ok'
+
+
+def test_async_waiter_is_woken_when_a_slot_is_released():
+    limiter = ProviderLimiter('stub', max_concurrency=1)
+
+    async def scenario():
+        with limiter.slot('m'):
+            entered = asyncio.Event()
+
+            async def waiter():
+                async with limiter.slot_async('m'):
+                    entered.set()
+
+            task = asyncio.ensure_future(waiter())
+            await asyncio.sleep(0.05)
+            # Aguardando na fila de futures, não em um laço de asyncio.sleep
+            assert not entered.is_set()
+            assert len(limiter._async_waiters) == 1
+            assert limiter.snapshot()['waiting'] == 1
+        await asyncio.wait_for(task, timeout=1)
+        assert entered.is_set()
+
+    asyncio.run(scenario())
+    assert limiter.snapshot()['active'] == 0 and limiter.snapshot()['waiting'] == 0
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    limiter = ProviderLimiter('stub', max_concurrency=1)
+
+    async def scenario():
+        with limiter.slot('m'):
+            async def waiter():
+                async with limiter.slot_async('m'):
+                    pass
+
+            task = asyncio.ensure_future(waiter())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert not limiter._async_waiters
+
+    asyncio.run(scenario())
+    assert limiter.snapshot()['active'] == 0 and limiter.snapshot()['waiting'] == 0
+
+
+def test_rejected_admission_refunds_the_reservation():
+    limiter = ProviderLimiter('stub', requests_per_minute=60, tokens_per_minute=6000, max_queue_seconds=0.5)
+    requests_bucket, tokens_bucket = limiter.buckets('m')
+    # Rajada de 10s de cota: 10 requisições passam sem espera
+    for _ in range(10):
+        with limiter.slot('m', tokens=10):
+            pass
+    requests_before, tokens_before = requests_bucket._tokens, tokens_bucket._tokens
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        with limiter.slot('m', tokens=10):
+            pass
+    assert rejected.value.retry_after > 0.5
+    assert limiter.rejected == 1
+    assert limiter.snapshot()['waiting'] == 0
+    # A reserva desfeita não empurra as chamadas seguintes para trás
+    assert requests_bucket._tokens == pytest.approx(requests_before, abs=0.05)
+    assert tokens_bucket._tokens == pytest.approx(tokens_before, abs=5)
+
+
+def test_retry_after_pauses_the_model_and_the_call_is_retried():
+    provider = ThrottledProvider(failures=1, headers={'retry-after-ms': '50'})
+    router = LLMRouter([provider])
+    router.retry_base_seconds = 0
+
+    assert router.complete('m', 'prompt', 0.5) == ('ok', 'stub')
+    assert provider.calls == 2
+    # O Retry-After vale para as próximas chamadas ao modelo, não só para a retentativa
+    requests_bucket, _ = provider.rate_limiter.buckets('m')
+    assert requests_bucket._paused_until > 0
+
+
+def test_throttling_beyond_the_retry_budget_is_rejected_as_overload():
+    provider = ThrottledProvider(failures=10, headers={'retry-after': '60'})
+    router = LLMRouter([provider])
+    router.retry_base_seconds = 0
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        router.complete('m', 'prompt', 0.5)
+    assert rejected.value.retry_after >= 60
+    assert provider.calls == 1
+
+    # O modelo segue pausado: a próxima chamada é rejeitada sem chegar ao provedor
+    with pytest.raises(AdmissionRejected):
+        router.complete('m', 'prompt', 0.5)
+    assert provider.calls == 1
+    assert provider.rate_limiter.rejected == 1
+
+
+def test_exhausted_retries_on_429_raise_admission_rejected_async():
+    provider = ThrottledProvider(failures=10, headers={'retry-after-ms': '10'})
+    router = LLMRouter([provider])
+    router.retry_base_seconds = 0
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(router.complete_async('m', 'prompt', 0.5))
+    assert provider.calls == router.max_retries + 1
@@ -0,0 +1,88 @@
+"""Cache semântico: contexto de mercado separa as entradas, o índice em memória tem limite e o modo ASGI não bloqueia o event loop"""
+import asyncio
+import threading
+
+import numpy as np
+
+from src.services.ai_service import AIService
+from src.services.llm_router import LLMProvider, LLMRouter
+from src.services.semantic_cache import HashingEmbedder, InMemoryVectorIndex, SemanticCache
+
+PROJECT = {'project_type': 'pitch_vendas', 'description': 'Plataforma de automação comercial'}
+CLIENT = {'company_name': 'ACME', 'industry': 'Tecnologia', 'size': 'média', 'disc_profile': 'D'}
+
+
+class CountingProvider(LLMProvider):
+    name = 'stub'
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def complete(self, model, prompt, temperature):
+        self.calls += 1
+        return f'**Introdução**\nIntro v{self.calls}\n\n**Chamada para ação**\nVamos conversar?'
+
+
+def semantic_service(app):
+    service = AIService(providers=[])
+    provider = CountingProvider()
+    service.router = LLMRouter([provider])
+    service.cache.get = lambda key: None
+    service.cache.set = lambda *args, **kwargs: None
+    service.__dict__['semantic_cache'] = SemanticCache(InMemoryVectorIndex(512), HashingEmbedder(512), batch_size=1)
+    service.semantic_cache.enabled = True
+    return service, provider
+
+
+def test_narrative_is_not_reused_after_market_data_changes(app):
+    service, provider = semantic_service(app)
+    market_v1 = {'market_opportunities': ['Expansão para o varejo']}
+    market_v2 = {'market_opportunities': ['Novas regras fiscais para o setor público']}
+
+    with app.app_context():
+        first = service.generate_narrative(PROJECT, CLIENT, market_v1)
+        reused = service.generate_narrative(PROJECT, CLIENT, market_v1)
+        enriched = service.generate_narrative(PROJECT, CLIENT, market_v2)
+
+    assert provider.calls == 2
+    assert reused['introduction'] == first['introduction'] == 'Intro v1'
+    assert enriched['introduction'] == 'Intro v2'
+
+
+def test_async_flows_run_semantic_cache_outside_the_event_loop(app):
+    service, provider = semantic_service(app)
+    cache = service.semantic_cache
+    threads = []
+
+    def recorded(method):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return method(*args, **kwargs)
+        return wrapper
+
+    cache.lookup, cache.add = recorded(cache.lookup), recorded(cache.add)
+
+    async def generate():
+        loop_thread = threading.get_ident()
+        narrative = await service.generate_narrative_async(PROJECT, CLIENT, {})
+        return loop_thread, narrative
+
+    with app.app_context():
+        loop_thread, narrative = asyncio.run(generate())
+
+    assert narrative['introduction'] == 'Intro v1'
+    assert len(threads) == 2  # lookup + add
+    assert loop_thread not in threads
+
+
+def test_in_memory_index_evicts_oldest_entries():
+    index = InMemoryVectorIndex(4, capacity=2, max_entries=3)
+    vectors = np.eye(4, dtype=np.float32)
+    for position in range(4):
+        index.upsert(vectors[position:position + 1], [{'kind': 'narrative', 'context': '', 'result': str(position)}])
+
+    assert len(index) == 3
+    assert index.search(vectors[0], 'narrative', 0.9) is None
+    assert index.search(vectors[3], 'narrative', 0.9)['result'] == '3'
+    assert index.search(vectors[1], 'narrative', 0.9)['result'] == '1'
@@ -0,0 +1,20 @@
+"""Partida a frio: import de src.main dentro do orçamento e sem SDKs de provedores"""
+import os
+import statistics
+import tempfile
+
+from benchmarks.bench_startup import LAZY_MODULES, run_once
+
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '2500'))
+
+
+def test_cold_start_stays_within_budget_without_eager_sdks():
+    db_path = os.path.join(tempfile.mkdtemp(prefix='pitchcraft-startup-'), 'startup.db')
+    run_once(db_path)  # cria o banco fora da medição
+
+    runs = [run_once(db_path) for _ in range(3)]
+    median_ms = statistics.median(elapsed for elapsed, _ in runs) * 1000
+    _, modules = runs[-1]
+
+    assert [name for name in LAZY_MODULES if name in modules] == []
+    assert median_ms <= STARTUP_BUDGET_MS, f'partida a frio em {median_ms:.0f} ms (orçamento: {STARTUP_BUDGET_MS:.0f} ms)'
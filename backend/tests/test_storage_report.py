@@ -0,0 +1,21 @@
+"""Relatório de armazenamento: slides e versões entram nos bytes lógicos"""
+from src.services.blob_storage import storage_report
+
+
+def test_report_counts_slide_and_version_blobs(app, client):
+    project_id = client.post('/api/projects', json={'title': 'Armazenamento'}).get_json()['id']
+    slides = [{'title': f'Slide {n}', 'content': 'Texto ' * 50} for n in range(1, 6)]
+    presentation_id = client.post(f'/api/projects/{project_id}/presentations', json={
+        'title': 'Deck', 'content': {'slides': slides}
+    }).get_json()['id']
+    for n in range(1, 4):
+        client.patch(f'/api/presentations/{presentation_id}/slides/{n}', json={'content': f'Editado {n}'})
+
+    with app.app_context():
+        report = storage_report()
+
+    assert report['by_column']['presentation.slide_refs']['references'] >= len(slides) * 2 + 3
+    assert report['by_column']['presentation_version.snapshot_hash']['references'] >= 1
+    # Todo blob gravado é referenciado ao menos uma vez
+    assert report['logical_bytes'] >= report['unique_raw_bytes']
+    assert report['saved_bytes'] >= 0
@@ -0,0 +1,46 @@
+"""Extração do site em streaming: charset declarado no <meta> quando o cabeçalho não informa"""
+import pytest
+
+from src.services.data_integration import DataIntegrationService
+from src.services.website_extractor import WebsiteExtractor
+
+PARAGRAPH = 'Soluções de automação para o comércio varejista em São Paulo'
+META_TAGS = {
+    'charset': '<meta charset="iso-8859-1">',
+    'http-equiv': '<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">',
+}
+
+
+def latin1_page(meta_tag: str) -> bytes:
+    paragraphs = ''.join(f'<p>{PARAGRAPH} ({n})</p>' for n in range(200))
+    return (f'<html><head>{meta_tag}<title>Distribuição Ltda</title>'
+            f'<meta name="description" content="Atacado e logística"></head>'
+            f'<body>{paragraphs}</body></html>').encode('latin-1')
+
+
+def extract(page: bytes, encoding=None, chunk_size: int = 512) -> WebsiteExtractor:
+    extractor = WebsiteExtractor(encoding)
+    for start in range(0, len(page), chunk_size):
+        extractor.feed_bytes(page[start:start + chunk_size])
+    extractor.close()
+    return extractor
+
+
+@pytest.mark.parametrize('meta_tag', META_TAGS.values(), ids=META_TAGS.keys())
+def test_meta_charset_is_used_when_the_header_has_none(meta_tag):
+    page = latin1_page(meta_tag)
+    extractor = extract(page)
+    full = DataIntegrationService()._parse_website('http://exemplo.com.br', page)
+
+    assert extractor.encoding == 'iso8859-1'
+    assert extractor.title == full['title'] == 'Distribuição Ltda'
+    assert extractor.meta['description'] == 'Atacado e logística'
+    assert extractor.main_content == full['main_content']
+    assert extractor.main_content[0] == f'{PARAGRAPH} (0)'
+
+
+def test_header_charset_takes_precedence_and_short_pages_default_to_utf8():
+    assert extract(latin1_page(META_TAGS['charset']), encoding='cp1252').encoding == 'cp1252'
+
+    short = extract('<title>Informação</title>'.encode('utf-8'))
+    assert (short.encoding, short.title) == ('utf-8', 'Informação')